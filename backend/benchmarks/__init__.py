@@ -0,0 +1,8 @@
+"""
+Standalone performance benchmarks.
+
+Each module runs against a throwaway SQLite database, e.g.::
+
+    cd backend
+    python -m benchmarks.client_search --clients 100000
+"""
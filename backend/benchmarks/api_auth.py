@@ -0,0 +1,101 @@
+"""
+Benchmark the per-request cost of authenticating an API request.
+
+Each request goes through the session, authentication and gym middleware and
+DRF authentication, the way a gym admin's request to the client list does:
+
+- db session: the session row and the user are read from the database
+  (Django's database session engine)
+- cached session: the session comes from the cache (``core.sessions``)
+- cached session + tenant cache: the user's role checks also come from the
+  cached tenant context (``TENANT_CONTEXT_TTL``)
+- signed token: the ``Authorization: Bearer`` token is verified without a query
+
+    python -m benchmarks.api_auth --requests 5000
+"""
+import argparse
+
+from .utils import print_report, setup_django, timer
+
+
+class ClientListView:
+    """Stand-in for the view that DRF authentication looks at."""
+    token_scope = 'clients'
+    action = 'list'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--db', help='SQLite file to use (default: temporary)')
+    args = parser.parse_args()
+
+    setup_django(args.db)
+
+    from django.conf import settings
+    from django.contrib.auth.middleware import AuthenticationMiddleware
+    from django.contrib.sessions.middleware import SessionMiddleware
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client as TestClient, RequestFactory
+    from django.test.utils import CaptureQueriesContext, override_settings
+    from rest_framework.request import Request
+    from rest_framework.settings import api_settings
+
+    from core.middleware import GymMiddleware
+    from core.models import User
+    from core.tokens import issue_token
+    from gyms.models import Gym
+
+    gym = Gym.objects.create(name='Auth Gym')
+    user = User.objects.create_user('auth_admin', password='bench-password', gym=gym, is_gym_admin=True)
+    test_client = TestClient()
+    test_client.force_login(user)
+    session_cookie = test_client.cookies[settings.SESSION_COOKIE_NAME].value
+    token, _ = issue_token(gym.pk, ['clients.list'])
+
+    factory = RequestFactory()
+    gym_middleware = GymMiddleware(lambda request: None)
+    authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+
+    def authenticate(**headers):
+        request = factory.get('/api/clients/', **headers)
+        for item in middleware:
+            item.process_request(request)
+        gym_middleware.resolve_gym(request)
+        drf_request = Request(request, authenticators=authenticators, parser_context={'view': ClientListView()})
+        assert drf_request.user.is_gym_admin and drf_request.user.gym_id == gym.pk
+
+    cookie = {'HTTP_COOKIE': f'{settings.SESSION_COOKIE_NAME}={session_cookie}'}
+    modes = [
+        ('db session', 'django.contrib.sessions.backends.db', 0, cookie),
+        ('cached session', 'core.sessions', 0, cookie),
+        ('cached session + tenant cache', 'core.sessions', 60, cookie),
+        ('signed token', 'core.sessions', 60, {'HTTP_AUTHORIZATION': f'Bearer {token}'}),
+    ]
+    results = {}
+    queries = {}
+    for label, engine, ttl, headers in modes:
+        with override_settings(SESSION_ENGINE=engine, TENANT_CONTEXT_TTL=ttl, CACHE_SHARED=True):
+            middleware = [
+                SessionMiddleware(lambda request: None),
+                AuthenticationMiddleware(lambda request: None),
+            ]
+            cache.clear()
+            authenticate(**headers)  # warm up (fills the tenant cache)
+            for _ in range(args.requests):
+                with timer(results, label):
+                    authenticate(**headers)
+            connection.queries_log.clear()
+            with CaptureQueriesContext(connection) as captured:
+                authenticate(**headers)
+            queries[label] = len(captured.captured_queries)
+
+    print_report(results)
+    print()
+    for label, count in queries.items():
+        print(f'{label}: {count} queries per request')
+
+
+if __name__ == '__main__':
+    main()
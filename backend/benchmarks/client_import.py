@@ -0,0 +1,74 @@
+"""
+Benchmark bulk client import against creating clients one by one.
+
+    python -m benchmarks.client_import --rows 100000 --baseline-rows 2000
+"""
+import argparse
+import csv
+import io
+import random
+import time
+
+from .client_search import FIRST_NAMES, LAST_NAMES
+from .utils import setup_django
+
+
+def build_csv(count, rng, prefix):
+    """CSV bytes with ``count`` clients, about 1% of them invalid or duplicated."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['first_name', 'last_name', 'phone', 'email'])
+    for i in range(count):
+        phone = f'+998 {prefix} {i:07d}'
+        if i % 200 == 1:
+            phone = f'+998 {prefix} {i - 1:07d}'
+        elif i % 200 == 2:
+            phone = 'n/a'
+        writer.writerow([rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), phone, f'client{i}@mail.uz'])
+    return buffer.getvalue().encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--baseline-rows', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--db', help='SQLite file to use (default: temporary)')
+    args = parser.parse_args()
+
+    setup_django(args.db)
+
+    from clients.importer import import_clients, read_csv
+    from clients.serializers import ClientSerializer
+    from gyms.models import Gym
+
+    rng = random.Random(42)
+    results = []
+
+    gym = Gym.objects.create(name='Baseline Gym')
+    data = build_csv(args.baseline_rows, rng, '90')
+    started = time.perf_counter()
+    for _, values in read_csv(io.BytesIO(data)):
+        serializer = ClientSerializer(data={**values, 'gym': gym.pk})
+        if serializer.is_valid():
+            serializer.save()
+    results.append(('serializer.save() per row', args.baseline_rows, time.perf_counter() - started))
+
+    gym = Gym.objects.create(name='Import Gym')
+    data = build_csv(args.rows, rng, '91')
+    started = time.perf_counter()
+    report = import_clients(gym, read_csv(io.BytesIO(data)), batch_size=args.batch_size)
+    results.append(('import_clients', args.rows, time.perf_counter() - started))
+
+    print(
+        f"import_clients: {report['created']} created, "
+        f"{report['duplicates']} duplicates, {report['invalid']} invalid"
+    )
+    width = max(len(label) for label, _, _ in results)
+    print(f"{'':{width}}  {'rows':>8}  {'seconds':>9}  {'rows/s':>9}")
+    for label, rows, seconds in results:
+        print(f'{label:{width}}  {rows:>8}  {seconds:>9.2f}  {rows / seconds:>9.0f}')
+
+
+if __name__ == '__main__':
+    main()
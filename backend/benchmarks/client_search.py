@@ -0,0 +1,90 @@
+"""
+Benchmark client search: multi-column ``icontains`` vs the token index.
+
+    python -m benchmarks.client_search --clients 100000 --queries 200
+"""
+import argparse
+import random
+import string
+
+from .utils import print_report, setup_django, timer
+
+
+FIRST_NAMES = ['Alisher', 'Bobur', 'Dilshod', 'Jasur', "O'ktam", 'Sardor', 'Aziza', 'Madina', 'Nilufar', 'Shahnoza']
+LAST_NAMES = ['Karimov', 'Rahimov', 'Tursunov', 'Yusupov', 'Aliyev', 'Saidova', 'Qodirova', 'Ergasheva']
+
+
+def random_word(rng, length):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def seed(gym, count, rng):
+    from clients.models import Client
+    from clients.search import index_clients
+
+    batch_size = 5000
+    for start in range(0, count, batch_size):
+        clients = Client.objects.bulk_create([
+            Client(
+                gym=gym,
+                first_name=f'{rng.choice(FIRST_NAMES)}{random_word(rng, 3)}',
+                last_name=f'{rng.choice(LAST_NAMES)}{random_word(rng, 3)}',
+                phone=f'+998 9{rng.randint(0, 9)} {i:07d}',
+                email=f'{random_word(rng, 8)}@mail.uz',
+            )
+            for i in range(start, min(start + batch_size, count))
+        ])
+        index_clients(clients, replace=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--db', help='SQLite file to use (default: temporary)')
+    args = parser.parse_args()
+
+    setup_django(args.db)
+
+    from django.db.models import Q
+    from clients.models import Client
+    from clients.search import matching_client_ids, normalize_term
+    from gyms.models import Gym
+
+    rng = random.Random(42)
+    gym = Gym.objects.create(name='Benchmark Gym')
+    print(f'Seeding {args.clients} clients...')
+    seed(gym, args.clients, rng)
+
+    terms = [
+        rng.choice([
+            lambda: rng.choice(FIRST_NAMES)[:3],
+            lambda: rng.choice(LAST_NAMES)[:5],
+            lambda: f'{rng.randint(0, 9999999):07d}'[:5],
+            lambda: random_word(rng, 3),
+        ])()
+        for _ in range(args.queries)
+    ]
+
+    results = {}
+    clients = Client.objects.filter(gym=gym).order_by('-registration_date', '-id')
+    for term in terms:
+        with timer(results, 'icontains (count + page)'):
+            queryset = clients.filter(
+                Q(first_name__icontains=term) | Q(last_name__icontains=term)
+                | Q(phone__icontains=term) | Q(email__icontains=term)
+            )
+            queryset.count()
+            list(queryset[:20])
+
+        with timer(results, 'token index (count + page)'):
+            queryset = clients.filter(id__in=matching_client_ids(normalize_term(term), gym.id))
+            queryset.count()
+            list(queryset[:20])
+
+    print(f'{args.clients} clients, {args.queries} search terms')
+    print_report(results)
+
+
+if __name__ == '__main__':
+    main()
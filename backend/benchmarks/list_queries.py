@@ -0,0 +1,95 @@
+"""
+Check that list endpoints run a constant number of queries, and time them.
+
+Each endpoint is requested with growing page sizes; the script exits with
+status 1 if the query count of a page depends on the number of rows in it.
+
+    python -m benchmarks.list_queries --rows 2000 --requests 50
+"""
+import argparse
+import datetime
+import sys
+from decimal import Decimal
+
+from .utils import print_report, setup_django, timer
+
+
+ENDPOINTS = ['/api/clients/', '/api/payments/', '/api/expenses/']
+PAGE_SIZES = [5, 20, 100]
+
+
+def seed(gym, count):
+    from clients.models import Client
+    from expenses.models import Expense
+    from payments.models import Payment
+
+    start = datetime.date(2024, 1, 1)
+    clients = Client.objects.bulk_create([
+        Client(gym=gym, first_name=f'Client{i}', last_name='Benchmark', phone=f'+99890{i:07d}')
+        for i in range(count)
+    ])
+    Payment.objects.bulk_create([
+        Payment(gym=gym, client=client, amount=Decimal('100000.00'), payment_date=start + datetime.timedelta(days=i % 365))
+        for i, client in enumerate(clients)
+    ])
+    Expense.objects.bulk_create([
+        Expense(gym=gym, category='other', amount=Decimal('50000.00'), description='Benchmark', expense_date=start + datetime.timedelta(days=i % 365))
+        for i in range(count)
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--db', help='SQLite file to use (default: temporary)')
+    args = parser.parse_args()
+
+    setup_django(args.db)
+
+    from django.db import connection
+    from django.test import Client as HttpClient
+    from django.test.utils import CaptureQueriesContext, setup_test_environment
+    from core.models import User
+    from core.pagination import OptionalKeysetPagination
+    from gyms.models import Gym
+
+    setup_test_environment()
+    gym = Gym.objects.create(name='Benchmark Gym')
+    print(f'Seeding {args.rows} clients, payments and expenses...')
+    seed(gym, args.rows)
+    user = User.objects.create_user('benchmark', password='benchmark', gym=gym, is_gym_admin=True)
+    http = HttpClient()
+    http.force_login(user)
+
+    failed = False
+    results = {}
+    for endpoint in ENDPOINTS:
+        counts = {}
+        for page_size in PAGE_SIZES:
+            OptionalKeysetPagination.page_size = page_size
+            for mode in ('', '?pagination=cursor'):
+                with CaptureQueriesContext(connection) as queries:
+                    response = http.get(endpoint + mode)
+                if response.status_code != 200 or len(response.json()['results']) != page_size:
+                    print(f'{endpoint + mode}: unexpected response (HTTP {response.status_code})')
+                    failed = True
+                counts.setdefault(mode, set()).add(len(queries.captured_queries))
+        OptionalKeysetPagination.page_size = 20
+
+        for mode, mode_counts in counts.items():
+            label = f"{endpoint} ({'cursor' if mode else 'page'})"
+            status = 'ok' if len(mode_counts) == 1 else 'GROWS WITH PAGE SIZE'
+            failed = failed or len(mode_counts) > 1
+            print(f'{label}: {sorted(mode_counts)} queries for page sizes {PAGE_SIZES} - {status}')
+
+        for _ in range(args.requests):
+            with timer(results, f'{endpoint} (20 rows)'):
+                http.get(endpoint)
+
+    print_report(results)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark the token-to-gym lookup behind QR verification.
+
+Scans follow a skewed distribution over the gyms (a few busy gyms get most
+scans, as at opening hours), and a random gym is saved every
+``--save-every`` scans, which drops its token from the caches:
+
+- uncached: the QR code and then its gym are read (two queries per scan)
+- shared cache: ``core.qrcodes.lookup`` with the per-process LRU disabled
+- lru + shared cache: ``core.qrcodes.lookup`` as configured
+
+    python -m benchmarks.qr_verify --gyms 500 --scans 20000
+"""
+import argparse
+import random
+
+from .utils import print_report, setup_django, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--gyms', type=int, default=500)
+    parser.add_argument('--scans', type=int, default=20000)
+    parser.add_argument('--save-every', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--db', help='SQLite file to use (default: temporary)')
+    args = parser.parse_args()
+
+    setup_django(args.db)
+
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import override_settings
+
+    from core import qrcodes
+    from core.models import QRCode
+    from gyms.models import Gym
+
+    gyms = [Gym.objects.create(name=f'QR Gym {number}') for number in range(args.gyms)]
+    tokens = [QRCode.objects.create(gym=gym).token for gym in gyms]
+
+    def uncached(token):
+        qr_code = QRCode.objects.get(token=token)
+        return qr_code.gym.id, qr_code.gym.name, qr_code.gym.is_active
+
+    rng = random.Random(args.seed)
+    weights = [1 / rank for rank in range(1, len(tokens) + 1)]
+    scans = rng.choices(range(len(tokens)), weights=weights, k=args.scans)
+
+    queries = 0
+
+    def count_queries(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    modes = [
+        ('uncached', uncached, {}),
+        ('shared cache', qrcodes.lookup, {'QR_LOOKUP_LOCAL_SIZE': 0}),
+        ('lru + shared cache', qrcodes.lookup, {}),
+    ]
+    results = {}
+    stats = {}
+    for label, lookup, overrides in modes:
+        with override_settings(**overrides):
+            cache.clear()
+            qrcodes._local_tokens.clear()
+            misses = 0
+            lookup_queries = 0
+            with connection.execute_wrapper(count_queries):
+                for number, index in enumerate(scans, 1):
+                    before = queries
+                    with timer(results, label):
+                        lookup(tokens[index])
+                    lookup_queries += queries - before
+                    misses += queries > before
+                    if args.save_every and number % args.save_every == 0:
+                        gym = gyms[rng.randrange(len(gyms))]
+                        gym.save(update_fields=['name'])
+            stats[label] = (1 - misses / len(scans), lookup_queries / len(scans))
+
+    print_report(results)
+    print()
+    for label, (hit_ratio, per_scan) in stats.items():
+        print(f'{label}: hit ratio {hit_ratio:.1%}, {per_scan:.2f} queries per scan')
+
+
+if __name__ == '__main__':
+    main()
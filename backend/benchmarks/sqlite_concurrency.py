@@ -0,0 +1,144 @@
+"""
+Benchmark concurrent reads and writes against SQLite with and without the
+connection tuning from ``settings.SQLITE_PRAGMAS``.
+
+Every worker process loops for ``--seconds``, creating payments (through the
+ORM, so ledger and cache signals run too) or reading a payment page plus its
+count, and reports how many operations it finished and how many failed with
+``database is locked``.
+
+    python -m benchmarks.sqlite_concurrency --workers 8 --seconds 10 --write-ratio 0.2
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from .utils import percentile, setup_django
+
+
+# SQLite's own defaults, i.e. what the project ran with before tuning.
+PROFILES = {
+    'default': {
+        'SQLITE_JOURNAL_MODE': 'DELETE',
+        'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_BUSY_TIMEOUT': '20000',
+        'SQLITE_MMAP_SIZE': '0',
+        'SQLITE_CACHE_SIZE': '-2000',
+        'SQLITE_TEMP_STORE': 'DEFAULT',
+    },
+    # settings.py defaults
+    'tuned': {},
+}
+
+
+def prepare(db_path, clients):
+    setup_django(db_path)
+
+    from clients.models import Client
+    from gyms.models import Gym
+
+    gym = Gym.objects.create(name='Benchmark Gym')
+    Client.objects.bulk_create([
+        Client(gym=gym, first_name=f'Client{i}', last_name='Benchmark', phone=f'+99890{i:07d}')
+        for i in range(clients)
+    ])
+
+
+def worker(db_path, seconds, write_ratio, seed, queue):
+    setup_django(db_path, migrate=False)
+
+    import datetime
+    from decimal import Decimal
+    from django.db import OperationalError
+    from clients.models import Client
+    from payments.models import Payment
+
+    rng = random.Random(seed)
+    client_ids = list(Client.objects.values_list('id', 'gym_id'))
+    payments = Payment.objects.order_by('-payment_date', '-created_at', '-id')
+    stats = {'reads': 0, 'writes': 0, 'locked': 0, 'write_latency': [], 'read_latency': []}
+
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        client_id, gym_id = rng.choice(client_ids)
+        write = rng.random() < write_ratio
+        started = time.perf_counter()
+        try:
+            if write:
+                Payment.objects.create(
+                    gym_id=gym_id,
+                    client_id=client_id,
+                    amount=Decimal('100000.00'),
+                    payment_date=datetime.date(2024, 1, 1) + datetime.timedelta(days=rng.randrange(365)),
+                )
+            else:
+                page = payments.filter(gym_id=gym_id)
+                page.count()
+                list(page[:20])
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            stats['locked'] += 1
+            continue
+        elapsed = time.perf_counter() - started
+        if write:
+            stats['writes'] += 1
+            stats['write_latency'].append(elapsed)
+        else:
+            stats['reads'] += 1
+            stats['read_latency'].append(elapsed)
+    queue.put(stats)
+
+
+def run_profile(name, args):
+    # Spawned processes read the PRAGMA settings from the environment.
+    for key in PROFILES['default']:
+        os.environ.pop(key, None)
+    os.environ.update(PROFILES[name])
+
+    context = multiprocessing.get_context('spawn')
+    db_path = os.path.join(tempfile.mkdtemp(prefix=f'fit_control_bench_{name}_'), 'db.sqlite3')
+    process = context.Process(target=prepare, args=(db_path, args.clients))
+    process.start()
+    process.join()
+
+    queue = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(db_path, args.seconds, args.write_ratio, seed, queue))
+        for seed in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    totals = {key: sum(result[key] for result in results) for key in ('reads', 'writes', 'locked')}
+    write_latency = [value for result in results for value in result['write_latency']]
+    read_latency = [value for result in results for value in result['read_latency']]
+    print(
+        f"{name:>8}  {totals['reads'] / args.seconds:>9.1f}  {totals['writes'] / args.seconds:>9.1f}  "
+        f"{totals['locked']:>7}  {percentile(read_latency, 0.99) * 1000:>10.2f}  "
+        f"{percentile(write_latency, 0.99) * 1000:>10.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--clients', type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f'{args.workers} workers, {args.seconds:g}s, {args.write_ratio:.0%} writes')
+    print(f"{'profile':>8}  {'reads/s':>9}  {'writes/s':>9}  {'locked':>7}  {'read p99':>10}  {'write p99':>10}")
+    for name in PROFILES:
+        run_profile(name, args)
+
+
+if __name__ == '__main__':
+    main()
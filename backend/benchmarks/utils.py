@@ -0,0 +1,61 @@
+"""
+Shared helpers for benchmark scripts.
+"""
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django(db_path=None, migrate=True):
+    """Point Django at a throwaway SQLite database and migrate it."""
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='fit_control_bench_'), 'db.sqlite3')
+    os.environ['DB_NAME'] = str(db_path)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fit_control.settings')
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    if migrate:
+        call_command('migrate', verbosity=0)
+    return db_path
+
+
+@contextmanager
+def timer(results, label):
+    """Append the elapsed wall time of the block to ``results[label]``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        results.setdefault(label, []).append(time.perf_counter() - started)
+
+
+def percentile(samples, fraction):
+    """Return the given percentile (0..1) of a list of samples."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def print_report(results):
+    """Print mean/p50/p99 milliseconds per label."""
+    width = max(len(label) for label in results)
+    print(f"{'':{width}}  {'runs':>6}  {'mean ms':>9}  {'p50 ms':>9}  {'p99 ms':>9}")
+    for label, samples in results.items():
+        mean = sum(samples) / len(samples)
+        print(
+            f'{label:{width}}  {len(samples):>6}  {mean * 1000:>9.3f}  '
+            f'{percentile(samples, 0.5) * 1000:>9.3f}  {percentile(samples, 0.99) * 1000:>9.3f}'
+        )
@@ -0,0 +1,20 @@
+"""
+Filters for the client list.
+"""
+import django_filters
+
+from .models import Client
+
+
+class ClientFilter(django_filters.FilterSet):
+    """``?is_active=`` and ``?gym=`` filters of the client list."""
+    is_active = django_filters.BooleanFilter(method='filter_is_active')
+    
+    class Meta:
+        model = Client
+        fields = ['is_active', 'gym']
+    
+    def filter_is_active(self, queryset, name, value):
+        # ``is_active=True`` compiles to a bare ``AND "is_active"`` on SQLite,
+        # which can't use the (gym, is_active, ...) index; ``IN`` can.
+        return queryset.filter(is_active__in=[value])
@@ -0,0 +1,290 @@
+"""
+Bulk client import from CSV and XLSX files.
+
+Rows are parsed as a stream, validated field by field and inserted with
+one ``executemany`` per batch, each in its own short write transaction.
+Phones already used in the gym (in the file or in the database) are skipped,
+so a file can be imported again after fixing the rows that were reported.
+The inserts bypass ``save()`` and signals, so the normalized phone, search
+tokens, daily ledger and statistics version are maintained here.
+"""
+import csv
+import io
+import itertools
+
+from django.core.exceptions import ValidationError
+from django.db import connections, router
+
+from core.db import retry_on_locked
+from core.utils import normalize_phone
+from gyms.ledger import add_to_ledger
+from .models import Client
+from .search import index_clients
+
+
+IMPORT_FIELDS = (
+    'first_name', 'last_name', 'phone', 'email',
+    'telegram_id', 'telegram_username', 'is_active', 'notes',
+)
+REQUIRED_COLUMNS = ('first_name', 'last_name', 'phone')
+DEFAULT_BATCH_SIZE = 1000
+CSV_DELIMITERS = ',;\t'
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y', 'ha'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n', "yo'q"}
+INVALID_PHONE_MESSAGE = 'Enter a valid phone number.'
+DUPLICATE_PHONE_MESSAGE = 'A client with this phone number already exists in this gym.'
+
+
+class ImportFormatError(ValueError):
+    """The uploaded file can't be read as a client table."""
+
+
+def column_name(header):
+    """Normalize a header cell: ``"First name"`` -> ``"first_name"``."""
+    return '_'.join(str(header or '').strip().lower().split())
+
+
+def _columns(header):
+    columns = [column_name(cell) for cell in header]
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ImportFormatError(f"Missing required columns: {', '.join(missing)}.")
+    return columns
+
+
+def _values(columns, row):
+    """Map a row's cells to the columns; cells missing from a short row are empty."""
+    values = dict.fromkeys(columns, '')
+    values.update(zip(columns, map(_cell, row)))
+    return values
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheets store phone numbers and ids typed as numbers as floats.
+        value = int(value)
+    return str(value).strip()
+
+
+def read_csv(file):
+    """Yield ``(row_number, values)`` from a binary CSV file (UTF-8, any common delimiter)."""
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        first_line = text.readline()
+        try:
+            dialect = csv.Sniffer().sniff(first_line, delimiters=CSV_DELIMITERS)
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(itertools.chain([first_line], text), dialect)
+        header = next(reader, None)
+        if not header:
+            raise ImportFormatError('The file is empty.')
+        columns = _columns(header)
+        for row_number, row in enumerate(reader, start=2):
+            if any(cell.strip() for cell in row):
+                yield row_number, _values(columns, row)
+    except UnicodeDecodeError:
+        raise ImportFormatError('CSV files must be UTF-8 encoded.')
+    except csv.Error as e:
+        raise ImportFormatError(f'Invalid CSV file: {e}')
+    finally:
+        # Leave closing the underlying file to the caller.
+        text.detach()
+
+
+def read_xlsx(file):
+    """Yield ``(row_number, values)`` from the first sheet of an XLSX workbook."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError('XLSX import requires openpyxl; upload a CSV file instead.')
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFormatError(f'Invalid XLSX file: {e}')
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            raise ImportFormatError('The file is empty.')
+        columns = _columns(header)
+        for row_number, row in enumerate(rows, start=2):
+            values = _values(columns, row)
+            if any(values.values()):
+                yield row_number, values
+    finally:
+        workbook.close()
+
+
+def read_rows(file, filename):
+    """Pick the reader for ``filename`` by its extension."""
+    if filename.lower().endswith('.xlsx'):
+        return read_xlsx(file)
+    if filename.lower().endswith(('.csv', '.txt')):
+        return read_csv(file)
+    raise ImportFormatError('Unsupported file type; upload a .csv or .xlsx file.')
+
+
+def clean_row(values):
+    """
+    Validate one row with the model field validators.
+
+    Returns ``(attrs, errors)``; ``errors`` maps field names to messages.
+    """
+    attrs = {}
+    errors = {}
+    for name in IMPORT_FIELDS:
+        if name not in values:
+            continue
+        field = Client._meta.get_field(name)
+        value = values[name]
+        if name == 'is_active':
+            lowered = value.lower()
+            if not lowered:
+                continue
+            value = True if lowered in TRUE_VALUES else False if lowered in FALSE_VALUES else value
+        elif value == '' and field.null:
+            value = None
+        try:
+            attrs[name] = field.clean(value, None)
+        except ValidationError as e:
+            errors[name] = e.messages
+
+    if 'phone' not in errors:
+        attrs['phone_normalized'] = normalize_phone(attrs['phone'])
+        if attrs['phone_normalized'] is None:
+            errors['phone'] = [INVALID_PHONE_MESSAGE]
+    return attrs, errors
+
+
+class ClientImport:
+    """
+    Import rows into one gym and collect a per-row report.
+
+    Each batch is committed on its own, so rows reported as invalid or
+    duplicate never block the valid rows around them.
+    """
+
+    def __init__(self, gym, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+        self.gym = gym
+        self.batch_size = max(batch_size, 1)
+        self.dry_run = dry_run
+        self.using = router.db_for_write(Client, instance=Client(gym=gym))
+        self.total = 0
+        self.created = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+        self.seen_phones = set()
+
+    def run(self, rows):
+        batch = []
+        for row_number, values in rows:
+            self.total += 1
+            attrs, errors = clean_row(values)
+            if not errors and attrs['phone_normalized'] in self.seen_phones:
+                self.duplicates += 1
+                errors = {'phone': [DUPLICATE_PHONE_MESSAGE]}
+            elif errors:
+                self.invalid += 1
+            if errors:
+                self.errors.append({'row': row_number, 'errors': errors})
+                continue
+
+            self.seen_phones.add(attrs['phone_normalized'])
+            batch.append((row_number, Client(gym=self.gym, **attrs)))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        self.flush(batch)
+        return self.report()
+
+    def flush(self, batch):
+        if not batch:
+            return
+        if self.dry_run:
+            existing = self.existing_phones(batch)
+            created = [client for _, client in batch if client.phone_normalized not in existing]
+        else:
+            existing, created = retry_on_locked(self.write_batch, using=self.using)(batch)
+
+        for row_number, client in batch:
+            if client.phone_normalized in existing:
+                self.duplicates += 1
+                self.errors.append({'row': row_number, 'errors': {'phone': [DUPLICATE_PHONE_MESSAGE]}})
+        self.created += len(created)
+
+    def existing_phones(self, batch):
+        # Ordered like the (gym, phone_normalized) unique index: with the
+        # model's default -registration_date ordering SQLite reads every
+        # client of the gym through client_gym_registered_idx instead.
+        return set(
+            Client.objects.using(self.using)
+            .filter(gym=self.gym, phone_normalized__in=[client.phone_normalized for _, client in batch])
+            .order_by('gym_id', 'phone_normalized')
+            .values_list('phone_normalized', flat=True)
+        )
+
+    def write_batch(self, batch):
+        """Insert the rows of ``batch`` whose phone is new to the gym."""
+        # Runs under the write lock, so no other writer can add these phones
+        # between the check and the insert.
+        existing = self.existing_phones(batch)
+        clients = [client for _, client in batch if client.phone_normalized not in existing]
+        if not clients:
+            return existing, clients
+
+        self.insert(clients)
+        index_clients(clients, using=self.using, replace=False)
+        add_to_ledger(clients, using=self.using)
+        return existing, clients
+
+    def insert(self, clients):
+        """
+        Insert new clients with one ``executemany`` and read back their ids.
+        
+        ``bulk_create`` compiles every value through the ORM, which made it
+        the slowest step of large imports. The ids are read back by phone,
+        unique in the gym, under the same write lock.
+        """
+        connection = connections[self.using]
+        quote = connection.ops.quote_name
+        fields = [field for field in Client._meta.concrete_fields if not field.primary_key]
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(Client._meta.db_table),
+            ', '.join(quote(field.column) for field in fields),
+            ', '.join(['%s'] * len(fields)),
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [
+                [field.get_db_prep_save(field.pre_save(client, True), connection) for field in fields]
+                for client in clients
+            ])
+        ids = dict(
+            Client.objects.using(self.using)
+            .filter(gym=self.gym, phone_normalized__in=[client.phone_normalized for client in clients])
+            .order_by('gym_id', 'phone_normalized')
+            .values_list('phone_normalized', 'pk')
+        )
+        for client in clients:
+            client.pk = ids[client.phone_normalized]
+            client._state.adding = False
+            client._state.db = self.using
+    
+    def report(self):
+        return {
+            'total': self.total,
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'invalid': self.invalid,
+            'dry_run': self.dry_run,
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+        }
+
+
+def import_clients(gym, rows, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """Import ``(row_number, values)`` rows into ``gym`` and return the report."""
+    return ClientImport(gym, batch_size=batch_size, dry_run=dry_run).run(rows)
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='client',
+            name='telegram_id',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True, verbose_name='Telegram ID'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['gym', '-registration_date', '-id'], name='client_gym_registered_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['gym', 'is_active', '-registration_date', '-id'], name='client_gym_active_idx'),
+        ),
+    ]
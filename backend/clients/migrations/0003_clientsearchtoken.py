@@ -0,0 +1,75 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:47
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def client_tokens(client):
+    """
+    Search tokens of a client, as ``clients.search.client_tokens`` built them
+    when this migration was written (frozen here so later changes to the
+    tokenizer don't change what this migration does).
+    """
+    tokens = set()
+    for value in (client.first_name, client.last_name):
+        tokens.update((value or '').lower().split())
+    
+    email = (client.email or '').strip().lower()
+    if email:
+        tokens.add(email)
+        tokens.add(email.split('@', 1)[0])
+    
+    digits = re.sub(r'\D', '', client.phone or '')
+    if digits:
+        tokens.add(digits)
+        if len(digits) > 9:
+            tokens.add(digits[-9:])
+    
+    return {token[:255] for token in tokens if token}
+
+
+def index_existing_clients(apps, schema_editor):
+    """Build search tokens for clients created before the index existed."""
+    Client = apps.get_model('clients', 'Client')
+    ClientSearchToken = apps.get_model('clients', 'ClientSearchToken')
+    using = schema_editor.connection.alias
+    
+    batch = []
+    for client in Client.objects.using(using).iterator(chunk_size=2000):
+        batch.extend(
+            ClientSearchToken(gym_id=client.gym_id, client_id=client.pk, token=token)
+            for token in client_tokens(client)
+        )
+        if len(batch) >= 2000:
+            ClientSearchToken.objects.using(using).bulk_create(batch)
+            batch = []
+    ClientSearchToken.objects.using(using).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0004_gym_subscription_date_indexes'),
+        ('clients', '0002_client_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=255, verbose_name='Token')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='clients.client')),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='gyms.gym')),
+            ],
+            options={
+                'verbose_name': 'Client Search Token',
+                'verbose_name_plural': 'Client Search Tokens',
+                'indexes': [models.Index(fields=['gym', 'token', 'client'], name='client_search_token_idx')],
+                'unique_together': {('client', 'token')},
+            },
+        ),
+        migrations.RunPython(index_existing_clients, migrations.RunPython.noop),
+    ]
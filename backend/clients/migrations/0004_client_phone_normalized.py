@@ -0,0 +1,76 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:49
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def normalize_phone(phone):
+    """
+    E.164 form of ``phone``, as ``core.utils.normalize_phone`` built it when
+    this migration was written (frozen here so later changes to the helper
+    don't change what this migration does).
+    """
+    digits = re.sub(r'\D', '', phone or '')
+    if digits.startswith('00'):
+        digits = digits[2:]
+    if not digits:
+        return None
+    
+    country_code = getattr(settings, 'PHONE_DEFAULT_COUNTRY_CODE', '')
+    if country_code and len(digits) == 9:
+        digits = country_code + digits
+    if len(digits) > 15:
+        return None
+    return f'+{digits}'
+
+
+def normalize_existing_phones(apps, schema_editor):
+    """
+    Fill ``phone_normalized`` for existing clients.
+    
+    When several clients of a gym normalize to the same number only the
+    oldest one gets it; the others stay NULL so the unique constraint can be
+    created, and are reported by ``manage.py normalize_client_phones``.
+    """
+    Client = apps.get_model('clients', 'Client')
+    using = schema_editor.connection.alias
+    
+    seen = set()
+    batch = []
+    for client in Client.objects.using(using).order_by('id').iterator(chunk_size=2000):
+        normalized = normalize_phone(client.phone)
+        if normalized is None or (client.gym_id, normalized) in seen:
+            continue
+        seen.add((client.gym_id, normalized))
+        client.phone_normalized = normalized
+        batch.append(client)
+        if len(batch) >= 2000:
+            Client.objects.using(using).bulk_update(batch, ['phone_normalized'])
+            batch = []
+    Client.objects.using(using).bulk_update(batch, ['phone_normalized'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0003_clientsearchtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='phone_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=16, null=True, verbose_name='Phone (E.164)'),
+        ),
+        migrations.RunPython(normalize_existing_phones, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='client',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='client',
+            constraint=models.UniqueConstraint(fields=('gym', 'phone_normalized'), name='client_gym_phone_unique'),
+        ),
+    ]
@@ -1,8 +1,22 @@
 """
 Client models.
 """
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, router, transaction
 from django.utils import timezone
+from core.sharding import TenantQuerySet
+from core.utils import normalize_phone
+
+
+class ClientQuerySet(TenantQuerySet):
+    """QuerySet for clients."""
+    
+    def by_phone(self, phone):
+        """Clients whose phone matches ``phone`` in any notation (index lookup)."""
+        normalized = normalize_phone(phone)
+        if normalized is None:
+            return self.none()
+        return self.filter(phone_normalized=normalized)
 
 
 class Client(models.Model):
@@ -11,18 +25,67 @@ class Client(models.Model):
     first_name = models.CharField(max_length=255, verbose_name='First Name')
     last_name = models.CharField(max_length=255, verbose_name='Last Name')
     phone = models.CharField(max_length=20, verbose_name='Phone')
+    phone_normalized = models.CharField(max_length=16, null=True, blank=True, editable=False, verbose_name='Phone (E.164)')
     email = models.EmailField(blank=True, verbose_name='Email')
-    telegram_id = models.BigIntegerField(null=True, blank=True, verbose_name='Telegram ID')
+    telegram_id = models.BigIntegerField(null=True, blank=True, db_index=True, verbose_name='Telegram ID')
     telegram_username = models.CharField(max_length=255, null=True, blank=True, verbose_name='Telegram Username')
     registration_date = models.DateTimeField(auto_now_add=True, verbose_name='Registration Date')
     is_active = models.BooleanField(default=True, verbose_name='Is Active')
     notes = models.TextField(blank=True, verbose_name='Notes')
     
+    objects = ClientQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Client'
         verbose_name_plural = 'Clients'
         ordering = ['-registration_date']
-        unique_together = ['gym', 'phone']
+        constraints = [
+            models.UniqueConstraint(fields=['gym', 'phone_normalized'], name='client_gym_phone_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['gym', '-registration_date', '-id'], name='client_gym_registered_idx'),
+            models.Index(fields=['gym', 'is_active', '-registration_date', '-id'], name='client_gym_active_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        client = super().from_db(db, field_names, values)
+        client._saved_phone = client.__dict__.get('phone')
+        return client
+    
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        if fields is None or 'phone' in fields:
+            self._saved_phone = self.phone
+    
+    def save(self, *args, **kwargs):
+        """
+        Save in a transaction so the ledger client count stays consistent.
+        
+        ``phone_normalized`` is only recomputed for new clients and changed
+        phones, so duplicates left unnormalized by migration 0004 can still be
+        edited. Raises ``ValidationError`` when another client of the gym
+        already has the new phone.
+        """
+        if self._state.adding or self.phone != getattr(self, '_saved_phone', None):
+            self.phone_normalized = normalize_phone(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'phone_normalized'}
+        using = kwargs.get('using') or router.db_for_write(self.__class__, instance=self)
+        try:
+            with transaction.atomic(using=using):
+                super().save(*args, **kwargs)
+        except IntegrityError:
+            duplicates = Client.objects.using(using).filter(
+                gym_id=self.gym_id, phone_normalized=self.phone_normalized,
+            ).exclude(pk=self.pk)
+            if self.phone_normalized and duplicates.exists():
+                raise ValidationError({
+                    'phone': 'A client with this phone number already exists in this gym.'
+                }) from None
+            raise
+        self._saved_phone = self.phone
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.phone})"
@@ -31,3 +94,27 @@ class Client(models.Model):
     def full_name(self):
         """Get full name."""
         return f"{self.first_name} {self.last_name}"
+
+
+class ClientSearchToken(models.Model):
+    """
+    Normalized search token of a client.
+    
+    Tokens are maintained by ``clients.signals`` whenever a client is saved,
+    and looked up by prefix through the ``(gym, token)`` index instead of
+    scanning the client table with ``LIKE '%term%'``.
+    """
+    gym = models.ForeignKey('gyms.Gym', on_delete=models.CASCADE, related_name='+')
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=255, verbose_name='Token')
+    
+    class Meta:
+        verbose_name = 'Client Search Token'
+        verbose_name_plural = 'Client Search Tokens'
+        unique_together = ['client', 'token']
+        indexes = [
+            models.Index(fields=['gym', 'token', 'client'], name='client_search_token_idx'),
+        ]
+    
+    def __str__(self):
+        return self.token
@@ -0,0 +1,155 @@
+"""
+Token-based client search.
+
+Each client is indexed as a small set of normalized tokens (name words,
+email, phone digits) stored in ``ClientSearchToken``. A search term matches a
+client when it is a prefix of one of its tokens; the prefix test is expressed
+as a ``token >= term AND token < next(term)`` range so it is answered from the
+``(gym, token)`` index on any database.
+"""
+import re
+
+from django.db import connections, router, transaction
+from django.db.models.constants import OnConflict
+from rest_framework import filters
+
+from .models import ClientSearchToken
+
+
+PHONE_TERM_RE = re.compile(r'^\+?[\d\s\-()]{3,}$')
+LOCAL_PHONE_DIGITS = 9
+MAX_TOKEN_LENGTH = 255
+
+
+def normalize_term(term):
+    """Normalize a user-entered search term to token form."""
+    term = term.strip().lower()
+    if PHONE_TERM_RE.match(term):
+        return re.sub(r'\D', '', term)
+    return term[:MAX_TOKEN_LENGTH]
+
+
+def client_tokens(client):
+    """Return the set of search tokens for a client."""
+    tokens = set()
+    for value in (client.first_name, client.last_name):
+        tokens.update((value or '').lower().split())
+
+    email = (client.email or '').strip().lower()
+    if email:
+        tokens.add(email)
+        tokens.add(email.split('@', 1)[0])
+
+    digits = re.sub(r'\D', '', client.phone or '')
+    if digits:
+        tokens.add(digits)
+        # Also index the local number so "901234567" finds "+998 90 123 45 67".
+        if len(digits) > LOCAL_PHONE_DIGITS:
+            tokens.add(digits[-LOCAL_PHONE_DIGITS:])
+
+    return {token[:MAX_TOKEN_LENGTH] for token in tokens if token}
+
+
+def index_clients(clients, using=None, replace=True):
+    """
+    (Re)build the search tokens of the given saved clients in bulk.
+
+    ``replace=False`` skips deleting existing tokens, for freshly inserted rows.
+    The clients need their primary keys.
+    """
+    clients = list(clients)
+    if not clients:
+        return
+    using = using or router.db_for_write(ClientSearchToken, instance=clients[0])
+    with transaction.atomic(using=using):
+        if replace:
+            ClientSearchToken.objects.using(using).filter(
+                client__in=[client.pk for client in clients]
+            ).delete()
+        insert_tokens(
+            [
+                (client.gym_id, client.pk, token)
+                for client in clients
+                for token in client_tokens(client)
+            ],
+            using,
+        )
+
+
+def insert_tokens(rows, using):
+    """
+    Insert ``(gym_id, client_id, token)`` rows, skipping existing ones.
+
+    One ``executemany`` of an ``INSERT`` ignoring conflicts: building a
+    model instance and compiling its SQL per token made ``bulk_create`` the
+    slowest step of bulk client imports.
+    """
+    if not rows:
+        return
+    connection = connections[using]
+    ops = connection.ops
+    meta = ClientSearchToken._meta
+    fields = [meta.get_field(name) for name in ('gym', 'client', 'token')]
+    columns = ', '.join(ops.quote_name(field.column) for field in fields)
+    sql = (
+        f'{ops.insert_statement(on_conflict=OnConflict.IGNORE)} {ops.quote_name(meta.db_table)} '
+        f'({columns}) VALUES (%s, %s, %s) '
+        f'{ops.on_conflict_suffix_sql(fields, OnConflict.IGNORE, None, None)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def prefix_range(prefix):
+    """
+    Return ``(low, high)`` such that ``low <= s < high`` iff ``s`` starts with
+    ``prefix``; ``high`` is None when there is no upper bound.
+    """
+    last = ord(prefix[-1])
+    if last >= 0x10FFFF:
+        return prefix, None
+    return prefix, prefix[:-1] + chr(last + 1)
+
+
+def matching_client_ids(term, gym_id=None):
+    """Subquery of client ids having a token that starts with ``term``."""
+    low, high = prefix_range(term)
+    tokens = ClientSearchToken.objects.filter(token__gte=low)
+    if high is not None:
+        tokens = tokens.filter(token__lt=high)
+    if gym_id is not None:
+        tokens = tokens.filter(gym_id=gym_id)
+    return tokens.values('client_id')
+
+
+class ClientSearchFilter(filters.SearchFilter):
+    """
+    Search backend resolving ``?search=`` through the client token index.
+
+    Every whitespace/comma separated term must match a prefix of one of the
+    client's name words, email or phone digits. Views set
+    ``search_client_field`` to the path of the client id on their model
+    (``'pk'`` for clients, ``'client'`` for payments).
+    """
+
+    def get_search_terms(self, request):
+        """Keep a spaced-out phone number such as ``+998 90 123`` as one term."""
+        params = request.query_params.get(self.search_param, '').replace('\x00', '')
+        if PHONE_TERM_RE.match(params.strip()):
+            return [params]
+        return super().get_search_terms(request)
+
+    def filter_queryset(self, request, queryset, view):
+        terms = [normalize_term(term) for term in self.get_search_terms(request)]
+        terms = [term for term in terms if term]
+        if not terms:
+            return queryset
+
+        client_field = getattr(view, 'search_client_field', 'pk')
+        user = request.user
+        gym_id = None if user.is_superuser else getattr(user, 'gym_id', None)
+        for term in terms:
+            queryset = queryset.filter(**{
+                f'{client_field}__in': matching_client_ids(term, gym_id)
+            })
+        return queryset
@@ -1,7 +1,11 @@
 """
 Serializers for client models.
 """
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
+from core.serializers import ValuesListSerializer
+from core.sharding import shard_for_gym
+from core.utils import normalize_phone
 from .models import Client
 
 
@@ -14,7 +18,52 @@ class ClientSerializer(serializers.ModelSerializer):
         model = Client
         fields = [
             'id', 'gym', 'gym_name', 'first_name', 'last_name', 'full_name',
-            'phone', 'email', 'telegram_id', 'telegram_username',
+            'phone', 'phone_normalized', 'email', 'telegram_id', 'telegram_username',
             'registration_date', 'is_active', 'notes'
         ]
-        read_only_fields = ['id', 'registration_date']
+        read_only_fields = ['id', 'phone_normalized', 'registration_date']
+    
+    def validate_phone(self, value):
+        """Reject phone numbers without any digits."""
+        if normalize_phone(value) is None:
+            raise serializers.ValidationError('Enter a valid phone number.')
+        return value
+    
+    def validate(self, attrs):
+        """Reject a new or changed phone already used in the gym, in any notation."""
+        gym = attrs.get('gym') or getattr(self.instance, 'gym', None)
+        request = self.context.get('request')
+        if gym is None and request is not None and not request.user.is_superuser:
+            gym = request.user.gym
+        phone = attrs.get('phone', getattr(self.instance, 'phone', None))
+        changed = self.instance is None or phone != self.instance.phone or gym.pk != self.instance.gym_id
+        if gym is not None and phone and changed:
+            # Superusers may name any gym; read from that gym's shard.
+            duplicates = Client.objects.using(shard_for_gym(gym.pk)).filter(gym=gym).by_phone(phone)
+            if self.instance is not None:
+                duplicates = duplicates.exclude(pk=self.instance.pk)
+            if duplicates.exists():
+                raise serializers.ValidationError({
+                    'phone': 'A client with this phone number already exists in this gym.'
+                })
+        return attrs
+    
+    def save(self, **kwargs):
+        """Report phone collisions caught by ``Client.save`` as a 400."""
+        try:
+            return super().save(**kwargs)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.message_dict)
+
+
+class ClientListSerializer(ValuesListSerializer):
+    """Lean list representation of clients."""
+    serializer_class = ClientSerializer
+    lookups = {
+        'gym': 'gym_id',
+        'gym_name': 'gym__name',
+    }
+    extra_lookups = ['first_name', 'last_name']
+    
+    def get_full_name(self, row):
+        return f"{row['first_name']} {row['last_name']}"
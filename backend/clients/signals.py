@@ -0,0 +1,21 @@
+"""
+Signal handlers keeping the client search index in sync.
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Client
+from .search import index_clients
+
+
+SEARCH_FIELDS = {'gym', 'first_name', 'last_name', 'phone', 'email'}
+
+
+@receiver(post_save, sender=Client)
+def update_search_tokens(sender, instance, created, raw=False, using=None, update_fields=None, **kwargs):
+    """Re-tokenize a client whenever one of its searchable fields is saved."""
+    if raw:
+        return
+    if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    index_clients([instance], using=using, replace=not created)
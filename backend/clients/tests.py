@@ -0,0 +1,169 @@
+"""
+Tests for the clients app.
+"""
+import io
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+
+from core.sharding import activate_gym, deactivate_gym
+from core.testing import ListQueryCountAssertions, QueryPlanAssertions, create_gym, gym_admin_client
+from gyms.models import DailyLedger
+from .importer import import_clients, read_csv
+from .models import Client, ClientSearchToken
+
+
+class ClientListQueryTests(QueryPlanAssertions, ListQueryCountAssertions, TestCase):
+    """
+    The gym admin's client list and filters read through the gym indexes, in a
+    number of queries that doesn't grow with the page size.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.gym = create_gym(name='Plan Gym')
+        other = create_gym(name='Other Gym')
+        for gym in (cls.gym, other):
+            for number in range(10):
+                Client.objects.create(
+                    gym=gym,
+                    first_name='Client',
+                    last_name=str(number),
+                    phone=f'+99890123450{number}',
+                    telegram_id=gym.pk * 100 + number,
+                    is_active=number % 2 == 0,
+                )
+
+    def setUp(self):
+        self.client = gym_admin_client(self.gym)
+
+    def test_list(self):
+        self.assertIndexed('/api/clients/', 'clients_client', 'client_gym_registered_idx')
+
+    def test_list_query_count(self):
+        self.assertListQueries('/api/clients/', 2, 1)
+
+    def test_filter_by_active(self):
+        self.assertIndexed('/api/clients/?is_active=true', 'clients_client', 'client_gym_active_idx')
+        self.assertIndexed('/api/clients/?is_active=false', 'clients_client', 'client_gym_active_idx')
+
+    def test_filter_by_active_returns_matching_clients(self):
+        response = self.client.get('/api/clients/?is_active=false')
+        self.assertEqual(response.data['count'], 5)
+        self.assertTrue(all(not row['is_active'] for row in response.data['results']))
+
+    def test_telegram_id_lookup(self):
+        plan = Client.objects.filter(telegram_id=101).explain()
+        self.assertIn('clients_client_telegram_id', plan)
+
+
+class DuplicatePhoneTests(TestCase):
+    """
+    Duplicates left unnormalized by migration 0004 stay editable, and taking
+    a phone already used in the gym fails validation, not with a 500.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        self.gym = create_gym(name='Phone Gym')
+        self.addCleanup(deactivate_gym, activate_gym(self.gym.pk))
+        Client.objects.create(gym=self.gym, first_name='Ali', last_name='Valiyev', phone='+998901234567')
+        self.duplicate = Client.objects.create(gym=self.gym, first_name='Ali', last_name='Second', phone='901234568')
+        Client.objects.filter(pk=self.duplicate.pk).update(phone='90 123 45 67', phone_normalized=None)
+        self.duplicate.refresh_from_db()
+
+    def test_legacy_duplicate_can_be_edited(self):
+        self.duplicate.is_active = False
+        self.duplicate.save()
+        client = Client.objects.get(pk=self.duplicate.pk)
+        self.assertFalse(client.is_active)
+        self.assertIsNone(client.phone_normalized)
+
+    def test_api_update_of_legacy_duplicate(self):
+        response = gym_admin_client(self.gym).patch(
+            f'/api/clients/{self.duplicate.pk}/', {'notes': 'Duplicate'}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        client = Client.objects.get(pk=self.duplicate.pk)
+        self.assertEqual(client.notes, 'Duplicate')
+        self.assertIsNone(client.phone_normalized)
+
+    def test_changing_to_a_used_phone_raises_validation_error(self):
+        self.duplicate.phone = '+998 90 123 45 67'
+        with self.assertRaises(ValidationError) as raised:
+            self.duplicate.save()
+        self.assertIn('phone', raised.exception.message_dict)
+        self.assertIsNone(Client.objects.get(pk=self.duplicate.pk).phone_normalized)
+
+    def test_api_change_to_a_used_phone_is_rejected(self):
+        response = gym_admin_client(self.gym).patch(
+            f'/api/clients/{self.duplicate.pk}/', {'phone': '998901234567'}, format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('phone', response.data)
+
+    def test_changing_to_a_new_phone_normalizes_it(self):
+        self.duplicate.phone = '90 123 45 68'
+        self.duplicate.save()
+        self.assertEqual(Client.objects.get(pk=self.duplicate.pk).phone_normalized, '+998901234568')
+
+
+class ClientImportTests(TestCase):
+    """Bulk imports report bad and duplicate rows and index the clients they create."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.gym = create_gym(name='Import Gym')
+        self.addCleanup(deactivate_gym, activate_gym(self.gym.pk))
+        Client.objects.create(gym=self.gym, first_name='Ali', last_name='Valiyev', phone='+998901234567')
+
+    def run_import(self, text, batch_size=2):
+        return import_clients(self.gym, read_csv(io.BytesIO(text.encode('utf-8'))), batch_size=batch_size)
+
+    def test_short_row_is_reported_as_invalid(self):
+        upload = SimpleUploadedFile('clients.csv', b'first_name,last_name,phone\nX,Y\nVali,Aliyev,+998901234500\n')
+        response = gym_admin_client(self.gym).post('/api/clients/import/', {'file': upload})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['invalid']), (1, 1))
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+        self.assertIn('phone', response.data['errors'][0]['errors'])
+
+    def test_invalid_rows_are_reported(self):
+        report = self.run_import(
+            'first_name,last_name,phone,email\n'
+            'Vali,Aliyev,not a phone,\n'
+            ',Aliyev,+998901234500,\n'
+            'Vali,Aliyev,+998901234501,not an email\n'
+        )
+        self.assertEqual((report['created'], report['invalid']), (0, 3))
+        self.assertEqual(
+            [(error['row'], sorted(error['errors'])) for error in report['errors']],
+            [(2, ['phone']), (3, ['first_name']), (4, ['email'])],
+        )
+
+    def test_duplicate_phones_are_skipped(self):
+        report = self.run_import(
+            'first_name,last_name,phone\n'
+            'Ali,Again,90 123 45 67\n'
+            'Vali,Aliyev,+998901234500\n'
+            'Vali,Twice,901234500\n'
+            'Soli,Karimov,+998901234501\n'
+        )
+        self.assertEqual((report['created'], report['duplicates']), (2, 2))
+        self.assertEqual([error['row'] for error in report['errors']], [2, 4])
+        self.assertEqual(
+            sorted(Client.objects.filter(gym=self.gym).values_list('phone_normalized', flat=True)),
+            ['+998901234500', '+998901234501', '+998901234567'],
+        )
+
+    def test_created_clients_are_indexed_and_counted(self):
+        self.run_import(
+            'first_name,last_name,phone\n'
+            'Vali,Aliyev,+998901234500\n'
+            'Soli,Karimov,+998901234501\n'
+            'Gani,Rahimov,+998901234502\n'
+        )
+        client = Client.objects.get(gym=self.gym, phone_normalized='+998901234502')
+        self.assertIn('rahimov', ClientSearchToken.objects.filter(client=client).values_list('token', flat=True))
+        self.assertEqual(DailyLedger.objects.filter(gym=self.gym).totals()['clients_count'], 4)
@@ -1,30 +1,51 @@
 """
 API views for client management.
 """
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from core.mixins import CSVExportMixin, ShardedTenantMixin, ValuesListMixin
+from core.pagination import OptionalKeysetPagination
+from gyms.models import Gym
+from .filters import ClientFilter
+from .importer import ImportFormatError, import_clients, read_rows
 from .models import Client
-from .serializers import ClientSerializer
+from .search import ClientSearchFilter
+from .serializers import ClientListSerializer, ClientSerializer
 
 
-class ClientViewSet(viewsets.ModelViewSet):
+class ClientViewSet(ShardedTenantMixin, CSVExportMixin, ValuesListMixin, viewsets.ModelViewSet):
     """ViewSet for client management."""
     serializer_class = ClientSerializer
+    list_serializer_class = ClientListSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['is_active', 'gym']
+    filter_backends = [DjangoFilterBackend, ClientSearchFilter, filters.OrderingFilter]
+    filterset_class = ClientFilter
     search_fields = ['first_name', 'last_name', 'phone', 'email']
+    search_client_field = 'pk'
     ordering_fields = ['registration_date', 'first_name', 'last_name']
-    ordering = ['-registration_date']
+    ordering = ['-registration_date', '-id']
+    pagination_class = OptionalKeysetPagination
+    export_filename = 'clients'
+    token_scope = 'clients'
+    gym_body_actions = ('import_file',)
     
     def get_queryset(self):
-        """Get clients for current user's gym."""
+        """Get clients for current user's gym, optionally by exact ``?phone=``."""
         if self.request.user.is_superuser:
-            return Client.objects.all()
-        elif self.request.user.is_gym_admin and self.request.user.gym:
-            return Client.objects.filter(gym=self.request.user.gym)
-        return Client.objects.none()
+            queryset = Client.objects.select_related('gym')
+        elif self.request.user.is_gym_admin and self.request.user.gym_id:
+            queryset = Client.objects.filter(gym_id=self.request.user.gym_id).select_related('gym')
+        else:
+            return Client.objects.none()
+        
+        phone = self.request.query_params.get('phone')
+        if phone:
+            queryset = queryset.by_phone(phone)
+        return queryset
     
     def perform_create(self, serializer):
         """Set gym when creating client."""
@@ -32,3 +53,47 @@ class ClientViewSet(viewsets.ModelViewSet):
             serializer.save(gym=self.request.user.gym)
         else:
             serializer.save()
+    
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_file(self, request):
+        """Create clients in bulk from an uploaded CSV or XLSX ``file``."""
+        try:
+            if request.user.is_superuser:
+                gym_id = str(request.data.get('gym', ''))
+                gym = Gym.objects.filter(pk=gym_id).first() if gym_id.isdigit() else None
+                if gym is None:
+                    return Response(
+                        {'error': 'gym is required.'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+            elif request.user.is_gym_admin and request.user.gym:
+                gym = request.user.gym
+            else:
+                return Response(
+                    {'error': 'Only gym admins can import clients.'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response(
+                    {'error': 'file is required.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+            report = import_clients(gym, read_rows(upload, upload.name), dry_run=dry_run)
+            return Response(
+                report,
+                status=status.HTTP_201_CREATED if report['created'] and not dry_run else status.HTTP_200_OK
+            )
+        except ImportFormatError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': f'Error importing clients: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -4,3 +4,29 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+    
+    def ready(self):
+        from django.core import checks
+        from django.core.signals import request_started
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_migrate, post_save
+        from .checks import check_session_cache
+        from .db import configure_sqlite
+        from .qrcodes import forget_gym_qr_codes, forget_qr_code
+        from .routers import reset_read_after_write
+        from .sharding import delete_gym_shard_data, seed_shard_sequences, sync_gym_shard
+        from .tenancy import forget_user_context
+        from .throttling import check_rates
+        
+        check_rates()
+        checks.register(check_session_cache, checks.Tags.security)
+        connection_created.connect(configure_sqlite, dispatch_uid='core.db.configure_sqlite')
+        request_started.connect(reset_read_after_write, dispatch_uid='core.routers.reset_read_after_write')
+        post_save.connect(sync_gym_shard, sender='gyms.Gym', dispatch_uid='core.sharding.sync_gym_shard')
+        post_delete.connect(delete_gym_shard_data, sender='gyms.Gym', dispatch_uid='core.sharding.delete_gym_shard_data')
+        post_migrate.connect(seed_shard_sequences, dispatch_uid='core.sharding.seed_shard_sequences')
+        post_save.connect(forget_user_context, sender='core.User', dispatch_uid='core.tenancy.forget_user_context')
+        post_delete.connect(forget_user_context, sender='core.User', dispatch_uid='core.tenancy.forget_user_context')
+        post_save.connect(forget_qr_code, sender='core.QRCode', dispatch_uid='core.qrcodes.forget_qr_code')
+        post_delete.connect(forget_qr_code, sender='core.QRCode', dispatch_uid='core.qrcodes.forget_qr_code')
+        post_save.connect(forget_gym_qr_codes, sender='gyms.Gym', dispatch_uid='core.qrcodes.forget_gym_qr_codes')
@@ -0,0 +1,70 @@
+"""
+Custom authentication classes.
+"""
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from .tenancy import load_gym
+from .tokens import TOKEN_KEYWORD, InvalidApiToken, read_token
+
+
+class ApiTokenUser:
+    """
+    ``request.user`` of a token-authenticated request.
+
+    Acts as an admin of the token's gym; it has no database row.
+    """
+    pk = None
+    id = None
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+    is_staff = False
+    is_superuser = False
+    is_gym_admin = True
+
+    def __init__(self, token):
+        self.token = token
+        self.gym_id = token.gym_id
+        self.username = f'token:{token.name}' if token.name else 'token'
+
+    def __str__(self):
+        return self.username
+
+    def get_username(self):
+        return self.username
+
+    @property
+    def gym(self):
+        if not hasattr(self, '_gym'):
+            self._gym = load_gym(self.gym_id)
+        return self._gym
+
+
+class ApiTokenAuthentication(BaseAuthentication):
+    """
+    ``Authorization: Bearer <token>`` with a signed token from ``core.tokens``.
+
+    The token must allow ``<view.token_scope>.<view.action>``; views without
+    a ``token_scope`` refuse tokens.
+    """
+    keyword = TOKEN_KEYWORD
+
+    def authenticate(self, request):
+        header = get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        try:
+            token = read_token(header[1].decode())
+        except (InvalidApiToken, UnicodeError) as e:
+            raise exceptions.AuthenticationFailed(str(e))
+
+        view = request.parser_context.get('view')
+        action = getattr(view, 'action', None) or request.method.lower()
+        if not token.allows(getattr(view, 'token_scope', None), action):
+            raise exceptions.PermissionDenied('This token does not allow this action.')
+        return ApiTokenUser(token), token
+
+    def authenticate_header(self, request):
+        return self.keyword
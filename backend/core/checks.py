@@ -0,0 +1,22 @@
+"""
+System checks for settings the app can't run safely with.
+"""
+from django.conf import settings
+from django.core import checks
+
+
+def check_session_cache(app_configs, **kwargs):
+    """``core.sessions`` needs a cache shared by all worker processes."""
+    if settings.SESSION_ENGINE != 'core.sessions' or settings.CACHE_SHARED:
+        return []
+    return [
+        checks.Error(
+            'SESSION_ENGINE=core.sessions needs a cache shared by all worker processes.',
+            hint=(
+                'With a per-process cache, a logout only clears the session in the worker '
+                'that handled it. Configure a shared CACHE_BACKEND, set CACHE_SHARED=True '
+                'for a single process, or use django.contrib.sessions.backends.db.'
+            ),
+            id='core.E001',
+        )
+    ]
@@ -0,0 +1,176 @@
+"""
+Database connection setup, write transactions and bulk inserts.
+"""
+import logging
+import random
+import re
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+PRAGMA_VALUE_RE = re.compile(r'^-?\w+$')
+WRITE_RETRIES_KEY = 'db:write:retries'
+WRITE_FAILURES_KEY = 'db:write:failures'
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Apply ``settings.SQLITE_PRAGMAS`` to a freshly opened SQLite connection.
+    
+    Connected to ``connection_created`` in ``CoreConfig.ready()``; other
+    database backends are left untouched.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            value = str(value).strip()
+            if not value:
+                continue
+            if not PRAGMA_VALUE_RE.match(value):
+                logger.warning(f"Ignoring invalid SQLite PRAGMA {name}={value!r}")
+                continue
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_locked_error(exc):
+    """Whether an ``OperationalError`` is SQLite lock contention."""
+    message = str(exc).lower()
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+@contextmanager
+def immediate_atomic(using=None):
+    """
+    ``transaction.atomic()`` that takes the SQLite write lock up front.
+    
+    Django opens SQLite transactions with a deferred ``BEGIN``, so a
+    transaction that reads before writing can fail with ``database is
+    locked`` when it upgrades to a writer, without waiting for
+    ``busy_timeout``. ``BEGIN IMMEDIATE`` queues for the lock at the start
+    instead. Nested blocks and other backends behave like ``atomic()``.
+    
+    The outermost transaction is managed through Django's documented manual
+    transaction API: autocommit is turned off, ``BEGIN IMMEDIATE`` is issued
+    explicitly and the block is committed or rolled back on exit, with
+    ``atomic()`` inside for savepoints and ``on_commit()`` hooks.
+    """
+    connection = transaction.get_connection(using)
+    if connection.vendor != 'sqlite' or connection.in_atomic_block or not connection.get_autocommit():
+        with transaction.atomic(using=using):
+            yield
+        return
+    
+    transaction.set_autocommit(False, using=using)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('BEGIN IMMEDIATE')
+        with transaction.atomic(using=using):
+            yield
+        transaction.commit(using=using)
+    except BaseException:
+        transaction.rollback(using=using)
+        raise
+    finally:
+        transaction.set_autocommit(True, using=using)
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def retry_on_locked(func=None, *, using=None, attempts=None):
+    """
+    Run ``func`` in a short ``BEGIN IMMEDIATE`` transaction, retrying with
+    jittered exponential backoff while the database is locked.
+    
+    Usable as ``@retry_on_locked`` or ``retry_on_locked(func)(*args)``. The
+    call is not retried when it already runs inside an outer transaction,
+    since that transaction has to be rolled back as a whole.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            connection = transaction.get_connection(using)
+            max_attempts = attempts or settings.DB_WRITE_RETRY_ATTEMPTS
+            attempt = 1
+            while True:
+                nested = connection.in_atomic_block
+                try:
+                    with immediate_atomic(using=using):
+                        return func(*args, **kwargs)
+                except OperationalError as e:
+                    if nested or not is_locked_error(e):
+                        raise
+                    if attempt >= max_attempts:
+                        _count(WRITE_FAILURES_KEY)
+                        logger.error(f"{func.__qualname__}: database still locked after {attempt} attempts")
+                        raise
+                    _count(WRITE_RETRIES_KEY)
+                    delay = min(
+                        settings.DB_WRITE_RETRY_MAX_DELAY,
+                        settings.DB_WRITE_RETRY_BASE_DELAY * 2 ** (attempt - 1),
+                    )
+                    logger.warning(f"{func.__qualname__}: database is locked, retry {attempt}/{max_attempts - 1}")
+                    time.sleep(random.uniform(0, delay))
+                    attempt += 1
+        return wrapper
+    
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def write_retry_counters():
+    """Lock-contention counters shared by all workers using the same cache."""
+    counters = cache.get_many([WRITE_RETRIES_KEY, WRITE_FAILURES_KEY])
+    return {
+        'retries': counters.get(WRITE_RETRIES_KEY, 0),
+        'failures': counters.get(WRITE_FAILURES_KEY, 0),
+    }
+
+
+def auto_timestamp_fields(model):
+    """Fields that ``bulk_create`` would overwrite with the current time."""
+    return [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+
+
+def bulk_insert(model, objects, using):
+    """
+    ``bulk_create`` that keeps the objects' ``auto_now``/``auto_now_add`` values.
+    
+    ``bulk_create`` stamps the current time; the original values are written
+    back with one ``executemany`` (``bulk_update``'s ``CASE`` expressions are
+    far slower).
+    """
+    fields = auto_timestamp_fields(model)
+    timestamps = [[getattr(obj, field.attname) for field in fields] for obj in objects]
+    model._base_manager.using(using).bulk_create(objects)
+    if not fields or not objects:
+        return
+    
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    assignments = ', '.join(f'{quote(field.column)} = %s' for field in fields)
+    sql = f'UPDATE {quote(model._meta.db_table)} SET {assignments} WHERE {quote(model._meta.pk.column)} = %s'
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            [field.get_db_prep_save(value, connection) for field, value in zip(fields, values)] + [obj.pk]
+            for obj, values in zip(objects, timestamps)
+        ])
+    for obj, values in zip(objects, timestamps):
+        for field, value in zip(fields, values):
+            setattr(obj, field.attname, value)
@@ -1,33 +1,98 @@
 """
 Management command to check and block expired subscriptions.
 """
-from django.core.management.base import BaseCommand
+import time
+from datetime import datetime, time as dt_time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from core.db import retry_on_locked
 from gyms.models import Gym
 
 
 class Command(BaseCommand):
     help = 'Check and block gyms with expired subscriptions'
-    
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report gyms that would be blocked without changing anything.',
+        )
+        parser.add_argument(
+            '--since',
+            help=(
+                'Only consider gyms whose trial or subscription ended at or after '
+                'this ISO date/datetime (e.g. 2024-05-01 or 2024-05-01T09:00).'
+            ),
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of gyms read and blocked per transaction.',
+        )
+
+    def parse_since(self, value):
+        """Parse the --since option into an aware datetime."""
+        since = parse_datetime(value)
+        if since is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f'Invalid --since value: {value!r}')
+            since = datetime.combine(day, dt_time.min)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
+
     def handle(self, *args, **options):
-        """Check all gyms and block expired ones."""
+        """Block expired gyms in small keyset-paginated batches."""
+        started = time.monotonic()
+        dry_run = options['dry_run']
+        action = 'Would block' if dry_run else 'Blocked'
+        batch_size = max(options['batch_size'], 1)
+        now = timezone.now()
+
+        candidates = Gym.objects.expired(now).filter(is_active=True)
+        if options['since']:
+            since = self.parse_since(options['since'])
+            candidates = candidates.filter(
+                Q(trial_end_date__gte=since) | Q(subscription_end_date__gte=since)
+            )
+
+        scanned_count = 0
         blocked_count = 0
-        checked_count = 0
-        
-        for gym in Gym.objects.all():
-            checked_count += 1
-            status = gym.subscription_status
-            
-            if status == 'expired' and gym.is_active:
-                gym.is_active = False
-                gym.save()
-                blocked_count += 1
+        last_id = 0
+        while True:
+            batch = list(
+                candidates.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', 'name')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            scanned_count += len(batch)
+
+            if not dry_run:
+                # One short write transaction per batch; re-check expiry so
+                # gyms renewed since they were read are left alone.
+                blocked_count += retry_on_locked(
+                    candidates.filter(id__in=[gym_id for gym_id, _ in batch]).block
+                )()
+
+            for gym_id, name in batch:
                 self.stdout.write(
-                    self.style.WARNING(f'Blocked gym: {gym.name} (ID: {gym.id})')
+                    self.style.WARNING(f'{action} gym: {name} (ID: {gym_id})')
                 )
-        
+
+        elapsed = time.monotonic() - started
         self.stdout.write(
             self.style.SUCCESS(
-                f'Checked {checked_count} gyms. Blocked {blocked_count} expired gyms.'
+                f'Scanned {scanned_count} expired active gyms, '
+                f'{action.lower()} {scanned_count if dry_run else blocked_count} '
+                f'in {elapsed:.2f}s.'
             )
         )
@@ -0,0 +1,35 @@
+"""
+Management command to export one gym and all of its data to an archive.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.tenant_archive import export_tenant
+from gyms.models import Gym
+
+
+class Command(BaseCommand):
+    help = 'Export a gym with its users, QR code, clients, payments and expenses to a .jsonl.gz archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gym', type=int, required=True, help='Gym ID to export.')
+        parser.add_argument(
+            '--output',
+            help='Archive path (default: gym-<id>-<date>.jsonl.gz).',
+        )
+
+    def handle(self, *args, **options):
+        """Stream the gym's rows into the archive."""
+        try:
+            gym = Gym.objects.get(pk=options['gym'])
+        except Gym.DoesNotExist:
+            raise CommandError(f"Gym {options['gym']} does not exist.")
+
+        path = options['output'] or f'gym-{gym.pk}-{timezone.localdate():%Y%m%d}.jsonl.gz'
+        try:
+            with open(path, 'wb') as file:
+                counts = export_tenant(gym, file)
+        except OSError as e:
+            raise CommandError(str(e))
+
+        summary = ', '.join(f'{count} {label}' for label, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Exported gym {gym.name} (ID: {gym.pk}) to {path}: {summary}'))
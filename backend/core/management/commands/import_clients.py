@@ -0,0 +1,68 @@
+"""
+Management command to import a gym's clients from a CSV or XLSX file.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from clients.importer import DEFAULT_BATCH_SIZE, ImportFormatError, import_clients, read_rows
+from gyms.models import Gym
+
+
+class Command(BaseCommand):
+    help = 'Bulk import clients into a gym from a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file with first_name, last_name and phone columns.')
+        parser.add_argument('--gym', type=int, required=True, help='Gym ID to import into.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Number of rows inserted per transaction.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate the file and report without creating clients.',
+        )
+        parser.add_argument(
+            '--report',
+            help='Write the per-row error report to this JSON file.',
+        )
+
+    def handle(self, *args, **options):
+        """Stream the file into the gym and print the outcome."""
+        try:
+            gym = Gym.objects.get(pk=options['gym'])
+        except Gym.DoesNotExist:
+            raise CommandError(f"Gym {options['gym']} does not exist.")
+
+        try:
+            with open(options['path'], 'rb') as file:
+                report = import_clients(
+                    gym,
+                    read_rows(file, options['path']),
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                )
+        except (OSError, ImportFormatError) as e:
+            raise CommandError(str(e))
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        else:
+            for error in report['errors']:
+                messages = '; '.join(
+                    f"{field}: {' '.join(field_messages)}"
+                    for field, field_messages in error['errors'].items()
+                )
+                self.stdout.write(self.style.WARNING(f"Row {error['row']}: {messages}"))
+
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {report['created']} of {report['total']} clients in {gym.name} "
+                f"({report['duplicates']} duplicates, {report['invalid']} invalid)."
+            )
+        )
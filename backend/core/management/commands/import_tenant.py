@@ -0,0 +1,32 @@
+"""
+Management command to import a gym from a tenant archive.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from core.tenant_archive import CHUNK_SIZE, TenantArchiveError, import_tenant
+
+
+class Command(BaseCommand):
+    help = 'Create a new gym from a .jsonl.gz archive written by export_tenant'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archive to import.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Rows inserted per bulk insert.',
+        )
+
+    def handle(self, *args, **options):
+        """Insert the archived rows under new ids."""
+        try:
+            with open(options['path'], 'rb') as file:
+                tenant_import = import_tenant(file, batch_size=options['batch_size'])
+        except (OSError, TenantArchiveError) as e:
+            raise CommandError(str(e))
+
+        for warning in tenant_import.warnings:
+            self.stdout.write(self.style.WARNING(warning))
+        gym = tenant_import.gym
+        summary = ', '.join(f'{count} {label}' for label, count in tenant_import.counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Imported gym {gym.name} as ID {gym.pk}: {summary}'))
@@ -0,0 +1,153 @@
+"""
+Management command to move gyms' tenant data between databases.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from clients.models import Client, ClientSearchToken
+from core.db import bulk_insert
+from core.sharding import default_shard, forget_gym_shard, mirror_gym, shard_aliases
+from expenses.models import Expense
+from gyms.cache import bump_data_version
+from gyms.models import DailyLedger, Gym
+from payments.models import Payment
+
+# Parents before children, so foreign keys resolve on insert.
+TENANT_MODELS = [Client, ClientSearchToken, Payment, Expense, DailyLedger]
+
+
+class Command(BaseCommand):
+    help = "Move gyms' clients, payments, expenses and ledger to another database shard"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--gym',
+            type=int,
+            action='append',
+            dest='gym_ids',
+            help='Gym ID to move (can be repeated).',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Move every gym that is not on its target database yet.',
+        )
+        parser.add_argument(
+            '--to',
+            help='Target database alias (default: shard_<gym id % shard count>).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows copied per insert.',
+        )
+        parser.add_argument(
+            '--wait',
+            type=int,
+            help=(
+                'Seconds to wait for the workers to see a gym become read-only, '
+                'and then moved (default: DB_SHARD_MAP_TTL + 1).'
+            ),
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be moved.',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Copy each gym's rows to the target, switch its shard, then delete the
+        source rows. The gym's writes are refused while its rows are copied.
+        """
+        aliases = shard_aliases()
+        if not aliases:
+            raise CommandError('Sharding is not enabled (set DB_SHARDS).')
+        if options['to'] and options['to'] not in [DEFAULT_DB_ALIAS, *aliases]:
+            raise CommandError(f"Unknown database alias: {options['to']}")
+        if not options['gym_ids'] and not options['all']:
+            raise CommandError('Pass --gym ID or --all.')
+
+        gyms = Gym.objects.using(DEFAULT_DB_ALIAS).order_by('id')
+        if options['gym_ids']:
+            gyms = gyms.filter(id__in=options['gym_ids'])
+
+        wait = settings.DB_SHARD_MAP_TTL + 1 if options['wait'] is None else options['wait']
+        moved_count = 0
+        for gym in gyms:
+            source = gym.db_shard or DEFAULT_DB_ALIAS
+            target = options['to'] or default_shard(gym.pk)
+            if source == target:
+                continue
+            counts = {
+                model._meta.verbose_name_plural: model._base_manager.using(source).filter(gym_id=gym.pk).count()
+                for model in TENANT_MODELS
+            }
+            summary = ', '.join(f'{count} {name}' for name, count in counts.items())
+            if options['dry_run']:
+                self.stdout.write(f'Would move gym {gym.name} (ID: {gym.pk}) {source} -> {target}: {summary}')
+                continue
+
+            self.move(gym, source, target, max(options['batch_size'], 1), wait)
+            moved_count += 1
+            self.stdout.write(
+                self.style.WARNING(f'Moved gym {gym.name} (ID: {gym.pk}) {source} -> {target}: {summary}')
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved_count} gyms.'))
+
+    def move(self, gym, source, target, batch_size, wait):
+        gyms = Gym.objects.using(DEFAULT_DB_ALIAS).filter(pk=gym.pk)
+
+        # 1. Refuse the gym's writes (see core.sharding.GymMoving) and wait
+        # until every worker's cached shard map has seen it.
+        gyms.update(db_shard_moving=True)
+        forget_gym_shard(gym.pk)
+        try:
+            self.wait_for_workers(wait)
+
+            # 2. Copy one snapshot of the source. Rows keep their ids, which
+            # are unique across databases (see core.sharding), and their
+            # timestamps, so the copied ledger still matches them.
+            with transaction.atomic(using=source), transaction.atomic(using=target):
+                if target != DEFAULT_DB_ALIAS:
+                    mirror_gym(gym, target)
+                for model in TENANT_MODELS:
+                    rows = model._base_manager.using(source).filter(gym_id=gym.pk).order_by('pk')
+                    batch = []
+                    for row in rows.iterator(chunk_size=batch_size):
+                        batch.append(row)
+                        if len(batch) >= batch_size:
+                            bulk_insert(model, batch, target)
+                            batch = []
+                    bulk_insert(model, batch, target)
+        except BaseException as e:
+            gyms.update(db_shard_moving=False)
+            forget_gym_shard(gym.pk)
+            if isinstance(e, IntegrityError):
+                raise CommandError(f'Could not copy gym {gym.pk} to {target}, nothing was moved: {e}')
+            raise
+
+        # 3. Switch reads and writes to the target, and wait until no worker
+        # reads the source any more.
+        gyms.update(db_shard='' if target == DEFAULT_DB_ALIAS else target, db_shard_moving=False)
+        forget_gym_shard(gym.pk)
+        self.wait_for_workers(wait)
+
+        # 4. Remove the source copy (the ledger first, so deleting clients
+        # doesn't update rows that are about to go).
+        with transaction.atomic(using=source):
+            for model in reversed(TENANT_MODELS):
+                model._base_manager.using(source).filter(gym_id=gym.pk).delete()
+            if source != DEFAULT_DB_ALIAS:
+                Gym._base_manager.using(source).filter(pk=gym.pk).delete()
+
+        bump_data_version(gym.pk)
+
+    def wait_for_workers(self, seconds):
+        if seconds > 0:
+            self.stdout.write(f'Waiting {seconds}s for the workers to reload the shard map...')
+            time.sleep(seconds)
@@ -0,0 +1,75 @@
+"""
+Management command to backfill normalized (E.164) client phone numbers.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from clients.models import Client
+from core.utils import normalize_phone
+
+
+class Command(BaseCommand):
+    help = 'Fill Client.phone_normalized and report clients whose phones collide'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of clients updated per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        """Normalize phones in id order, skipping numbers already taken in the gym."""
+        batch_size = max(options['batch_size'], 1)
+        taken = set(
+            Client.objects.filter(phone_normalized__isnull=False)
+            .values_list('gym_id', 'phone_normalized')
+        )
+
+        updated_count = 0
+        invalid = []
+        conflicts = []
+        batch = []
+        clients = Client.objects.order_by('id').only('id', 'gym_id', 'phone', 'phone_normalized')
+        for client in clients.iterator(chunk_size=batch_size):
+            normalized = normalize_phone(client.phone)
+            if normalized == client.phone_normalized:
+                continue
+            if normalized is None:
+                invalid.append(client)
+            elif (client.gym_id, normalized) in taken:
+                conflicts.append((client, normalized))
+                normalized = None
+            else:
+                taken.add((client.gym_id, normalized))
+            if normalized == client.phone_normalized:
+                continue
+
+            client.phone_normalized = normalized
+            batch.append(client)
+            if len(batch) >= batch_size:
+                updated_count += self.save_batch(batch)
+                batch = []
+        updated_count += self.save_batch(batch)
+
+        for client in invalid:
+            self.stdout.write(
+                self.style.WARNING(f'Invalid phone {client.phone!r} (client ID: {client.id})')
+            )
+        for client, normalized in conflicts:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'Duplicate phone {normalized} in gym {client.gym_id} (client ID: {client.id})'
+                )
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Normalized {updated_count} phones '
+                f'({len(conflicts)} duplicates, {len(invalid)} invalid).'
+            )
+        )
+
+    def save_batch(self, batch):
+        with transaction.atomic():
+            Client.objects.bulk_update(batch, ['phone_normalized'])
+        return len(batch)
@@ -0,0 +1,52 @@
+"""
+Management command to create many gyms with their admins from a file.
+"""
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from gyms.provisioning import provision_gyms
+
+
+class Command(BaseCommand):
+    help = 'Create gyms with a trial, QR code and admin user from a CSV or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='CSV with name, address, phone, email, username and password columns, '
+                 'or a JSON list of objects with those keys.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Threads hashing passwords (default: PASSWORD_HASH_WORKERS).',
+        )
+
+    def handle(self, *args, **options):
+        """Provision every entry of the file and print one line per gym."""
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as file:
+                if options['path'].lower().endswith('.json'):
+                    entries = json.load(file)
+                else:
+                    entries = list(csv.DictReader(file))
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        if not isinstance(entries, list):
+            raise CommandError('The JSON file must hold a list of gyms.')
+
+        created_count = 0
+        for index, outcome in enumerate(provision_gyms(entries, workers=options['workers']), start=1):
+            if outcome['status'] == 'created':
+                created_count += 1
+                gym = outcome['gym']
+                self.stdout.write(f"#{index}: created {gym.name} (ID: {gym.pk}), admin {outcome['admin_username']}")
+            else:
+                messages = '; '.join(
+                    f"{field}: {' '.join(map(str, field_messages))}"
+                    for field, field_messages in outcome['errors'].items()
+                )
+                self.stdout.write(self.style.WARNING(f'#{index}: {messages}'))
+
+        self.stdout.write(self.style.SUCCESS(f'Provisioned {created_count} of {len(entries)} gyms.'))
@@ -0,0 +1,49 @@
+"""
+Management command to delete expired sessions in small batches.
+"""
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.db import retry_on_locked
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions in batches, each in its own short write transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of sessions deleted per transaction.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the expired sessions.',
+        )
+
+    def handle(self, *args, **options):
+        """Delete expired sessions batch by batch, so writers wait at most one batch."""
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now)
+        if options['dry_run']:
+            self.stdout.write(f'{expired.count()} expired sessions would be deleted.')
+            return
+
+        batch_size = max(options['batch_size'], 1)
+        deleted = 0
+        while True:
+            count = retry_on_locked(self.delete_batch)(expired, batch_size)
+            if not count:
+                break
+            deleted += count
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired sessions.'))
+
+    def delete_batch(self, expired, batch_size):
+        keys = list(expired.values_list('session_key', flat=True)[:batch_size])
+        if not keys:
+            return 0
+        count, _ = Session.objects.filter(session_key__in=keys).delete()
+        return count
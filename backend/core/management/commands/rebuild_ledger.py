@@ -0,0 +1,45 @@
+"""
+Management command to backfill or repair the per-gym daily ledger.
+"""
+from django.core.management.base import BaseCommand
+from gyms.models import Gym
+from gyms.ledger import rebuild_ledger
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily income/expense/client ledger from source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--gym',
+            type=int,
+            action='append',
+            dest='gym_ids',
+            help='Only rebuild the given gym ID (can be repeated).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of gyms rebuilt per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        """Rebuild ledger rows gym by gym in small transactions."""
+        gyms = Gym.objects.order_by('id')
+        if options['gym_ids']:
+            gyms = gyms.filter(id__in=options['gym_ids'])
+        gym_ids = list(gyms.values_list('id', flat=True))
+
+        batch_size = max(options['batch_size'], 1)
+        rows_written = 0
+        for start in range(0, len(gym_ids), batch_size):
+            batch = gym_ids[start:start + batch_size]
+            rows_written += rebuild_ledger(batch)
+            self.stdout.write(f'Rebuilt ledger for gyms {batch[0]}..{batch[-1]}')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rebuilt ledger for {len(gym_ids)} gyms ({rows_written} daily rows).'
+            )
+        )
@@ -0,0 +1,56 @@
+"""
+Management command to refresh the read replica from the primary database.
+"""
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from core.models import ReplicaHeartbeat
+from core.routers import REPLICA_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = 'Write the replica heartbeat and copy the primary SQLite database to the replica'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--heartbeat-only',
+            action='store_true',
+            help='Only write the heartbeat (when replication is done by another tool).',
+        )
+        parser.add_argument(
+            '--pages',
+            type=int,
+            default=1024,
+            help='SQLite pages copied per step, letting writers in between steps.',
+        )
+
+    def handle(self, *args, **options):
+        """Touch the heartbeat on the primary, then snapshot it into the replica."""
+        ReplicaHeartbeat.touch(using=DEFAULT_DB_ALIAS)
+        if options['heartbeat_only']:
+            self.stdout.write(self.style.SUCCESS('Replica heartbeat written.'))
+            return
+
+        if REPLICA_DB_ALIAS not in settings.DATABASES:
+            raise CommandError('No replica database configured (set DB_REPLICA_NAME).')
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        replica = settings.DATABASES[REPLICA_DB_ALIAS]
+        if not primary['ENGINE'].endswith('sqlite3') or not replica['ENGINE'].endswith('sqlite3'):
+            raise CommandError('sync_replica can only copy SQLite databases; use --heartbeat-only.')
+
+        # Close Django's replica connection so it reopens on the new snapshot.
+        connections[REPLICA_DB_ALIAS].close()
+        source = sqlite3.connect(primary['NAME'])
+        target = sqlite3.connect(replica['NAME'])
+        try:
+            with target:
+                source.backup(target, pages=max(options['pages'], 1))
+        finally:
+            source.close()
+            target.close()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Copied {primary['NAME']} to {replica['NAME']}.")
+        )
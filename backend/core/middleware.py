@@ -1,20 +1,73 @@
 """
 Middleware for multi-tenant gym isolation.
 """
-from django.http import Http404
-from django.utils.deprecation import MiddlewareMixin
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+from .sharding import activate_gym, deactivate_gym
+from .tenancy import CachedUser, cache_context, cached_context, load_gym
+from .tokens import token_from_request
 
 
-class GymMiddleware(MiddlewareMixin):
+class GymMiddleware:
     """
     Middleware to set current gym context for multi-tenant isolation.
+
+    Answers ``request.user`` from the cached ``TenantContext`` of the user
+    when there is one, and sets ``request.gym`` to their gym, or the gym of
+    the API token, fetched lazily.
+    Runs natively under both WSGI and ASGI; in async mode only requests with
+    a session cookie take a thread hop, once, to read the session.
     """
-    def process_request(self, request):
-        """Set gym context based on user's gym association."""
-        if request.user.is_authenticated and request.user.gym:
-            request.gym = request.user.gym
-        elif request.user.is_authenticated and request.user.is_superuser:
-            # Superuser can access all gyms
-            request.gym = None
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = activate_gym(self.resolve_gym(request))
+        try:
+            return self.get_response(request)
+        finally:
+            deactivate_gym(token)
+
+    async def __acall__(self, request):
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            gym_id = await sync_to_async(self.resolve_gym, thread_sensitive=True)(request)
         else:
-            request.gym = None
+            # Without a session the user is anonymous and nothing is queried.
+            gym_id = self.resolve_gym(request)
+        token = activate_gym(gym_id)
+        try:
+            return await self.get_response(request)
+        finally:
+            deactivate_gym(token)
+
+    def resolve_gym(self, request):
+        """Set the tenant context; returns the gym id tenant queries are routed to."""
+        context = cached_context(request.session)
+        if context is not None:
+            request.user = CachedUser(request, context)
+        elif request.user.is_authenticated:
+            context = cache_context(request.user)
+
+        if context is not None and context.gym_id:
+            request.gym = SimpleLazyObject(lambda: request.user.gym)
+            return context.gym_id
+        token = token_from_request(request) if context is None else None
+        if token is not None:
+            request.gym = SimpleLazyObject(lambda: load_gym(token.gym_id))
+            return token.gym_id
+        request.gym = None
+
+        # Route tenant queries to the gym's shard; superusers pick a gym
+        # with the ``?gym=<id>`` filter.
+        if context is not None and context.is_superuser:
+            gym_param = request.GET.get('gym', '')
+            return int(gym_param) if gym_param.isdigit() else None
+        return None
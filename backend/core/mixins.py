@@ -0,0 +1,120 @@
+"""
+View mixins shared by the tenant-scoped API viewsets.
+"""
+import csv
+import re
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .sharding import current_gym, sharding_enabled
+
+# Cells a spreadsheet would evaluate as a formula; signed numbers such as
+# phone numbers (+998 90 ...) are left alone.
+FORMULA_RE = re.compile(r'^[=@\t\r]|^[+-](?![\d\s().-]*$)')
+
+
+class ShardedTenantMixin:
+    """
+    Require superusers to pick a gym with ``?gym=<id>`` when sharding is on.
+    
+    ``GymMiddleware`` routes a superuser's tenant queries to the shard of the
+    ``?gym=`` gym; without one they would silently read and validate against
+    the default database only, and rows posted for another gym would be
+    written to the wrong shard. Actions that take the gym from the request
+    body and route their writes themselves are listed in ``gym_body_actions``.
+    """
+    gym_body_actions = ()
+    
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            not request.user.is_superuser
+            or self.action in self.gym_body_actions
+            or not sharding_enabled()
+        ):
+            return
+        gym_id = current_gym()
+        if gym_id is None:
+            raise ValidationError({
+                'gym': 'Add ?gym=<id>: with sharding each gym\'s data lives in its own database.'
+            })
+        if isinstance(request.data, dict) and str(request.data.get('gym', gym_id)) != str(gym_id):
+            raise ValidationError({'gym': 'The gym must match ?gym=<id>.'})
+
+
+class ValuesListMixin:
+    """
+    Serve the ``list`` action from ``values()`` rows.
+    
+    The filtered queryset is projected to the columns (and joined columns)
+    the ``list_serializer_class`` needs, so a page costs one query (plus the
+    pagination count) however many related objects it shows.
+    """
+    list_serializer_class = None
+    
+    def list(self, request, *args, **kwargs):
+        serializer = self.list_serializer_class(context=self.get_serializer_context())
+        queryset = self.filter_queryset(self.get_queryset()).values(*serializer.get_values())
+        
+        page = self.paginate_queryset(queryset)
+        rows = queryset if page is None else page
+        data = [serializer.to_representation(row) for row in rows]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class Echo:
+    """File-like object returning what is written, for streaming ``csv.writer``."""
+    
+    def write(self, value):
+        return value
+
+
+class CSVExportMixin:
+    """
+    ``GET <list url>/export/`` streaming the filtered list as CSV.
+    
+    Uses the same filters, search and ordering as ``list`` and the columns
+    of ``list_serializer_class``. Rows are read with a chunked
+    ``.iterator()`` and written as they are produced, so memory use does not
+    depend on the number of rows.
+    """
+    export_chunk_size = 2000
+    export_filename = 'export'
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        serializer = self.list_serializer_class(context=self.get_serializer_context())
+        queryset = self.filter_queryset(self.get_queryset())
+        # Pin the database now: routing context is gone once streaming starts.
+        queryset = queryset.using(queryset.db).values(*serializer.get_values())
+        
+        filename = f"{self.export_filename}-{timezone.localdate():%Y%m%d}.csv"
+        response = StreamingHttpResponse(
+            self.stream_csv(serializer, queryset),
+            content_type='text/csv; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    def stream_csv(self, serializer, queryset):
+        writer = csv.writer(Echo())
+        columns = [name for name, field, getter in serializer.fields]
+        # BOM so spreadsheet apps detect UTF-8 (names are often in Cyrillic).
+        yield '\ufeff' + writer.writerow(columns)
+        for row in queryset.iterator(chunk_size=self.export_chunk_size):
+            data = serializer.to_representation(row)
+            yield writer.writerow([self.format_cell(data[name]) for name in columns])
+    
+    def format_cell(self, value):
+        if value is None:
+            return ''
+        value = str(value)
+        if FORMULA_RE.match(value):
+            return "'" + value
+        return value
@@ -47,3 +47,25 @@ class QRCode(models.Model):
         from django.conf import settings
         bot_username = settings.TELEGRAM_BOT_USERNAME
         return f"https://t.me/{bot_username}?start={self.token}"
+
+
+class ReplicaHeartbeat(models.Model):
+    """
+    Single-row clock written on the primary database.
+    
+    Reading it back from the replica tells how far behind the replica is
+    (see ``core.routers``).
+    """
+    timestamp = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Replica Heartbeat'
+        verbose_name_plural = 'Replica Heartbeats'
+    
+    def __str__(self):
+        return f"Heartbeat at {self.timestamp}"
+    
+    @classmethod
+    def touch(cls, using='default'):
+        """Record the current time on the given (primary) database."""
+        cls.objects.using(using).update_or_create(pk=1, defaults={'timestamp': timezone.now()})
@@ -0,0 +1,193 @@
+"""
+Pagination classes for tenant-scoped list endpoints.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from types import SimpleNamespace
+
+from django.db import connections
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over the queryset's ordering.
+
+    The cursor stores the ordering values of the last row served, and the next
+    page is fetched with ``WHERE (a, b, id) < (?, ?, ?)`` instead of an
+    ``OFFSET``, so every page costs the same index range scan and no
+    ``COUNT(*)`` is issued. ``id`` is always appended to the ordering to break
+    ties. Only concrete, non-null model fields can be used for ordering.
+    A malformed or tampered cursor is answered with a 400.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset)
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering
+        ]
+
+        values, reverse = self.decode_cursor(request)
+        if values is not None:
+            queryset = queryset.filter(self.seek_condition(queryset, values, reverse))
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_values = None
+        self.previous_values = None
+        if rows:
+            if has_more or reverse:
+                self.next_values = self.row_values(rows[-1])
+            if (has_more and reverse) or (values is not None and not reverse):
+                self.previous_values = self.row_values(rows[0])
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if self.next_values is None:
+            return None
+        return self.encode_cursor(self.next_values, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_values is None:
+            return None
+        return self.encode_cursor(self.previous_values, reverse=True)
+
+    def get_ordering(self, queryset):
+        """Queryset ordering with a trailing ``id`` tie-breaker."""
+        ordering = [
+            name for name in (queryset.query.order_by or queryset.model._meta.ordering)
+            if isinstance(name, str)
+        ]
+        names = [name.lstrip('-') for name in ordering]
+        if 'id' not in names and 'pk' not in names:
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append('-id' if descending else 'id')
+        return ['-id' if name == '-pk' else 'id' if name == 'pk' else name for name in ordering]
+
+    def row_values(self, instance):
+        if isinstance(instance, dict):
+            # A ``values()`` row, keyed by column name.
+            return [
+                field.value_to_string(SimpleNamespace(**{field.attname: instance[field.attname]}))
+                for field in self.fields
+            ]
+        return [
+            field.value_to_string(instance)
+            for field in self.fields
+        ]
+
+    def seek_condition(self, queryset, values, reverse):
+        """Condition selecting rows strictly after ``values`` in the ordering."""
+        try:
+            values = [field.to_python(value) for field, value in zip(self.fields, values)]
+        except Exception:
+            raise ParseError(self.invalid_cursor_message)
+
+        descending = [name.startswith('-') != reverse for name in self.ordering]
+        if all(descending) or not any(descending):
+            # Uniform direction: a single row-value comparison the database
+            # can answer with an index range scan.
+            connection = connections[queryset.db]
+            quote = connection.ops.quote_name
+            table = quote(queryset.model._meta.db_table)
+            columns = ', '.join(f'{table}.{quote(field.column)}' for field in self.fields)
+            params = [
+                field.get_db_prep_value(value, connection)
+                for field, value in zip(self.fields, values)
+            ]
+            placeholders = ', '.join(['%s'] * len(params))
+            operator = '<' if descending[0] else '>'
+            return RawSQL(
+                f'({columns}) {operator} ({placeholders})',
+                params,
+                output_field=BooleanField(),
+            )
+
+        # Mixed directions: expand into (a < x) OR (a = x AND b > y) ...
+        condition = Q()
+        for index, field in enumerate(self.fields):
+            lookup = 'lt' if descending[index] else 'gt'
+            term = Q(**{f'{field.name}__{lookup}': values[index]})
+            for previous_field, value in zip(self.fields[:index], values[:index]):
+                term &= Q(**{previous_field.name: value})
+            condition |= term
+        return condition
+
+    def encode_cursor(self, values, reverse):
+        payload = {'v': values}
+        if reverse:
+            payload['r'] = 1
+        encoded = urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        """Return ``(values, reverse)`` from the request cursor, if any."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            values = payload['v']
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise ParseError(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise ParseError(self.invalid_cursor_message)
+        return values, reverse
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination that switches to keyset pagination on request.
+
+    Existing clients keep getting ``count``/``next``/``previous`` pages;
+    passing ``?pagination=cursor`` (or following a ``cursor`` link) selects
+    :class:`KeysetPagination`, whose cost doesn't grow with the page depth.
+    """
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def use_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request):
+            self.keyset = self.keyset_class()
+            self.keyset.page_size = self.get_page_size(request) or self.keyset.page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,130 @@
+"""
+Cached token-to-gym lookup of QR verification.
+
+The bot verifies the token of every ``/start <token>`` scan. ``lookup()``
+answers from two tiers before it queries:
+
+- a small LRU in this process (``QR_LOOKUP_LOCAL_SIZE`` tokens, each kept
+  ``QR_LOOKUP_LOCAL_TTL`` seconds);
+- the ``default`` cache, shared by the worker processes when a shared
+  backend is configured (``QR_LOOKUP_TTL`` seconds).
+
+A miss reads the QR code and its gym in one query. Saving or deleting a QR
+code, or saving a gym, drops its token from the shared cache and from this
+process's LRU once the change commits; the LRUs of other processes catch up
+within ``QR_LOOKUP_LOCAL_TTL``. Unknown tokens are not cached, so guessing
+tokens can't fill the LRU.
+
+Only a shared cache (``CACHE_SHARED``) carries those drops to the web
+workers, e.g. when ``check_subscriptions`` blocks gyms. With a per-process
+cache, lookups are kept ``QR_LOOKUP_LOCAL_TTL`` seconds at most, so a blocked
+gym may verify as active for that long.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CACHE_KEY_PREFIX = 'qr:token:'
+# Longest token a QRCode row can hold (QRCode.token max_length)
+MAX_TOKEN_LENGTH = 64
+
+QRGym = namedtuple('QRGym', ['gym_id', 'gym_name', 'is_active'])
+
+_local_tokens = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def cache_key(token):
+    # Hashed: tokens are secrets and may hold characters cache keys can't.
+    return CACHE_KEY_PREFIX + hashlib.sha256(token.encode()).hexdigest()
+
+
+def _local_get(token, now):
+    with _local_lock:
+        entry = _local_tokens.get(token)
+        if entry is None:
+            return None
+        if now - entry[0] > settings.QR_LOOKUP_LOCAL_TTL:
+            del _local_tokens[token]
+            return None
+        _local_tokens.move_to_end(token)
+        return entry[1]
+
+
+def _local_set(token, qr_gym, now):
+    size = settings.QR_LOOKUP_LOCAL_SIZE
+    if size <= 0:
+        return
+    with _local_lock:
+        _local_tokens[token] = (now, qr_gym)
+        _local_tokens.move_to_end(token)
+        while len(_local_tokens) > size:
+            _local_tokens.popitem(last=False)
+
+
+def lookup_timeout():
+    """Seconds a lookup stays in the ``default`` cache."""
+    if settings.CACHE_SHARED:
+        return settings.QR_LOOKUP_TTL
+    return min(settings.QR_LOOKUP_TTL, settings.QR_LOOKUP_LOCAL_TTL)
+
+
+def lookup(token):
+    """The ``QRGym`` of the QR code with this token, or None."""
+    if not token or len(token) > MAX_TOKEN_LENGTH:
+        return None
+    now = time.monotonic()
+    qr_gym = _local_get(token, now)
+    if qr_gym is not None:
+        return qr_gym
+
+    key = cache_key(token)
+    values = cache.get(key)
+    if values is None:
+        from .models import QRCode
+
+        values = (
+            QRCode.objects.filter(token=token)
+            .values_list('gym_id', 'gym__name', 'gym__is_active')
+            .first()
+        )
+        if values is None:
+            return None
+        cache.set(key, tuple(values), lookup_timeout())
+    qr_gym = QRGym(*values)
+    _local_set(token, qr_gym, now)
+    return qr_gym
+
+
+def forget_tokens(tokens):
+    """Drop these tokens from the shared cache and this process's LRU."""
+    tokens = list(tokens)
+    if not tokens:
+        return
+    with _local_lock:
+        for token in tokens:
+            _local_tokens.pop(token, None)
+    cache.delete_many([cache_key(token) for token in tokens])
+
+
+def forget_gyms(gym_ids):
+    """Drop the tokens of these gyms (after a bulk update of the gyms)."""
+    from .models import QRCode
+    forget_tokens(QRCode.objects.filter(gym_id__in=list(gym_ids)).values_list('token', flat=True))
+
+
+def forget_qr_code(sender, instance, using=None, **kwargs):
+    """Drop a saved or deleted QR code's token once the change commits."""
+    token = instance.token
+    transaction.on_commit(lambda: forget_tokens([token]), using=using)
+
+
+def forget_gym_qr_codes(sender, instance, using=None, **kwargs):
+    """Drop a saved gym's token once the change commits."""
+    gym_id = instance.pk
+    transaction.on_commit(lambda: forget_gyms([gym_id]), using=using)
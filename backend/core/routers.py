@@ -0,0 +1,123 @@
+"""
+Database router sending reporting reads to a read replica.
+
+Only reads made inside a ``reporting_reads()`` block are routed, and only
+while the ``replica`` alias is configured and its heartbeat is recent;
+everything else, including every write and reads that follow a write in the
+same request, uses ``default``. Reads of data written less than
+``DB_REPLICA_MAX_LAG`` ago by another request also stay on ``default`` when
+the block is given the time of that write.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+REPLICA_DB_ALIAS = 'replica'
+
+_reporting = ContextVar('reporting_reads', default=False)
+_written_at = ContextVar('reporting_written_at', default=None)
+_wrote_primary = ContextVar('wrote_primary', default=False)
+_replica_health = {}
+
+
+def replica_lag(alias=REPLICA_DB_ALIAS):
+    """Seconds the replica is behind the primary, or None if unknown."""
+    from .models import ReplicaHeartbeat
+    
+    try:
+        timestamp = (
+            ReplicaHeartbeat.objects.using(alias)
+            .values_list('timestamp', flat=True)
+            .first()
+        )
+    except DatabaseError as e:
+        logger.warning(f"Replica {alias!r} unavailable: {e}")
+        return None
+    if timestamp is None:
+        return None
+    return (timezone.now() - timestamp).total_seconds()
+
+
+def replica_is_fresh(alias=REPLICA_DB_ALIAS):
+    """Whether the replica is configured and within ``DB_REPLICA_MAX_LAG``."""
+    if alias not in settings.DATABASES:
+        return False
+    
+    now = time.monotonic()
+    checked_at, fresh = _replica_health.get(alias, (None, False))
+    if checked_at is None or now - checked_at > settings.DB_REPLICA_CHECK_INTERVAL:
+        lag = replica_lag(alias)
+        fresh = lag is not None and lag <= settings.DB_REPLICA_MAX_LAG
+        if not fresh:
+            logger.warning(f"Replica {alias!r} is stale (lag: {lag}), reading from primary")
+        _replica_health[alias] = (now, fresh)
+    return fresh
+
+
+def reporting_db():
+    """Alias reporting reads should use right now."""
+    if _wrote_primary.get() or transaction.get_connection(DEFAULT_DB_ALIAS).in_atomic_block:
+        # Read-after-write: the replica may not have the new rows yet.
+        return DEFAULT_DB_ALIAS
+    written_at = _written_at.get()
+    if written_at is not None and time.time() - written_at < settings.DB_REPLICA_MAX_LAG:
+        # Written by an earlier request, possibly after the replica's last sync.
+        return DEFAULT_DB_ALIAS
+    if replica_is_fresh():
+        return REPLICA_DB_ALIAS
+    return DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def reporting_reads(written_at=None):
+    """
+    Route the reads made inside the block to the replica when possible.
+    
+    ``written_at`` is the time (``time.time()``) of the last write to the data
+    being read, if known; the replica is skipped until it is older than
+    ``DB_REPLICA_MAX_LAG``. Yields the alias the reads will use.
+    """
+    token = _reporting.set(True)
+    written_token = _written_at.set(written_at)
+    try:
+        yield reporting_db()
+    finally:
+        _written_at.reset(written_token)
+        _reporting.reset(token)
+
+
+def reset_read_after_write(**kwargs):
+    """``request_started`` receiver: forget writes made by the previous request."""
+    _wrote_primary.set(False)
+
+
+class ReplicaRouter:
+    """Router for the optional ``replica`` database."""
+    
+    def db_for_read(self, model, **hints):
+        if _reporting.get():
+            return reporting_db()
+        return DEFAULT_DB_ALIAS
+    
+    def db_for_write(self, model, **hints):
+        _wrote_primary.set(True)
+        return DEFAULT_DB_ALIAS
+    
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+    
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary, never migrated on its own.
+        if db == REPLICA_DB_ALIAS:
+            return False
+        return None
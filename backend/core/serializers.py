@@ -2,8 +2,10 @@
 Serializers for core models.
 """
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import authenticate
 from .models import User, QRCode
+from .tokens import action_error
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -48,3 +50,68 @@ class QRCodeSerializer(serializers.ModelSerializer):
         model = QRCode
         fields = ['id', 'gym', 'gym_name', 'token', 'qr_url', 'created_at', 'updated_at']
         read_only_fields = ['id', 'token', 'created_at', 'updated_at']
+
+
+class ApiTokenSerializer(serializers.Serializer):
+    """Serializer for issuing a signed API token."""
+    actions = serializers.ListField(child=serializers.CharField(), allow_empty=False)
+    ttl = serializers.IntegerField(required=False, min_value=60)
+    name = serializers.CharField(required=False, allow_blank=True, max_length=64, default='')
+    
+    def validate_actions(self, value):
+        errors = [error for error in map(action_error, value) if error]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return value
+    
+    def validate_ttl(self, value):
+        if value > settings.API_TOKEN_MAX_TTL:
+            raise serializers.ValidationError(f'Ensure this value is at most {settings.API_TOKEN_MAX_TTL}.')
+        return value
+
+
+class ValuesListSerializer:
+    """
+    Lean read-only serializer for ``QuerySet.values()`` rows.
+    
+    Produces the same output as ``serializer_class`` for list endpoints
+    without building model instances or a serializer per row. Each output
+    field is read from the row key given in ``lookups`` (the field name by
+    default) and formatted by the model serializer's own field; a
+    ``get_<field>(row)`` method overrides that for computed values. Extra
+    row keys those methods need are listed in ``extra_lookups``.
+    """
+    serializer_class = None
+    lookups = {}
+    extra_lookups = ()
+    
+    def __init__(self, context=None):
+        serializer = self.serializer_class(context=context)
+        self.fields = [
+            (name, field, getattr(self, f'get_{name}', None))
+            for name, field in serializer.fields.items()
+            if not field.write_only
+        ]
+    
+    def get_values(self):
+        """Lookups to pass to ``QuerySet.values()``."""
+        values = [
+            self.lookups.get(name, name)
+            for name, field, getter in self.fields
+            if getter is None
+        ]
+        return [*values, *self.extra_lookups]
+    
+    def to_representation(self, row):
+        data = {}
+        for name, field, getter in self.fields:
+            if getter is not None:
+                data[name] = getter(row)
+                continue
+            value = row[self.lookups.get(name, name)]
+            if value is None or isinstance(field, serializers.RelatedField):
+                # Related fields are projected as their primary key already.
+                data[name] = value
+            else:
+                data[name] = field.to_representation(value)
+        return data
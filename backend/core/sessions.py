@@ -0,0 +1,137 @@
+"""
+Session engine reading through the cache, with the database as the store of
+record (``SESSION_ENGINE = 'core.sessions'``).
+
+Sessions are read from the ``SESSION_CACHE_ALIAS`` cache and fall back to the
+``django_session`` table on a miss. Writes go to the database, then to the
+cache, and are kept off the SQLite write lock where possible:
+
+- a session whose data didn't change is not written again, unless its expiry
+  moved by more than ``SESSION_TOUCH_INTERVAL`` seconds (which only happens
+  with ``SESSION_SAVE_EVERY_REQUEST``);
+- ``cycle_key()``, called by ``login()``, doesn't insert the new key and
+  delete the old one right away; both happen in one transaction when the
+  session is saved at the end of the request.
+
+Cache entries live ``SESSION_CACHE_TIMEOUT`` seconds at most. A logout has to
+reach every worker, so the cache must be shared between processes; the
+``core.E001`` system check refuses this engine unless ``CACHE_SHARED`` is set.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import caches
+from django.db import router
+from django.utils import timezone
+
+from .db import retry_on_locked
+
+KEY_PREFIX = 'fit_control.session.'
+
+
+class SessionStore(DBStore):
+    """Database-backed session store read through the cache."""
+
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        super().__init__(session_key)
+        # (serialized data, expiry date) as last read from or written to the store.
+        self._stored = None
+        # Set by cycle_key(): the new key has no row yet, the replaced one
+        # still has.
+        self._pending_create = False
+        self._replaced_key = None
+
+    @property
+    def cache_key(self):
+        return self.cache_key_prefix + self._get_or_create_session_key()
+
+    def _serialize(self, data):
+        return self.serializer().dumps(data)
+
+    def _cache_session(self, data, expires):
+        timeout = min(settings.SESSION_CACHE_TIMEOUT, self.get_expiry_age(expiry=expires))
+        if timeout > 0:
+            self._cache.set(self.cache_key, {'data': data, 'expires': expires}, timeout)
+
+    def load(self):
+        try:
+            entry = self._cache.get(self.cache_key)
+        except Exception:
+            # The cache is only a read tier; the database has every session.
+            entry = None
+        if entry is not None and entry['expires'] > timezone.now():
+            data, expires = entry['data'], entry['expires']
+        else:
+            row = self._get_session_from_db()
+            if row is None:
+                return {}
+            data, expires = self.decode(row.session_data), row.expire_date
+            self._cache_session(data, expires)
+        self._stored = (self._serialize(data), expires)
+        return data
+
+    def exists(self, session_key):
+        return self.cache_key_prefix + session_key in self._cache or super().exists(session_key)
+
+    def is_unchanged(self, serialized, expires):
+        """Whether saving would only rewrite what is already stored."""
+        if self._stored is None or self._pending_create:
+            return False
+        stored_data, stored_expires = self._stored
+        touch_interval = timedelta(seconds=settings.SESSION_TOUCH_INTERVAL)
+        return serialized == stored_data and abs(expires - stored_expires) < touch_interval
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        expires = self.get_expiry_date()
+        serialized = self._serialize(data)
+        if not must_create and self.is_unchanged(serialized, expires):
+            return
+
+        replaced_key = self._replaced_key
+        retry_on_locked(self._write, using=router.db_for_write(self.model))(
+            must_create or self._pending_create, replaced_key
+        )
+        self._pending_create = False
+        self._replaced_key = None
+        if replaced_key is not None:
+            self._cache.delete(self.cache_key_prefix + replaced_key)
+        self._cache_session(data, expires)
+        self._stored = (serialized, expires)
+
+    def _write(self, must_create, replaced_key):
+        super().save(must_create=must_create)
+        if replaced_key is not None:
+            self._delete_rows([replaced_key])
+
+    def cycle_key(self):
+        """Move the data to a new key; the rows are written by the next ``save()``."""
+        data = self._session
+        key = self.session_key
+        self._session_key = self._get_new_session_key()
+        self._session_cache = data
+        if key and not self._pending_create:
+            self._replaced_key = key
+        self._pending_create = True
+        self.modified = True
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            keys = [key for key in (self.session_key, self._replaced_key) if key]
+            self._pending_create = False
+            self._replaced_key = None
+        else:
+            keys = [session_key]
+        self._cache.delete_many([self.cache_key_prefix + key for key in keys])
+        retry_on_locked(self._delete_rows, using=router.db_for_write(self.model))(keys)
+
+    def _delete_rows(self, keys):
+        self.model.objects.filter(session_key__in=keys).delete()
@@ -0,0 +1,323 @@
+"""
+Optional database-per-tenant sharding.
+
+When ``DB_SHARDS`` is set, the tenant tables (clients, payments, expenses and
+the daily ledger) of each gym live in one of the ``shard_<n>`` databases,
+named by ``Gym.db_shard``. Global tables (gyms, users, plans, sessions) stay
+on ``default``. Gyms with an empty ``db_shard`` keep their data on
+``default``; new gyms are assigned ``shard_<id % N>`` and existing ones are
+moved with ``manage.py move_gym_shard``, which refuses the gym's writes
+while it copies the data.
+
+Every shard has the full schema (``migrate --database shard_<n>``) and a copy
+of its gyms' rows so foreign keys and joins on ``gym`` keep working. Shards
+hand out primary keys from separate ranges, so tenant ids stay unique across
+databases.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from rest_framework.exceptions import APIException
+
+SHARD_ALIAS_PREFIX = 'shard_'
+SHARD_ID_RANGE = 2 ** 40
+TENANT_MODELS = (
+    'clients.client',
+    'clients.clientsearchtoken',
+    'payments.payment',
+    'expenses.expense',
+    'gyms.dailyledger',
+)
+
+_current_gym = ContextVar('current_gym_id', default=None)
+_gym_shards = {}
+
+
+def shard_aliases():
+    """Configured shard database aliases, in order."""
+    return sorted(
+        (alias for alias in settings.DATABASES if alias.startswith(SHARD_ALIAS_PREFIX)),
+        key=lambda alias: int(alias[len(SHARD_ALIAS_PREFIX):]),
+    )
+
+
+def sharding_enabled():
+    return bool(shard_aliases())
+
+
+def default_shard(gym_id):
+    """Shard a new gym is placed on."""
+    aliases = shard_aliases()
+    return aliases[gym_id % len(aliases)]
+
+
+def shard_for_gym(gym_id):
+    """
+    Database alias holding the tenant data of a gym.
+
+    Returns None when sharding is disabled, so the result can be passed to
+    ``QuerySet.using()`` and leave routing to the other routers.
+    """
+    if gym_id is None or not sharding_enabled():
+        return None
+    return _gym_shard(gym_id)[0]
+
+
+def gym_is_moving(gym_id):
+    """Whether ``move_gym_shard`` is copying the gym's data (writes are refused)."""
+    if gym_id is None or not sharding_enabled():
+        return False
+    return _gym_shard(gym_id)[1]
+
+
+def _gym_shard(gym_id):
+    """``(alias, moving)`` of a gym, cached for ``DB_SHARD_MAP_TTL`` seconds."""
+    now = time.monotonic()
+    cached = _gym_shards.get(gym_id)
+    if cached is None or now - cached[0] > settings.DB_SHARD_MAP_TTL:
+        from gyms.models import Gym
+
+        db_shard, moving = (
+            Gym._base_manager.using(DEFAULT_DB_ALIAS)
+            .filter(pk=gym_id)
+            .values_list('db_shard', 'db_shard_moving')
+            .first()
+        ) or ('', False)
+        cached = (now, db_shard or DEFAULT_DB_ALIAS, moving)
+        _gym_shards[gym_id] = cached
+    return cached[1:]
+
+
+def forget_gym_shard(gym_id):
+    """Drop the cached shard of a gym (after it moved)."""
+    _gym_shards.pop(gym_id, None)
+
+
+def current_gym():
+    """Id of the gym tenant queries without an instance are routed to."""
+    return _current_gym.get()
+
+
+def sharded_gym():
+    """
+    Gym a superuser's request is limited to with sharding on (``?gym=<id>``).
+
+    Its tenant queries only reach that gym's shard, so reads spanning gyms
+    must be limited to it; None when sharding is off.
+    """
+    return current_gym() if sharding_enabled() else None
+
+
+def activate_gym(gym_id):
+    """Route tenant queries without an instance to this gym's shard."""
+    return _current_gym.set(gym_id)
+
+
+def deactivate_gym(token):
+    _current_gym.reset(token)
+
+
+@contextmanager
+def tenant(gym_id):
+    """Run the block with tenant queries routed to ``gym_id``'s shard."""
+    token = activate_gym(gym_id)
+    try:
+        yield shard_for_gym(gym_id)
+    finally:
+        deactivate_gym(token)
+
+
+def mirror_values(gym):
+    """Column values of a gym's copy in a shard."""
+    from gyms.models import Gym
+
+    return {
+        field.attname: getattr(gym, field.attname)
+        for field in Gym._meta.concrete_fields
+        if field.attname != 'subscription_plan_id'  # plans live on default only
+    }
+
+
+def mirror_gym(gym, using):
+    """Copy a gym row into a shard so tenant rows there can reference it."""
+    from gyms.models import Gym
+
+    values = mirror_values(gym)
+    rows = Gym._base_manager.using(using)
+    if not rows.filter(pk=gym.pk).update(**values):
+        rows.bulk_create([Gym(**values)])
+
+
+def update_gym_mirrors(gym_shards, **values):
+    """
+    Apply an ``update()`` made to gyms on ``default`` to their shard copies.
+
+    ``gym_shards`` maps gym ids to their ``db_shard``. Queryset updates send
+    no ``post_save``, so callers pass the values they set; the copies are
+    updated once the change is committed, with one ``UPDATE`` per shard.
+    """
+    from gyms.models import Gym
+
+    by_shard = {}
+    for gym_id, db_shard in gym_shards.items():
+        if db_shard in settings.DATABASES and db_shard != DEFAULT_DB_ALIAS:
+            by_shard.setdefault(db_shard, []).append(gym_id)
+    if not by_shard:
+        return
+
+    def update():
+        for alias, gym_ids in by_shard.items():
+            Gym._base_manager.using(alias).filter(pk__in=gym_ids).update(**values)
+    transaction.on_commit(update, using=DEFAULT_DB_ALIAS)
+
+
+def place_gyms(gyms):
+    """
+    Assign shards to gyms created with ``bulk_create`` and mirror them there.
+
+    ``bulk_create`` sends no ``post_save``, so ``sync_gym_shard`` doesn't run
+    for these gyms. Each shard gets one ``UPDATE`` on ``default`` and one
+    bulk insert of the copies, made once the gyms are committed.
+    """
+    if not sharding_enabled():
+        return
+    from gyms.models import Gym
+
+    by_shard = {}
+    for gym in gyms:
+        gym.db_shard = default_shard(gym.pk)
+        by_shard.setdefault(gym.db_shard, []).append(gym)
+
+    for alias, shard_gyms in by_shard.items():
+        Gym._base_manager.using(DEFAULT_DB_ALIAS).filter(
+            pk__in=[gym.pk for gym in shard_gyms]
+        ).update(db_shard=alias)
+
+        def mirror(alias=alias, shard_gyms=shard_gyms):
+            Gym._base_manager.using(alias).bulk_create(
+                [Gym(**mirror_values(gym)) for gym in shard_gyms],
+                ignore_conflicts=True,
+            )
+        transaction.on_commit(mirror, using=DEFAULT_DB_ALIAS)
+
+
+def seed_shard_sequences(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    ``post_migrate`` receiver starting each shard's tenant ids in its own range.
+
+    ``shard_<n>`` allocates ids from ``(n + 1) * 2**40`` on SQLite, above the
+    ids of ``default`` and below those of ``shard_<n + 1>``.
+    """
+    if not using.startswith(SHARD_ALIAS_PREFIX):
+        return
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+
+    from django.apps import apps
+
+    floor = (int(using[len(SHARD_ALIAS_PREFIX):]) + 1) * SHARD_ID_RANGE
+    with connection.cursor() as cursor:
+        for label in TENANT_MODELS:
+            table = apps.get_model(label)._meta.db_table
+            cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s', [floor, table, floor])
+            cursor.execute('SELECT 1 FROM sqlite_sequence WHERE name = %s', [table])
+            if cursor.fetchone() is None:
+                cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, floor])
+
+
+def sync_gym_shard(sender, instance, created=False, using=None, raw=False, **kwargs):
+    """
+    ``post_save`` receiver for gyms saved on ``default``: place new gyms on a
+    shard and refresh the gym's copy there once the save is committed, so a
+    rolled back save leaves no copy behind.
+    """
+    if raw or using != DEFAULT_DB_ALIAS or not sharding_enabled():
+        return
+    if created and not instance.db_shard:
+        instance.db_shard = default_shard(instance.pk)
+        sender._base_manager.using(using).filter(pk=instance.pk).update(db_shard=instance.db_shard)
+    forget_gym_shard(instance.pk)
+    if instance.db_shard:
+        transaction.on_commit(lambda: mirror_gym(instance, instance.db_shard), using=DEFAULT_DB_ALIAS)
+
+
+def delete_gym_shard_data(sender, instance, using=None, **kwargs):
+    """``post_delete`` receiver removing a deleted gym's tenant data from its shard."""
+    if using != DEFAULT_DB_ALIAS or not instance.db_shard:
+        return
+    if instance.db_shard in settings.DATABASES:
+        sender._base_manager.using(instance.db_shard).filter(pk=instance.pk).delete()
+    forget_gym_shard(instance.pk)
+
+
+class TenantQuerySet(models.QuerySet):
+    """QuerySet of a tenant model."""
+
+    def create(self, **kwargs):
+        """
+        ``create()`` routed by the new row's gym, like ``save()``.
+
+        Django routes ``create()`` without the instance, so outside a request
+        (where no gym is activated) rows would go to the default database.
+        """
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
+class GymMoving(APIException):
+    """A tenant write to a gym whose data is being moved to another shard."""
+    status_code = 503
+    default_detail = 'The gym is being moved to another database; try again in a minute.'
+    default_code = 'gym_moving'
+
+
+class ShardRouter:
+    """
+    Send tenant models to the shard of their gym.
+
+    Writes to a gym that ``move_gym_shard`` is moving raise ``GymMoving``
+    (503). Commands writing with an explicit ``using()`` aren't routed.
+    """
+
+    def _gym_id(self, hints):
+        instance = hints.get('instance')
+        gym_id = None
+        if instance is not None:
+            if instance._meta.label_lower == 'gyms.gym':
+                gym_id = instance.pk
+            else:
+                gym_id = getattr(instance, 'gym_id', None)
+        if gym_id is None:
+            gym_id = _current_gym.get()
+        return gym_id
+
+    def _is_tenant(self, model):
+        return model._meta.label_lower in TENANT_MODELS and sharding_enabled()
+
+    def db_for_read(self, model, **hints):
+        if not self._is_tenant(model):
+            return None
+        return shard_for_gym(self._gym_id(hints))
+
+    def db_for_write(self, model, **hints):
+        if not self._is_tenant(model):
+            return None
+        gym_id = self._gym_id(hints)
+        if gym_is_moving(gym_id):
+            raise GymMoving()
+        return shard_for_gym(gym_id)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if sharding_enabled():
+            # Gyms are mirrored into shards; tenant rows only relate within a gym.
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
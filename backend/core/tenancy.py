@@ -0,0 +1,160 @@
+"""
+Cached tenant context of authenticated requests.
+
+Resolving ``request.user`` takes a user query on every request.
+``GymMiddleware`` instead reads a snapshot of the user's role flags and gym
+id from the cache, keyed by the user id stored in the session. A snapshot is
+kept for ``TENANT_CONTEXT_TTL`` seconds at most and is dropped when the user
+is saved or deleted. Every worker has to see that, so snapshots are only
+cached when the cache is shared between processes (``CACHE_SHARED``).
+
+On a cache hit ``request.user`` is a ``CachedUser``: the snapshot answers the
+checks made by authentication, permissions and ``get_queryset``, and any
+other attribute loads the real user as usual.
+"""
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import get_user
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject, empty
+
+CONTEXT_KEY = 'tenant:context:{user_id}'
+# Saving only other user fields (such as ``last_login`` on login) keeps the
+# snapshot.
+SNAPSHOT_USER_FIELDS = {
+    'password', 'is_active', 'is_staff', 'is_superuser', 'is_gym_admin', 'gym', 'gym_id',
+}
+
+
+class TenantContext:
+    """Snapshot of the requesting user's roles and gym."""
+
+    fields = (
+        'user_id', 'is_active', 'is_staff', 'is_superuser', 'is_gym_admin',
+        'session_hash', 'gym_id',
+    )
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, **values):
+        for name in self.fields:
+            setattr(self, name, values.get(name))
+
+    @classmethod
+    def for_user(cls, user):
+        return cls(
+            user_id=user.pk,
+            is_active=user.is_active,
+            is_staff=user.is_staff,
+            is_superuser=user.is_superuser,
+            is_gym_admin=user.is_gym_admin,
+            session_hash=user.get_session_auth_hash(),
+            gym_id=user.gym_id,
+        )
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.fields}
+
+
+def context_key(user_id):
+    return CONTEXT_KEY.format(user_id=user_id)
+
+
+def context_timeout():
+    """Seconds a snapshot may be cached; 0 when other workers couldn't drop it."""
+    return settings.TENANT_CONTEXT_TTL if settings.CACHE_SHARED else 0
+
+
+def cache_context(user):
+    """Build the context of a loaded user and cache it."""
+    context = TenantContext.for_user(user)
+    timeout = context_timeout()
+    if timeout > 0:
+        cache.set(context_key(user.pk), context.as_dict(), timeout)
+    return context
+
+
+def cached_context(session):
+    """
+    The cached context of the user logged in to ``session``, or None.
+
+    Only returned when it passes the checks ``auth.get_user()`` makes; in any
+    other case (no snapshot, inactive user, session hash from an old password
+    or secret key) the caller leaves the request to ``django.contrib.auth``.
+    """
+    user_id = session.get(SESSION_KEY)
+    session_hash = session.get(HASH_SESSION_KEY)
+    if user_id is None or not session_hash:
+        return None
+    if session.get(BACKEND_SESSION_KEY) not in settings.AUTHENTICATION_BACKENDS:
+        return None
+    if context_timeout() <= 0:
+        return None
+    values = cache.get(context_key(user_id))
+    if values is None:
+        return None
+    context = TenantContext(**values)
+    if not context.is_active or not constant_time_compare(session_hash, context.session_hash):
+        return None
+    return context
+
+
+def load_gym(gym_id):
+    """The gym with this id, or None."""
+    from gyms.models import Gym
+    return Gym.objects.filter(pk=gym_id).first() if gym_id else None
+
+
+def _snapshot_attribute(name, context_name=None):
+    context_name = context_name or name
+
+    def get(self):
+        if self._wrapped is empty:
+            return getattr(self._context, context_name)
+        return getattr(self._wrapped, name)
+    return property(get)
+
+
+class CachedUser(SimpleLazyObject):
+    """
+    ``request.user`` answering role checks from a ``TenantContext``.
+
+    Any attribute not in the snapshot loads the user with ``auth.get_user()``.
+    """
+
+    def __init__(self, request, context):
+        super().__init__(lambda: get_user(request))
+        self.__dict__['_context'] = context
+
+    pk = _snapshot_attribute('pk', 'user_id')
+    id = _snapshot_attribute('id', 'user_id')
+    is_authenticated = _snapshot_attribute('is_authenticated')
+    is_anonymous = _snapshot_attribute('is_anonymous')
+    is_active = _snapshot_attribute('is_active')
+    is_staff = _snapshot_attribute('is_staff')
+    is_superuser = _snapshot_attribute('is_superuser')
+    is_gym_admin = _snapshot_attribute('is_gym_admin')
+    gym_id = _snapshot_attribute('gym_id')
+
+    @property
+    def gym(self):
+        """The user's gym, fetched on its own without loading the user."""
+        if self._wrapped is not empty:
+            return self._wrapped.gym
+        if '_gym' not in self.__dict__:
+            self.__dict__['_gym'] = load_gym(self._context.gym_id)
+        return self.__dict__['_gym']
+
+    def __bool__(self):
+        return True
+
+
+def forget_user_context(sender, instance, using=None, update_fields=None, **kwargs):
+    """Drop the snapshot of a saved or deleted user once the change commits."""
+    if update_fields and not SNAPSHOT_USER_FIELDS.intersection(update_fields):
+        return
+    key = context_key(instance.pk)
+    transaction.on_commit(lambda: cache.delete(key), using=using)
+
@@ -0,0 +1,270 @@
+"""
+Whole-tenant export and import.
+
+A tenant archive is a gzip-compressed JSON Lines file. A header line is
+followed by the gym, its users and QR code, then its clients, payments and
+expenses, one object per line in Django's ``jsonl`` serialization format.
+Exports read rows with chunked ``.iterator()`` calls and imports read the
+archive line by line and insert with chunked ``bulk_create``, so memory use
+doesn't grow with the tenant's size (apart from the old-to-new client id map).
+
+An import always creates a new gym. Every row gets a new id, and references
+to the gym and to clients are remapped. Search tokens and the daily ledger
+aren't archived; they are rebuilt from the imported rows.
+"""
+import datetime
+import gzip
+import itertools
+import json
+import secrets
+
+from django.core import serializers
+from django.core.serializers.base import DeserializationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+from django.utils import timezone
+
+from clients.models import Client
+from clients.search import index_clients
+from expenses.models import Expense
+from gyms.ledger import rebuild_ledger
+from gyms.models import Gym
+from payments.models import Payment
+from subscriptions.models import SubscriptionPlan
+from .db import auto_timestamp_fields, bulk_insert
+from .models import QRCode, User
+from .sharding import mirror_gym, shard_for_gym
+
+ARCHIVE_FORMAT = 'fit_control.tenant'
+ARCHIVE_VERSION = 1
+CHUNK_SIZE = 2000
+# Archived models in file order, parents first.
+ARCHIVE_MODELS = [Gym, User, QRCode, Client, Payment, Expense]
+EXCLUDED_FIELDS = {
+    Gym: {'db_shard', 'db_shard_moving'},
+}
+# Models stored with the gym's tenant data (see core.sharding).
+TENANT_MODELS = {Client, Payment, Expense}
+
+
+class TenantArchiveError(ValueError):
+    """The archive is malformed or can't be imported."""
+
+
+class ArchiveJSONEncoder(DjangoJSONEncoder):
+    """JSON encoder keeping the microseconds that ``DjangoJSONEncoder`` truncates."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class _Buffer:
+    """Write-only file object handing out what was written so far."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def archive_fields(model):
+    excluded = EXCLUDED_FIELDS.get(model, set())
+    return [
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in excluded
+    ]
+
+
+def tenant_querysets(gym):
+    """``(model, queryset)`` pairs of the rows archived for ``gym``."""
+    tenant_db = shard_for_gym(gym.pk)
+    for model in ARCHIVE_MODELS:
+        if model is Gym:
+            queryset = Gym.objects.using(DEFAULT_DB_ALIAS).filter(pk=gym.pk)
+        else:
+            queryset = model._base_manager.using(
+                tenant_db if model in TENANT_MODELS else DEFAULT_DB_ALIAS
+            ).filter(gym_id=gym.pk)
+        yield model, queryset.order_by('pk')
+
+
+def iter_tenant_archive(gym, counts=None):
+    """
+    Yield the gzip-compressed archive of ``gym`` piece by piece.
+
+    ``counts``, when given, is filled with the number of rows per model.
+    """
+    buffer = _Buffer()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', filename='') as archive:
+        header = {
+            'format': ARCHIVE_FORMAT,
+            'version': ARCHIVE_VERSION,
+            'gym': gym.pk,
+            'exported_at': timezone.now().isoformat(),
+        }
+        archive.write((json.dumps(header) + '\n').encode('utf-8'))
+        for model, queryset in tenant_querysets(gym):
+            rows = queryset.iterator(chunk_size=CHUNK_SIZE)
+            count = 0
+            while True:
+                chunk = list(itertools.islice(rows, CHUNK_SIZE))
+                if not chunk:
+                    break
+                count += len(chunk)
+                data = serializers.serialize(
+                    'jsonl', chunk, fields=archive_fields(model), cls=ArchiveJSONEncoder,
+                )
+                archive.write(data.encode('utf-8'))
+                yield buffer.take()
+            if counts is not None:
+                counts[model._meta.label_lower] = count
+    yield buffer.take()
+
+
+def export_tenant(gym, fileobj):
+    """Write the archive of ``gym`` to a binary file; returns the row counts."""
+    counts = {}
+    for data in iter_tenant_archive(gym, counts):
+        fileobj.write(data)
+    return counts
+
+
+class TenantImport:
+    """Create a new gym from an archive read as a stream."""
+
+    def __init__(self, batch_size=CHUNK_SIZE):
+        self.batch_size = max(batch_size, 1)
+        self.gym = None
+        self.tenant_db = None
+        self.client_ids = {}
+        self.counts = {model._meta.label_lower: 0 for model in ARCHIVE_MODELS}
+        self.warnings = []
+
+    def run(self, fileobj):
+        try:
+            with gzip.open(fileobj, 'rt', encoding='utf-8') as lines:
+                self.read_header(next(lines, ''))
+                objects = serializers.deserialize('jsonl', lines, ignorenonexistent=True)
+                with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                    first = next(objects, None)
+                    if first is None or not isinstance(first.object, Gym):
+                        raise TenantArchiveError('The archive does not start with a gym.')
+                    self.import_gym(first.object)
+                    with transaction.atomic(using=self.tenant_db):
+                        if self.gym.db_shard:
+                            # The shard's foreign keys are checked when this
+                            # block commits, before the gym itself is; write
+                            # its copy here so a failed import drops it too.
+                            mirror_gym(self.gym, self.tenant_db)
+                        for model, group in itertools.groupby(objects, key=lambda item: type(item.object)):
+                            if model not in ARCHIVE_MODELS or model is Gym:
+                                raise TenantArchiveError(f'Unexpected {model._meta.label} rows in the archive.')
+                            while True:
+                                chunk = [item.object for item in itertools.islice(group, self.batch_size)]
+                                if not chunk:
+                                    break
+                                self.import_chunk(model, chunk)
+                        rebuild_ledger([self.gym.pk], using=self.tenant_db)
+        except (OSError, EOFError, UnicodeDecodeError, DeserializationError) as e:
+            raise TenantArchiveError(f'Invalid tenant archive: {e}')
+        return self.gym
+
+    def read_header(self, line):
+        try:
+            header = json.loads(line)
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get('format') != ARCHIVE_FORMAT:
+            raise TenantArchiveError('Not a tenant archive.')
+        if header.get('version') != ARCHIVE_VERSION:
+            raise TenantArchiveError(f"Unsupported archive version: {header.get('version')}")
+
+    def import_gym(self, gym):
+        if gym.subscription_plan_id and not SubscriptionPlan.objects.filter(pk=gym.subscription_plan_id).exists():
+            self.warnings.append(f'Subscription plan {gym.subscription_plan_id} does not exist; cleared.')
+            gym.subscription_plan_id = None
+        timestamps = {field.attname: getattr(gym, field.attname) for field in auto_timestamp_fields(Gym)}
+        gym.pk = None
+        # A regular save, so the gym is placed on a shard like any new gym.
+        gym.save(using=DEFAULT_DB_ALIAS)
+        Gym.objects.using(DEFAULT_DB_ALIAS).filter(pk=gym.pk).update(**timestamps)
+        for name, value in timestamps.items():
+            setattr(gym, name, value)
+
+        self.gym = gym
+        self.tenant_db = router.db_for_write(Client, instance=Client(gym=gym))
+        self.counts['gyms.gym'] = 1
+
+    def import_chunk(self, model, objects):
+        using = self.tenant_db if model in TENANT_MODELS else DEFAULT_DB_ALIAS
+        if model is User:
+            objects = self.new_users(objects)
+        elif model is QRCode:
+            self.free_tokens(objects)
+
+        old_ids = []
+        for obj in objects:
+            old_ids.append(obj.pk)
+            obj.pk = None
+            obj.gym_id = self.gym.pk
+            if model is Payment:
+                try:
+                    obj.client_id = self.client_ids[obj.client_id]
+                except KeyError:
+                    raise TenantArchiveError(f'Payment references unknown client {obj.client_id}.')
+
+        bulk_insert(model, objects, using)
+        if model is Client:
+            self.client_ids.update(zip(old_ids, (obj.pk for obj in objects)))
+            index_clients(objects, using=using, replace=False)
+        self.counts[model._meta.label_lower] += len(objects)
+
+    def new_users(self, users):
+        """Users whose username and Telegram id are free in this database."""
+        usernames = set(
+            User.objects.filter(username__in=[user.username for user in users])
+            .values_list('username', flat=True)
+        )
+        telegram_ids = set(
+            User.objects.filter(telegram_id__in=[user.telegram_id for user in users if user.telegram_id])
+            .values_list('telegram_id', flat=True)
+        )
+        kept = []
+        for user in users:
+            if user.username in usernames:
+                self.warnings.append(f'User {user.username} already exists; skipped.')
+                continue
+            if user.telegram_id in telegram_ids:
+                self.warnings.append(f'Telegram ID of user {user.username} is already linked; cleared.')
+                user.telegram_id = None
+            kept.append(user)
+        return kept
+
+    def free_tokens(self, qr_codes):
+        for qr_code in qr_codes:
+            if QRCode.objects.filter(token=qr_code.token).exists():
+                self.warnings.append('QR code token is already in use; a new one was generated.')
+                qr_code.token = secrets.token_urlsafe(32)
+
+
+def import_tenant(fileobj, batch_size=CHUNK_SIZE):
+    """
+    Create a new gym from the archive in the binary file ``fileobj``.
+
+    Returns the import, with ``gym``, per-model ``counts`` and ``warnings``.
+    """
+    tenant_import = TenantImport(batch_size=batch_size)
+    tenant_import.run(fileobj)
+    return tenant_import
@@ -0,0 +1,126 @@
+"""
+Helpers shared by the apps' tests.
+"""
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.models import User
+from core.pagination import OptionalKeysetPagination
+from core.sharding import shard_aliases, sharding_enabled
+from gyms.models import Gym
+
+
+def create_gym(**fields):
+    """
+    Create a gym and run its ``on_commit`` callbacks right away.
+
+    ``TestCase`` never commits, so without this a gym created with
+    ``DB_SHARDS`` set would have no copy on its shard for tenant rows to
+    reference.
+    """
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        gym = Gym.objects.create(**fields)
+    return gym
+
+
+def gym_admin_client(gym, username='admin'):
+    """
+    API client authenticated as a new admin of ``gym``.
+
+    With ``DB_SHARDS`` set the admin logs in with a session, so that
+    ``GymMiddleware`` routes the requests to the gym's shard.
+    """
+    admin = User.objects.create_user(username, password='password', gym=gym, is_gym_admin=True)
+    client = APIClient()
+    if sharding_enabled():
+        client.force_login(admin)
+    else:
+        client.force_authenticate(admin)
+    return client
+
+
+@contextmanager
+def capture_queries():
+    """Capture the queries of every database, as a ``CaptureQueriesContext`` per alias."""
+    with ExitStack() as stack:
+        yield {alias: stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections}
+
+
+def query_plans(run, table):
+    """
+    Run ``run()`` and return ``(sql, plan)`` for each query it made on ``table``.
+
+    ``plan`` lists the steps of SQLite's ``EXPLAIN QUERY PLAN``.
+    """
+    with capture_queries() as captured:
+        run()
+    plans = []
+    for alias, queries in captured.items():
+        with connections[alias].cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or f'"{table}"' not in sql:
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plans.append((sql, [row[-1] for row in cursor.fetchall()]))
+    return plans
+
+
+def plan_problems(plan, table):
+    """Steps reading all of ``table`` or sorting rows outside an index."""
+    return [
+        step for step in plan
+        if step.startswith(f'SCAN {table}') or 'TEMP B-TREE' in step
+    ]
+
+
+class QueryPlanAssertions:
+    """``TestCase`` mixin checking the query plans of an endpoint."""
+    databases = '__all__'
+
+    def assertIndexed(self, url, table, *indexes):
+        """
+        The queries ``GET url`` makes on ``table`` neither scan the table nor
+        sort outside an index, and the ordered ones read through one of
+        ``indexes``.
+        """
+        plans = query_plans(lambda: self.client.get(url), table)
+        self.assertTrue(plans, f'No query on {table}')
+        for sql, plan in plans:
+            with self.subTest(sql=sql):
+                self.assertEqual(plan_problems(plan, table), [])
+                if 'ORDER BY' in sql:
+                    self.assertTrue(any(index in step for step in plan for index in indexes), plan)
+
+
+class ListQueryCountAssertions:
+    """``TestCase`` mixin checking that a list endpoint doesn't run N+1 queries."""
+    databases = '__all__'
+    page_sizes = (1, 5, 10)
+
+    def assertListQueries(self, url, num, cursor_num):
+        """
+        ``GET url`` runs ``num`` queries in page-number mode and ``cursor_num``
+        in keyset mode, for every page size in ``page_sizes``. With
+        ``DB_SHARDS`` set the queries on the shards are counted, leaving out
+        the session lookups on ``default``.
+        """
+        separator = '&' if '?' in url else '?'
+        for page_size in self.page_sizes:
+            with mock.patch.object(OptionalKeysetPagination, 'page_size', page_size):
+                for mode_url, expected in ((url, num), (f'{url}{separator}pagination=cursor', cursor_num)):
+                    with self.subTest(url=mode_url, page_size=page_size):
+                        with capture_queries() as captured:
+                            response = self.client.get(mode_url)
+                        queries = [
+                            query['sql'] for alias in shard_aliases() or [DEFAULT_DB_ALIAS]
+                            for query in captured[alias].captured_queries
+                        ]
+                        self.assertEqual(len(queries), expected, '\n'.join(queries))
+                        self.assertEqual(response.status_code, 200)
+                        self.assertEqual(len(response.data['results']), page_size)
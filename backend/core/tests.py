@@ -0,0 +1,553 @@
+"""
+Tests for the core app.
+"""
+import base64
+import gzip
+import io
+import time
+from datetime import date, timedelta
+from unittest import mock, skipUnless
+
+from django.contrib.auth import SESSION_KEY, login
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from clients.models import Client, ClientSearchToken
+from expenses.models import Expense
+from gyms.ledger import rebuild_ledger
+from gyms.models import DailyLedger, Gym
+from payments.models import Payment
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+from .checks import check_session_cache
+from .db import immediate_atomic
+from .models import User
+from .pagination import OptionalKeysetPagination
+from .routers import REPLICA_DB_ALIAS, reporting_reads, reset_read_after_write
+from .sessions import SessionStore
+from .sharding import (
+    activate_gym, deactivate_gym, forget_gym_shard, shard_aliases, shard_for_gym, sharding_enabled,
+    tenant,
+)
+from .tenancy import context_key
+from .tenant_archive import TenantArchiveError, export_tenant, import_tenant
+from .testing import create_gym, gym_admin_client
+from .throttling import PhoneThrottle, check_rates, parse_rate
+from .tokens import issue_token
+
+
+class ImmediateAtomicTests(TransactionTestCase):
+    """``immediate_atomic`` behaves like ``atomic()`` around a ``BEGIN IMMEDIATE``."""
+    databases = '__all__'
+
+    def test_commits(self):
+        committed = []
+        with immediate_atomic():
+            Gym.objects.create(name='Committed Gym')
+            transaction.on_commit(lambda: committed.append(True))
+        self.assertTrue(Gym.objects.filter(name='Committed Gym').exists())
+        self.assertEqual(committed, [True])
+        self.assertTrue(connection.get_autocommit())
+
+    def test_rolls_back_on_error(self):
+        committed = []
+        with self.assertRaises(ValueError):
+            with immediate_atomic():
+                Gym.objects.create(name='Rolled Back Gym')
+                transaction.on_commit(lambda: committed.append(True))
+                raise ValueError
+        self.assertFalse(Gym.objects.filter(name='Rolled Back Gym').exists())
+        self.assertEqual(committed, [])
+        self.assertTrue(connection.get_autocommit())
+
+    def test_nested_blocks_use_savepoints(self):
+        with immediate_atomic():
+            Gym.objects.create(name='Outer Gym')
+            with self.assertRaises(ValueError):
+                with immediate_atomic():
+                    Gym.objects.create(name='Inner Gym')
+                    raise ValueError
+        self.assertEqual(list(Gym.objects.values_list('name', flat=True)), ['Outer Gym'])
+
+    def test_takes_the_write_lock_up_front(self):
+        with CaptureQueriesContext(connection) as captured:
+            with immediate_atomic():
+                Gym.objects.exists()
+        # Django logs turning autocommit off as "BEGIN"; SQLite itself only
+        # sees the BEGIN IMMEDIATE.
+        statements = [query['sql'] for query in captured.captured_queries]
+        self.assertEqual(statements[:2], ['BEGIN', 'BEGIN IMMEDIATE'])
+
+
+@override_settings(DB_REPLICA_MAX_LAG=60)
+class ReportingReadsTests(TransactionTestCase):
+    """Reporting reads use a fresh replica unless the data was just written."""
+    databases = '__all__'
+
+    def setUp(self):
+        patcher = mock.patch('core.routers.replica_is_fresh', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        reset_read_after_write()
+
+    def test_old_data_reads_the_replica(self):
+        with reporting_reads() as alias:
+            self.assertEqual(alias, REPLICA_DB_ALIAS)
+        with reporting_reads(written_at=time.time() - 61) as alias:
+            self.assertEqual(alias, REPLICA_DB_ALIAS)
+
+    def test_recently_written_data_reads_the_primary(self):
+        with reporting_reads(written_at=time.time() - 1) as alias:
+            self.assertEqual(alias, DEFAULT_DB_ALIAS)
+
+    def test_write_in_the_request_reads_the_primary(self):
+        Gym.objects.create(name='Written Gym')
+        with reporting_reads() as alias:
+            self.assertEqual(alias, DEFAULT_DB_ALIAS)
+
+
+class TenantContextCacheTests(TestCase):
+    """Tenant contexts are cached only in a shared cache, and dropped on user saves."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.gym = create_gym(name='Context Gym')
+        self.admin = User.objects.create_user('admin', password='password', gym=self.gym, is_gym_admin=True)
+        self.client.force_login(self.admin)
+
+    @override_settings(CACHE_SHARED=True, TENANT_CONTEXT_TTL=60)
+    def test_user_save_drops_the_context(self):
+        self.assertEqual(self.client.get('/api/clients/').status_code, 200)
+        self.assertIsNotNone(cache.get(context_key(self.admin.pk)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.is_gym_admin = False
+            self.admin.save()
+
+        self.assertIsNone(cache.get(context_key(self.admin.pk)))
+
+    @override_settings(CACHE_SHARED=False, TENANT_CONTEXT_TTL=60)
+    def test_per_process_cache_is_not_used(self):
+        self.assertEqual(self.client.get('/api/clients/').status_code, 200)
+        self.assertIsNone(cache.get(context_key(self.admin.pk)))
+
+        User.objects.filter(pk=self.admin.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/api/clients/').status_code, 401)
+
+
+class ApiTokenAuthenticationTests(TestCase):
+    """Rejected API tokens get a 401 the bot can react to, tokens used out of scope a 403."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.gym = create_gym(name='Token Gym')
+
+    def get(self, token, url='/api/clients/'):
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_valid_token(self):
+        token, _ = issue_token(self.gym.pk, ['clients.list'])
+        self.assertEqual(self.get(token).status_code, 200)
+
+    def test_invalid_token_is_401(self):
+        response = self.get('invalid')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+
+    def test_expired_token_is_401(self):
+        token, _ = issue_token(self.gym.pk, ['clients.list'], ttl=-1)
+        response = self.get(token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['detail'], 'Token has expired.')
+
+    def test_tampered_signature_is_401(self):
+        token, _ = issue_token(self.gym.pk, ['clients.list'])
+        other_token, _ = issue_token(self.gym.pk + 1, ['clients.*'])
+        payload, signature = token.rsplit(':', 1)
+        flipped = signature[:-1] + ('A' if signature[-1] != 'A' else 'B')
+        tampered = {
+            'signature': f'{payload}:{flipped}',
+            'payload': f"{other_token.rsplit(':', 1)[0]}:{signature}",
+        }
+        for name, value in tampered.items():
+            with self.subTest(name):
+                self.assertEqual(self.get(value).status_code, 401)
+
+    def test_token_outside_its_scope_is_403(self):
+        token, _ = issue_token(self.gym.pk, ['clients.list'])
+        self.assertEqual(self.get(token, '/api/payments/').status_code, 403)
+        response = self.client.post(
+            '/api/clients/', {'first_name': 'Ali', 'last_name': 'Valiyev', 'phone': '+998901234567'},
+            HTTP_AUTHORIZATION=f'Bearer {token}',
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Client._base_manager.using(shard_for_gym(self.gym.pk)).exists())
+
+    def test_anonymous_request_is_401(self):
+        self.assertEqual(self.client.get('/api/clients/').status_code, 401)
+
+
+class SystemCheckTests(TestCase):
+    """Settings the app can't run safely with are reported by ``manage.py check``."""
+
+    @override_settings(SESSION_ENGINE='core.sessions', CACHE_SHARED=False)
+    def test_cached_sessions_need_a_shared_cache(self):
+        self.assertEqual([error.id for error in check_session_cache(None)], ['core.E001'])
+
+    @override_settings(SESSION_ENGINE='core.sessions', CACHE_SHARED=True)
+    def test_cached_sessions_with_a_shared_cache(self):
+        self.assertEqual(check_session_cache(None), [])
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db', CACHE_SHARED=False)
+    def test_database_sessions(self):
+        self.assertEqual(check_session_cache(None), [])
+
+
+@override_settings(SESSION_ENGINE='core.sessions', CACHE_SHARED=True)
+class CachedSessionTests(TestCase):
+    """Cached sessions skip unchanged writes, and a login drops the replaced key."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(
+            'admin', password='password', gym=create_gym(name='Session Gym'), is_gym_admin=True,
+        )
+
+    def session_writes(self, queries):
+        return [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith(('INSERT INTO "django_session"', 'UPDATE "django_session"'))
+        ]
+
+    @override_settings(SESSION_SAVE_EVERY_REQUEST=True)
+    def test_unchanged_session_is_not_written_back(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get('/api/clients/').status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                self.assertEqual(self.client.get('/api/clients/').status_code, 200)
+        self.assertEqual(self.session_writes(queries), [])
+
+        session = self.client.session
+        session['theme'] = 'dark'
+        with CaptureQueriesContext(connection) as queries:
+            session.save()
+        self.assertEqual(len(self.session_writes(queries)), 1)
+
+    def test_login_cycles_the_key_out_of_the_cache(self):
+        session = SessionStore()
+        session['cart'] = 'kept'
+        session.create()
+        old_key = session.session_key
+        self.assertIsNotNone(cache.get(SessionStore.cache_key_prefix + old_key))
+
+        request = APIRequestFactory().post('/api/auth/login/')
+        request.session = session
+        login(request, self.admin)
+        session.save()
+
+        self.assertNotEqual(session.session_key, old_key)
+        self.assertIsNone(cache.get(SessionStore.cache_key_prefix + old_key))
+        self.assertFalse(session.exists(old_key))
+        self.assertEqual(SessionStore(old_key).load(), {})
+        reloaded = SessionStore(session.session_key).load()
+        self.assertEqual((reloaded['cart'], reloaded[SESSION_KEY]), ('kept', str(self.admin.pk)))
+
+
+@override_settings(PUBLIC_THROTTLE_RATES={'verify_qr_ip': '1,1/hour'}, PUBLIC_THROTTLE_EXEMPT_IPS=[])
+class ThrottleTests(TestCase):
+    """Public endpoint throttles."""
+
+    def setUp(self):
+        cache.clear()
+
+    def verify_statuses(self, client):
+        return [client.get('/api/auth/verify-qr/unknown/').status_code for _ in range(3)]
+
+    def test_anonymous_verification_is_throttled(self):
+        self.assertEqual(self.verify_statuses(self.client)[-1], 429)
+
+    def test_superuser_is_not_throttled(self):
+        self.client.force_login(User.objects.create_superuser('bot', password='password'))
+        self.assertNotIn(429, self.verify_statuses(self.client))
+
+    def test_phone_of_a_list_body(self):
+        request = APIView().initialize_request(APIRequestFactory().post('/', [], format='json'))
+        self.assertIsNone(PhoneThrottle().get_identity(request))
+
+    def test_malformed_rates(self):
+        for rate in ('ten/minute', '5,20/fortnight', '5,20', '0/minute'):
+            with self.subTest(rate=rate), self.assertRaises(ValueError):
+                parse_rate(rate)
+        self.assertEqual(parse_rate('5,20/hour'), (5, 20 / 3600))
+        with override_settings(PUBLIC_THROTTLE_RATES={'verify_qr_ip': '5,20/fortnight'}):
+            with self.assertRaises(ImproperlyConfigured):
+                check_rates()
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor links walk ties in the ordering without skipping or repeating rows."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.gym = create_gym(name='Cursor Gym')
+        self.addCleanup(deactivate_gym, activate_gym(self.gym.pk))
+        registered = timezone.now() - timedelta(days=1)
+        for number in range(7):
+            client = Client.objects.create(
+                gym=self.gym, first_name='Client', last_name=str(number), phone=f'+99890123450{number}',
+            )
+            Payment.objects.create(
+                gym=self.gym, client=client, amount=100 + 50 * (number % 2), payment_date=date(2026, 1, 1 + number % 3),
+            )
+        Client.objects.update(registration_date=registered)
+        self.client = gym_admin_client(self.gym)
+
+    def walk(self, url):
+        """Ids of every page reached by following ``next``, then ``previous`` back."""
+        forward, backward, pages = [], [], []
+        with mock.patch.object(OptionalKeysetPagination, 'page_size', 2):
+            while url:
+                data = self.client.get(url).data
+                pages.append([row['id'] for row in data['results']])
+                forward.extend(pages[-1])
+                url = data['next']
+            url = data['previous']
+            while url:
+                data = self.client.get(url).data
+                backward[:0] = [row['id'] for row in data['results']]
+                url = data['previous']
+        self.assertEqual(backward, forward[:len(backward)])
+        self.assertEqual(len(backward), len(forward) - len(pages[-1]))
+        return forward
+
+    def test_ties_in_a_uniform_ordering(self):
+        expected = list(Client.objects.order_by('-registration_date', '-id').values_list('pk', flat=True))
+        self.assertEqual(self.walk('/api/clients/?pagination=cursor'), expected)
+
+    def test_ties_in_a_mixed_ordering(self):
+        expected = list(Payment.objects.order_by('amount', '-payment_date', '-id').values_list('pk', flat=True))
+        self.assertEqual(self.walk('/api/payments/?pagination=cursor&ordering=amount,-payment_date'), expected)
+
+    def test_invalid_cursor_is_rejected(self):
+        cursors = {
+            'not base64': '%%%',
+            'not json': base64.urlsafe_b64encode(b'not json').decode('ascii'),
+            'not an object': base64.urlsafe_b64encode(b'[1, 2]').decode('ascii'),
+            'wrong length': base64.urlsafe_b64encode(b'{"v": ["1"]}').decode('ascii'),
+            'wrong type': base64.urlsafe_b64encode(b'{"v": ["yesterday", "x"]}').decode('ascii'),
+        }
+        for name, cursor in cursors.items():
+            with self.subTest(name):
+                response = self.client.get('/api/clients/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+
+
+class TenantArchiveTests(TestCase):
+    """A tenant exported and imported again keeps its rows, timestamps and ledger."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.gym = create_gym(name='Archived Gym')
+        registered = timezone.now() - timedelta(days=40)
+        with tenant(self.gym.pk):
+            for number, amount in ((0, 100), (1, 250)):
+                client = Client.objects.create(
+                    gym=self.gym, first_name='Client', last_name=str(number), phone=f'+99890123450{number}',
+                )
+                Client.objects.filter(pk=client.pk).update(registration_date=registered + timedelta(days=number))
+                payment = Payment.objects.create(
+                    gym=self.gym, client=client, amount=amount, payment_date=date(2026, 1, 10 + number),
+                )
+                Payment.objects.filter(pk=payment.pk).update(created_at=registered, updated_at=registered)
+            Expense.objects.create(gym=self.gym, category='Rent', amount=90, expense_date=date(2026, 1, 10))
+            rebuild_ledger([self.gym.pk])
+
+    def archive(self, extra_line=None):
+        buffer = io.BytesIO()
+        export_tenant(self.gym, buffer)
+        data = gzip.decompress(buffer.getvalue())
+        if extra_line is not None:
+            data += extra_line.encode('utf-8') + b'\n'
+        return io.BytesIO(gzip.compress(data))
+
+    def snapshot(self, gym):
+        with tenant(gym.pk):
+            return {
+                'clients': list(
+                    Client.objects.filter(gym=gym).order_by('phone')
+                    .values('first_name', 'last_name', 'phone', 'phone_normalized', 'registration_date')
+                ),
+                'payments': list(
+                    Payment.objects.filter(gym=gym).order_by('payment_date')
+                    .values('client__phone', 'amount', 'payment_date', 'created_at', 'updated_at')
+                ),
+                'expenses': list(
+                    Expense.objects.filter(gym=gym).values('category', 'amount', 'expense_date', 'created_at')
+                ),
+                'ledger': DailyLedger.objects.filter(gym=gym).totals(),
+            }
+
+    def test_round_trip(self):
+        result = import_tenant(self.archive())
+        gym = result.gym
+        self.assertNotEqual(gym.pk, self.gym.pk)
+        self.assertEqual((gym.name, gym.created_at), (self.gym.name, self.gym.created_at))
+        self.assertEqual(result.counts['clients.client'], 2)
+        self.assertEqual(self.snapshot(gym), self.snapshot(self.gym))
+
+        with tenant(self.gym.pk):
+            old_phones = dict(Client.objects.filter(gym=self.gym).values_list('pk', 'phone'))
+        with tenant(gym.pk):
+            new_phones = dict(Client.objects.filter(gym=gym).values_list('pk', 'phone'))
+        self.assertEqual(set(result.client_ids), set(old_phones))
+        for old_id, new_id in result.client_ids.items():
+            self.assertEqual(new_phones[new_id], old_phones[old_id])
+
+    def test_rejected_archive_creates_nothing(self):
+        gym_ids = set(Gym.objects.values_list('pk', flat=True))
+        line = '{"model": "payments.payment", "pk": 9, "fields": {"gym": 1, "client": 999999, "amount": "5.00"}}'
+        archives = {
+            'unknown client': self.archive(line),
+            'not an archive': io.BytesIO(gzip.compress(b'{"format": "other"}\n')),
+        }
+        for name, archive in archives.items():
+            with self.subTest(name), self.assertRaises(TenantArchiveError):
+                import_tenant(archive)
+        self.assertEqual(set(Gym.objects.values_list('pk', flat=True)), gym_ids)
+        for alias in connections:
+            self.assertFalse(Client._base_manager.using(alias).exclude(gym_id__in=gym_ids).exists(), alias)
+
+
+@skipUnless(sharding_enabled(), 'Run with DB_SHARDS=2 to test sharding.')
+class ShardedTenantTests(TransactionTestCase):
+    """Tenant reads, writes and gym updates reach the gym's shard."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name='Sharded Gym')
+        self.gym.refresh_from_db()
+        self.shard = self.gym.db_shard
+        with tenant(self.gym.pk):
+            self.existing = Client.objects.create(gym=self.gym, first_name='Ali', last_name='Valiyev', phone='+998901234567')
+        superuser = User.objects.create_superuser('root', password='password')
+        self.client = APIClient()
+        self.client.force_login(superuser)
+
+    def test_superuser_lists_need_a_gym(self):
+        self.assertEqual(self.client.get('/api/clients/').status_code, 400)
+        self.assertEqual(self.client.get('/api/payments/statistics/').status_code, 400)
+        response = self.client.get(f'/api/clients/?gym={self.gym.pk}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['results']], [self.existing.pk])
+
+    @override_settings(CACHE_SHARED=True)
+    def test_superuser_statistics_are_limited_to_the_gym(self):
+        cache.clear()
+        neighbour = Gym.objects.create(name='Neighbour Gym')
+        while neighbour.db_shard != self.shard:
+            neighbour = Gym.objects.create(name='Neighbour Gym')
+        for gym, amount in ((self.gym, 300), (neighbour, 105)):
+            with tenant(gym.pk):
+                client = Client.objects.create(gym=gym, first_name='Vali', last_name='Aliyev', phone='+998901234500')
+                Payment.objects.create(gym=gym, client=client, amount=amount)
+                Expense.objects.create(gym=gym, category=gym.name, amount=amount)
+
+        for gym, amount in ((self.gym, 300), (neighbour, 105)):
+            with self.subTest(gym=gym.name):
+                payments = self.client.get(f'/api/payments/statistics/?gym={gym.pk}').data
+                self.assertEqual(payments['total_income'], amount)
+                expenses = self.client.get(f'/api/expenses/statistics/?gym={gym.pk}').data
+                self.assertEqual(expenses['total_expenses'], amount)
+                self.assertEqual([row['category'] for row in expenses['category_breakdown']], [gym.name])
+
+    def test_superuser_writes_must_match_the_gym(self):
+        other = Gym.objects.create(name='Other Gym')
+        response = self.client.post(f'/api/clients/?gym={self.gym.pk}', {
+            'gym': other.pk, 'first_name': 'Vali', 'last_name': 'Aliyev', 'phone': '+998901234500',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_superuser_duplicate_phone_is_checked_on_the_shard(self):
+        response = self.client.post(f'/api/clients/?gym={self.gym.pk}', {
+            'gym': self.gym.pk, 'first_name': 'Ali', 'last_name': 'Second', 'phone': '90 123 45 67',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('phone', response.data)
+
+    def test_payment_takes_the_write_lock_of_the_shard(self):
+        with CaptureQueriesContext(connections[self.shard]) as shard_queries:
+            response = self.client.post(f'/api/payments/?gym={self.gym.pk}', {
+                'gym': self.gym.pk, 'client': self.existing.pk, 'amount': '100.00', 'payment_date': '2026-01-01',
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('BEGIN IMMEDIATE', [query['sql'] for query in shard_queries.captured_queries])
+
+    def tenant_rows(self, alias):
+        return {
+            model._meta.label: list(model._base_manager.using(alias).filter(gym=self.gym).order_by('pk').values())
+            for model in (Client, ClientSearchToken, Payment, Expense, DailyLedger)
+        }
+
+    def test_move_keeps_rows_timestamps_and_ledger(self):
+        with tenant(self.gym.pk):
+            Payment.objects.create(gym=self.gym, client=self.existing, amount=100, payment_date=date(2025, 9, 13))
+            Expense.objects.create(gym=self.gym, category='Rent', amount=40, expense_date=date(2025, 9, 13))
+        earlier = timezone.now() - timedelta(days=400)
+        for model in (Payment, Expense):
+            model._base_manager.using(self.shard).update(created_at=earlier, updated_at=earlier)
+        Client._base_manager.using(self.shard).update(registration_date=earlier)
+        rebuild_ledger([self.gym.pk], using=self.shard)
+        before = self.tenant_rows(self.shard)
+        target = next(alias for alias in shard_aliases() if alias != self.shard)
+
+        call_command('move_gym_shard', gym_ids=[self.gym.pk], to=target, wait=0, stdout=io.StringIO())
+
+        self.assertEqual(self.tenant_rows(target), before)
+        self.assertEqual(self.tenant_rows(self.shard), {label: [] for label in before})
+        self.assertEqual(Gym.objects.get(pk=self.gym.pk).db_shard, target)
+        response = self.client.get(f'/api/payments/statistics/?gym={self.gym.pk}')
+        self.assertEqual(response.data['total_income'], 100)
+
+    def test_moving_gym_refuses_writes(self):
+        Gym.objects.filter(pk=self.gym.pk).update(db_shard_moving=True)
+        forget_gym_shard(self.gym.pk)
+        self.addCleanup(forget_gym_shard, self.gym.pk)
+        response = self.client.post(f'/api/clients/?gym={self.gym.pk}', {
+            'gym': self.gym.pk, 'first_name': 'Vali', 'last_name': 'Aliyev', 'phone': '+998901234500',
+        }, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.client.get(f'/api/clients/?gym={self.gym.pk}').status_code, 200)
+
+    def test_block_updates_the_shard_copy(self):
+        Gym.objects.filter(pk=self.gym.pk).block()
+        self.assertFalse(Gym._base_manager.using(self.shard).get(pk=self.gym.pk).is_active)
+
+    def archive(self, extra_line=None):
+        buffer = io.BytesIO()
+        export_tenant(self.gym, buffer)
+        data = gzip.decompress(buffer.getvalue())
+        if extra_line is not None:
+            data += extra_line.encode('utf-8') + b'\n'
+        return io.BytesIO(gzip.compress(data))
+
+    def test_import_mirrors_the_gym_on_its_shard(self):
+        gym = import_tenant(self.archive()).gym
+        self.assertTrue(Gym._base_manager.using(gym.db_shard).filter(pk=gym.pk).exists())
+        self.assertEqual(Client._base_manager.using(gym.db_shard).filter(gym=gym).count(), 1)
+
+    def test_failed_import_leaves_no_gym_on_the_shards(self):
+        gym_ids = set(Gym.objects.values_list('pk', flat=True))
+        line = '{"model": "gyms.gym", "pk": 99, "fields": {"name": "Second Gym"}}'
+        with self.assertRaises(TenantArchiveError):
+            import_tenant(self.archive(line))
+        self.assertEqual(set(Gym.objects.values_list('pk', flat=True)), gym_ids)
+        for alias in connections:
+            self.assertFalse(Gym._base_manager.using(alias).exclude(pk__in=gym_ids).exists(), alias)
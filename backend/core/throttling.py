@@ -0,0 +1,141 @@
+"""
+Token-bucket throttles for the public (unauthenticated) endpoints.
+
+Each client identity (IP address, phone number) gets a bucket of ``burst``
+tokens, refilled at the sustained rate. A request takes one token; an empty
+bucket answers 429 with a ``Retry-After`` header (DRF's ``Throttled``).
+
+Rates are set in ``PUBLIC_THROTTLE_RATES`` as ``"<burst>,<requests>/<period>"``,
+e.g. ``"5,20/hour"``: five requests at once, then twenty an hour. A bucket is
+one cache entry holding ``(tokens, timestamp)``, so a check is one cache read
+and one write, with no database query. The entry expires once the bucket
+would be full again.
+
+Requests of superusers are not throttled: the Telegram bot, which makes
+every QR verification from one IP address, calls the API as a superuser.
+
+The buckets live in the ``default`` cache: with several worker processes use
+a shared cache backend, or each worker keeps its own buckets. Concurrent
+requests of one client may both take the last token; the limit is a bound on
+abuse, not an exact count.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.throttling import BaseThrottle
+
+from .utils import normalize_phone
+
+CACHE_KEY_PREFIX = 'throttle'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Parse ``"<burst>,<requests>/<period>"`` into (burst, tokens per second).
+
+    Returns None for an empty rate (throttling disabled); raises ValueError
+    for a malformed one.
+    """
+    if not rate:
+        return None
+    burst, _, sustained = rate.rpartition(',')
+    num, _, period = sustained.partition('/')
+    try:
+        num = int(num)
+        # "20/hour" alone allows the whole period's requests at once
+        burst = int(burst) if burst else num
+        seconds = PERIODS[period.strip()[:1]]
+    except (ValueError, KeyError):
+        raise ValueError(f'Invalid rate {rate!r}, expected "<burst>,<requests>/<period>".')
+    if num < 1:
+        raise ValueError(f'Invalid rate {rate!r}, the number of requests must be positive.')
+    return max(burst, 1), num / seconds
+
+
+def check_rates():
+    """Parse every ``PUBLIC_THROTTLE_RATES`` entry; called at startup."""
+    for scope, rate in settings.PUBLIC_THROTTLE_RATES.items():
+        try:
+            parse_rate(rate)
+        except ValueError as e:
+            raise ImproperlyConfigured(f'PUBLIC_THROTTLE_RATES[{scope!r}]: {e}')
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle on a token bucket per identity; subclasses set ``scope``."""
+
+    scope = None
+    cache = cache
+    timer = time.time
+
+    def __init__(self):
+        self.rate = parse_rate(settings.PUBLIC_THROTTLE_RATES.get(self.scope))
+        self._wait = None
+
+    def get_identity(self, request):
+        """The identity to throttle, or None to let the request through."""
+        raise NotImplementedError('.get_identity() must be overridden')
+
+    def get_cache_key(self, identity):
+        return f'{CACHE_KEY_PREFIX}:{self.scope}:{identity}'
+
+    def allow_request(self, request, view):
+        # Superusers, such as the Telegram bot's API account, aren't throttled.
+        if self.rate is None or request.user.is_superuser:
+            return True
+        identity = self.get_identity(request)
+        if identity is None:
+            return True
+
+        burst, per_second = self.rate
+        key = self.get_cache_key(identity)
+        now = self.timer()
+        tokens, stamp = self.cache.get(key) or (burst, now)
+        tokens = min(burst, tokens + (now - stamp) * per_second)
+        if tokens < 1:
+            self._wait = (1 - tokens) / per_second
+            return False
+
+        tokens -= 1
+        refill = math.ceil((burst - tokens) / per_second)
+        self.cache.set(key, (tokens, now), refill)
+        return True
+
+    def wait(self):
+        return self._wait
+
+
+class IPThrottle(TokenBucketThrottle):
+    """Bucket per client IP address (see ``NUM_PROXIES`` behind a proxy)."""
+
+    def get_identity(self, request):
+        ident = self.get_ident(request)
+        if not ident or ident in settings.PUBLIC_THROTTLE_EXEMPT_IPS:
+            return None
+        return ident
+
+
+class PhoneThrottle(TokenBucketThrottle):
+    """Bucket per phone number posted in the request body, in E.164."""
+
+    def get_identity(self, request):
+        phone = request.data.get('phone') if isinstance(request.data, dict) else None
+        return normalize_phone(str(phone)) if phone else None
+
+
+class RegistrationIPThrottle(IPThrottle):
+    scope = 'register_ip'
+
+
+class RegistrationPhoneThrottle(PhoneThrottle):
+    scope = 'register_phone'
+
+
+class VerifyQRThrottle(IPThrottle):
+    scope = 'verify_qr_ip'
+
+
+REGISTRATION_THROTTLES = [RegistrationIPThrottle, RegistrationPhoneThrottle]
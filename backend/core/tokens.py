@@ -0,0 +1,96 @@
+"""
+Stateless signed API tokens.
+
+A token carries a gym id, the actions it allows, an expiry time and a label,
+signed with HMAC-SHA256 under ``API_TOKEN_SECRET``. Verifying one takes no
+database query. A single token can't be revoked: keep lifetimes short, and
+rotate ``API_TOKEN_SECRET`` to invalidate every token at once.
+
+Actions are ``<scope>.<action>`` strings such as ``clients.create`` or
+``payments.batch``; ``<scope>.*`` allows every action of a scope. Views
+accept tokens by setting ``token_scope`` (see ``core.authentication``).
+"""
+import re
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+
+TOKEN_SALT = 'fit_control.api_token'
+TOKEN_KEYWORD = 'Bearer'
+TOKEN_SCOPES = ('clients', 'payments', 'expenses', 'gym', 'qr_code')
+ACTION_PATTERN = re.compile(r'^(?P<scope>[a-z_]+)\.(?P<action>[a-z_]+|\*)$')
+
+
+class InvalidApiToken(ValueError):
+    """The token is malformed, wrongly signed or expired."""
+
+
+class ApiToken:
+    """Verified contents of a token."""
+
+    def __init__(self, gym_id, actions, expires_at, name=''):
+        self.gym_id = gym_id
+        self.actions = frozenset(actions)
+        self.expires_at = expires_at
+        self.name = name
+
+    @property
+    def expires(self):
+        return datetime.fromtimestamp(self.expires_at, tz=dt_timezone.utc)
+
+    def allows(self, scope, action):
+        """Whether the token may run ``action`` of the views in ``scope``."""
+        if not scope or not action:
+            return False
+        return f'{scope}.{action}' in self.actions or f'{scope}.*' in self.actions
+
+
+def _signer():
+    return signing.Signer(key=settings.API_TOKEN_SECRET, salt=TOKEN_SALT)
+
+
+def action_error(action):
+    """Why ``action`` can't be put in a token, or None if it can."""
+    match = ACTION_PATTERN.match(action)
+    if match is None:
+        return f'"{action}" is not of the form <scope>.<action>.'
+    if match['scope'] not in TOKEN_SCOPES:
+        return f"Unknown scope \"{match['scope']}\"; expected one of: {', '.join(TOKEN_SCOPES)}."
+    return None
+
+
+def issue_token(gym_id, actions, ttl=None, name=''):
+    """Sign a token for ``gym_id``; returns ``(token, ApiToken)``."""
+    ttl = settings.API_TOKEN_TTL if ttl is None else ttl
+    token = ApiToken(gym_id, sorted(set(actions)), int(time.time()) + ttl, name)
+    payload = {'g': token.gym_id, 'a': sorted(token.actions), 'e': token.expires_at, 'n': token.name}
+    return _signer().sign_object(payload, compress=True), token
+
+
+def read_token(value):
+    """Verify a token string and return its ``ApiToken``."""
+    try:
+        payload = _signer().unsign_object(value)
+        token = ApiToken(int(payload['g']), payload['a'], int(payload['e']), payload.get('n', ''))
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise InvalidApiToken('Invalid token.')
+    if token.expires_at <= time.time():
+        raise InvalidApiToken('Token has expired.')
+    return token
+
+
+def token_from_request(request):
+    """
+    The valid token in the ``Authorization`` header of a Django request.
+
+    Returns None when there is no bearer token or it doesn't verify.
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(header) != 2 or header[0].lower() != TOKEN_KEYWORD.lower():
+        return None
+    try:
+        return read_token(header[1])
+    except InvalidApiToken:
+        return None
@@ -1,7 +1,8 @@
 """
-Utility functions for QR code generation and Telegram notifications.
+Utility functions for QR code generation, Telegram notifications and phone numbers.
 """
 import qrcode
+import re
 import requests
 import logging
 from io import BytesIO
@@ -65,3 +66,32 @@ def send_telegram_message(message, chat_id=None, bot_token=None):
     except Exception as e:
         logger.error(f"Failed to send Telegram message: {str(e)}")
         return False
+
+
+def normalize_phone(phone, default_country_code=None):
+    """Normalize a free-text phone number to E.164 (``+998901234567``).
+    
+    Separators are dropped, a leading ``00`` international prefix is removed
+    and bare local numbers (9 digits) get ``PHONE_DEFAULT_COUNTRY_CODE``.
+    
+    Args:
+        phone: Phone number as entered by a user
+        default_country_code: Country code for local numbers (optional, uses settings if not provided)
+    
+    Returns:
+        str: E.164 phone number, or None if ``phone`` has no usable digits
+    """
+    from django.conf import settings
+    
+    digits = re.sub(r'\D', '', phone or '')
+    if digits.startswith('00'):
+        digits = digits[2:]
+    if not digits:
+        return None
+    
+    country_code = default_country_code or getattr(settings, 'PHONE_DEFAULT_COUNTRY_CODE', '')
+    if country_code and len(digits) == 9:
+        digits = country_code + digits
+    if len(digits) > 15:
+        return None
+    return f'+{digits}'
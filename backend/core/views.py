@@ -2,12 +2,14 @@
 API views for authentication and core functionality.
 """
 from rest_framework import status, generics
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from django.contrib.auth import login
 from .serializers import UserSerializer, LoginSerializer, QRCodeSerializer
 from .models import User, QRCode
+from .qrcodes import lookup as lookup_qr_token
+from .throttling import VerifyQRThrottle
 
 
 @api_view(['POST'])
@@ -52,6 +54,7 @@ class QRCodeDetailView(generics.RetrieveAPIView):
     """Get QR code for gym."""
     serializer_class = QRCodeSerializer
     permission_classes = [IsAuthenticated]
+    token_scope = 'qr_code'
     
     def get_object(self):
         """Get QR code for current user's gym."""
@@ -84,6 +87,7 @@ class QRCodeDetailView(generics.RetrieveAPIView):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@throttle_classes([VerifyQRThrottle])
 def verify_qr_token(request, token):
     """Verify QR token for Telegram bot."""
     try:
@@ -93,17 +97,18 @@ def verify_qr_token(request, token):
                 'error': 'Token is required.'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        qr_code = QRCode.objects.get(token=token)
+        qr_gym = lookup_qr_token(token)
+        if qr_gym is None:
+            return Response({
+                'valid': False,
+                'error': 'Invalid QR token'
+            }, status=status.HTTP_404_NOT_FOUND)
         return Response({
             'valid': True,
-            'gym_id': qr_code.gym.id,
-            'gym_name': qr_code.gym.name,
+            'gym_id': qr_gym.gym_id,
+            'gym_name': qr_gym.gym_name,
+            'is_active': qr_gym.is_active,
         }, status=status.HTTP_200_OK)
-    except QRCode.DoesNotExist:
-        return Response({
-            'valid': False,
-            'error': 'Invalid QR token'
-        }, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({
             'valid': False,
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['gym', '-expense_date', '-created_at', '-id'], name='expense_gym_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['gym', 'category', '-expense_date', '-created_at', '-id'], name='expense_gym_category_idx'),
+        ),
+    ]
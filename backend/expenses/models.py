@@ -1,8 +1,9 @@
 """
 Expense models.
 """
-from django.db import models
+from django.db import models, router, transaction
 from django.utils import timezone
+from core.sharding import TenantQuerySet
 
 
 class Expense(models.Model):
@@ -15,10 +16,22 @@ class Expense(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TenantQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Expense'
         verbose_name_plural = 'Expenses'
         ordering = ['-expense_date', '-created_at']
+        indexes = [
+            models.Index(fields=['gym', '-expense_date', '-created_at', '-id'], name='expense_gym_date_idx'),
+            models.Index(fields=['gym', 'category', '-expense_date', '-created_at', '-id'], name='expense_gym_category_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        """Save atomically together with the gym ledger update."""
+        using = kwargs.get('using') or router.db_for_write(self.__class__, instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.category} - {self.amount} ({self.expense_date})"
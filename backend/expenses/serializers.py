@@ -2,6 +2,7 @@
 Serializers for expense models.
 """
 from rest_framework import serializers
+from core.serializers import ValuesListSerializer
 from .models import Expense
 
 
@@ -16,3 +17,12 @@ class ExpenseSerializer(serializers.ModelSerializer):
             'description', 'expense_date', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+class ExpenseListSerializer(ValuesListSerializer):
+    """Lean list representation of expenses."""
+    serializer_class = ExpenseSerializer
+    lookups = {
+        'gym': 'gym_id',
+        'gym_name': 'gym__name',
+    }
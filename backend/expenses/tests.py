@@ -0,0 +1,45 @@
+"""
+Tests for the expenses app.
+"""
+from datetime import date
+
+from django.test import TestCase
+
+from core.testing import ListQueryCountAssertions, QueryPlanAssertions, create_gym, gym_admin_client
+from .models import Expense
+
+
+class ExpenseListQueryTests(QueryPlanAssertions, ListQueryCountAssertions, TestCase):
+    """
+    The gym admin's expense list and filters read through the gym indexes, in a
+    number of queries that doesn't grow with the page size.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.gym = create_gym(name='Plan Gym')
+        other = create_gym(name='Other Gym')
+        for gym in (cls.gym, other):
+            for day in range(1, 6):
+                for category in ('Rent', 'Equipment'):
+                    Expense.objects.create(gym=gym, category=category, amount=50, expense_date=date(2026, 1, day))
+
+    def setUp(self):
+        self.client = gym_admin_client(self.gym)
+
+    def test_list(self):
+        self.assertIndexed('/api/expenses/', 'expenses_expense', 'expense_gym_date_idx')
+
+    def test_list_query_count(self):
+        self.assertListQueries('/api/expenses/', 2, 1)
+
+    def test_filter_by_category(self):
+        # Both indexes give the rows of the gym in date order; SQLite picks
+        # by its cost estimate.
+        self.assertIndexed(
+            '/api/expenses/?category=Rent', 'expenses_expense',
+            'expense_gym_category_idx', 'expense_gym_date_idx',
+        )
+
+    def test_filter_by_date(self):
+        self.assertIndexed('/api/expenses/?expense_date=2026-01-03', 'expenses_expense', 'expense_gym_date_idx')
@@ -7,26 +7,34 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Sum
+from core.mixins import CSVExportMixin, ShardedTenantMixin, ValuesListMixin
+from core.pagination import OptionalKeysetPagination
 from .models import Expense
-from .serializers import ExpenseSerializer
+from .serializers import ExpenseListSerializer, ExpenseSerializer
+from gyms.cache import ALL_GYMS, cached_statistics, statistics_scope
+from gyms.models import DailyLedger
 
 
-class ExpenseViewSet(viewsets.ModelViewSet):
+class ExpenseViewSet(ShardedTenantMixin, CSVExportMixin, ValuesListMixin, viewsets.ModelViewSet):
     """ViewSet for expense management."""
     serializer_class = ExpenseSerializer
+    list_serializer_class = ExpenseListSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['gym', 'category', 'expense_date']
     search_fields = ['category', 'description']
     ordering_fields = ['expense_date', 'amount', 'created_at']
-    ordering = ['-expense_date', '-created_at']
+    ordering = ['-expense_date', '-created_at', '-id']
+    pagination_class = OptionalKeysetPagination
+    export_filename = 'expenses'
+    token_scope = 'expenses'
     
     def get_queryset(self):
         """Get expenses for current user's gym."""
         if self.request.user.is_superuser:
-            return Expense.objects.all()
-        elif self.request.user.is_gym_admin and self.request.user.gym:
-            return Expense.objects.filter(gym=self.request.user.gym)
+            return Expense.objects.select_related('gym')
+        elif self.request.user.is_gym_admin and self.request.user.gym_id:
+            return Expense.objects.filter(gym_id=self.request.user.gym_id).select_related('gym')
         return Expense.objects.none()
     
     def perform_create(self, serializer):
@@ -38,28 +46,32 @@ class ExpenseViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        """Get expense statistics."""
-        queryset = self.get_queryset()
-        
-        total_expenses = queryset.aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Monthly statistics
+        """Get expense statistics from the daily ledger."""
         from django.utils import timezone
-        from datetime import timedelta
         
         current_month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        monthly_expenses = queryset.filter(
-            expense_date__gte=current_month_start
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        scope = statistics_scope(request.user)
         
-        # Category breakdown
-        category_breakdown = queryset.values('category').annotate(
-            total=Sum('amount')
-        ).order_by('-total')
+        def compute():
+            ledger = DailyLedger.objects.for_user(request.user)
+            totals = ledger.totals()
+            
+            # Monthly statistics
+            monthly = ledger.filter(date__gte=current_month_start.date()).totals()
+            
+            # Category breakdown
+            expenses = self.get_queryset()
+            if scope not in (None, ALL_GYMS):
+                expenses = expenses.filter(gym_id=scope)
+            category_breakdown = expenses.values('category').annotate(
+                total=Sum('amount')
+            ).order_by('-total')
+            
+            return {
+                'total_expenses': float(totals['expenses']),
+                'monthly_expenses': float(monthly['expenses']),
+                'total_expense_records': totals['expenses_count'],
+                'category_breakdown': list(category_breakdown),
+            }
         
-        return Response({
-            'total_expenses': float(total_expenses),
-            'monthly_expenses': float(monthly_expenses),
-            'total_expense_records': queryset.count(),
-            'category_breakdown': list(category_breakdown),
-        })
+        return Response(cached_statistics('expenses', scope, compute, current_month_start.date()))
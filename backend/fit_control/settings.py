@@ -92,8 +92,53 @@ DATABASES = {
         'OPTIONS': {
             'timeout': 20,  # Wait up to 20 seconds for database to unlock
         },
+        # Keep connections open between requests (seconds, 0 = close after each request)
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
+
+# Optional read replica for reporting queries (statistics, series, expired
+# gyms). Set DB_REPLICA_NAME to a SQLite file kept in sync with the primary,
+# e.g. by `manage.py sync_replica`; see core.routers.
+DB_REPLICA_NAME = config('DB_REPLICA_NAME', default='')
+if DB_REPLICA_NAME:
+    DB_REPLICA_PATH = Path(DB_REPLICA_NAME) if os.path.isabs(DB_REPLICA_NAME) else BASE_DIR / DB_REPLICA_NAME
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': str(DB_REPLICA_PATH.resolve()),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Optional database-per-tenant sharding: DB_SHARDS=N adds shard_0..shard_N-1
+# next to the default database (see core.sharding). Migrate each one with
+# `manage.py migrate --database shard_<n>`.
+DB_SHARDS = config('DB_SHARDS', default=0, cast=int)
+for shard_index in range(DB_SHARDS):
+    DATABASES[f'shard_{shard_index}'] = {
+        **DATABASES['default'],
+        'NAME': str(DB_PATH.parent.resolve() / f'{DB_PATH.stem}_shard_{shard_index}{DB_PATH.suffix}'),
+    }
+# Seconds each process caches a gym's shard
+DB_SHARD_MAP_TTL = config('DB_SHARD_MAP_TTL', default=30, cast=int)
+
+DATABASE_ROUTERS = ['core.sharding.ShardRouter', 'core.routers.ReplicaRouter']
+
+# Fall back to the primary when the replica heartbeat is older than this (seconds)
+DB_REPLICA_MAX_LAG = config('DB_REPLICA_MAX_LAG', default=60, cast=int)
+# How often each process re-checks the replica heartbeat (seconds)
+DB_REPLICA_CHECK_INTERVAL = config('DB_REPLICA_CHECK_INTERVAL', default=5, cast=int)
+
+# SQLite PRAGMAs applied to every new connection (see core.db).
+# WAL lets readers run alongside a writer; an empty value skips a PRAGMA.
+SQLITE_PRAGMAS = {
+    'journal_mode': config('SQLITE_JOURNAL_MODE', default='WAL'),
+    'synchronous': config('SQLITE_SYNCHRONOUS', default='NORMAL'),
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default='20000'),  # milliseconds
+    'mmap_size': config('SQLITE_MMAP_SIZE', default='268435456'),  # bytes (256 MB)
+    'cache_size': config('SQLITE_CACHE_SIZE', default='-65536'),  # negative = KiB (64 MB)
+    'temp_store': config('SQLITE_TEMP_STORE', default='MEMORY'),
+}
 # DATABASES = {
 #     'default': {
 #         'ENGINE': 'django.db.backends.postgresql',
@@ -105,6 +150,54 @@ DATABASES = {
 #     }
 # }
 
+# Writes wrapped in core.db.retry_on_locked retry this many times while the
+# database is locked, sleeping a random 0..min(max, base * 2^n) seconds
+DB_WRITE_RETRY_ATTEMPTS = config('DB_WRITE_RETRY_ATTEMPTS', default=5, cast=int)
+DB_WRITE_RETRY_BASE_DELAY = config('DB_WRITE_RETRY_BASE_DELAY', default=0.05, cast=float)
+DB_WRITE_RETRY_MAX_DELAY = config('DB_WRITE_RETRY_MAX_DELAY', default=1.0, cast=float)
+
+# Cache
+# Local-memory by default; set CACHE_BACKEND to
+# django.core.cache.backends.filebased.FileBasedCache and CACHE_LOCATION to a
+# directory to share the cache between worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='fit-control'),
+    }
+}
+
+# Whether all worker processes share the cache above. Caches that every worker
+# must see invalidated (statistics, tenant contexts, cached sessions) are only
+# used when they do. The local-memory cache is per process: set
+# CACHE_SHARED=True with it only for a single-process deployment.
+CACHE_SHARED = config('CACHE_SHARED', default='locmem' not in CACHES['default']['BACKEND'].lower(), cast=bool)
+
+# Seconds a computed statistics payload may be reused (invalidated on writes)
+STATS_CACHE_TIMEOUT = config('STATS_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds the role flags and gym id of a logged-in user may be reused without
+# querying (invalidated on user saves; 0 disables, as does CACHE_SHARED=False)
+TENANT_CONTEXT_TTL = config('TENANT_CONTEXT_TTL', default=60, cast=int)
+
+# Token-to-gym lookup of QR verification (see core.qrcodes): seconds in the
+# shared cache, and size and seconds of the per-process LRU in front of it.
+# Without CACHE_SHARED, lookups are cached QR_LOOKUP_LOCAL_TTL seconds at most,
+# so blocked gyms reach the web workers no later than that.
+QR_LOOKUP_TTL = config('QR_LOOKUP_TTL', default=300, cast=int)
+QR_LOOKUP_LOCAL_SIZE = config('QR_LOOKUP_LOCAL_SIZE', default=1024, cast=int)
+QR_LOOKUP_LOCAL_TTL = config('QR_LOOKUP_LOCAL_TTL', default=30, cast=int)
+
+# Sessions are stored in the database. SESSION_ENGINE=core.sessions reads them
+# through the cache instead, which needs CACHE_SHARED (see core.sessions).
+# Purge expired rows with `manage.py purge_sessions`.
+SESSION_ENGINE = config('SESSION_ENGINE', default='django.contrib.sessions.backends.db')
+SESSION_CACHE_ALIAS = 'default'
+# Seconds a session may be served from the cache before it is re-read
+SESSION_CACHE_TIMEOUT = config('SESSION_CACHE_TIMEOUT', default=300, cast=int)
+# Unchanged sessions are only re-saved when their expiry moved this much
+SESSION_TOUCH_INTERVAL = config('SESSION_TOUCH_INTERVAL', default=300, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -153,7 +246,10 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework
 REST_FRAMEWORK = {
+    # The token class comes first so failed requests get 401 with
+    # "WWW-Authenticate: Bearer" (SessionAuthentication would make them 403)
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'core.authentication.ApiTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -166,8 +262,26 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    # Proxies in front of the app whose X-Forwarded-For is trusted for the
+    # client IP (0: use REMOTE_ADDR)
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
+# Token buckets of the public endpoints (see core.throttling):
+# "<burst>,<requests>/<second|minute|hour|day>"; empty disables one
+PUBLIC_THROTTLE_RATES = {
+    'register_ip': config('THROTTLE_REGISTER_IP', default='5,20/hour'),
+    'register_phone': config('THROTTLE_REGISTER_PHONE', default='3,5/day'),
+    'verify_qr_ip': config('THROTTLE_VERIFY_QR_IP', default='30,300/minute'),
+}
+# Addresses never throttled by IP; superusers, such as the bot, never are
+PUBLIC_THROTTLE_EXEMPT_IPS = config('THROTTLE_EXEMPT_IPS', default='', cast=lambda v: [s.strip() for s in v.split(',') if s.strip()])
+
+# Signed API tokens (see core.tokens); rotating the secret revokes all tokens
+API_TOKEN_SECRET = config('API_TOKEN_SECRET', default=SECRET_KEY)
+API_TOKEN_TTL = config('API_TOKEN_TTL', default=3600, cast=int)
+API_TOKEN_MAX_TTL = config('API_TOKEN_MAX_TTL', default=30 * 24 * 3600, cast=int)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = config(
     'CORS_ALLOWED_ORIGINS',
@@ -182,6 +296,12 @@ AUTH_USER_MODEL = 'core.User'
 # Trial period (days)
 TRIAL_PERIOD_DAYS = 14
 
+# Threads hashing admin passwords during bulk gym provisioning
+PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', default=os.cpu_count() or 1, cast=int)
+
+# Country code prepended to local phone numbers when normalizing to E.164
+PHONE_DEFAULT_COUNTRY_CODE = config('PHONE_DEFAULT_COUNTRY_CODE', default='998')
+
 # Telegram Bot
 TELEGRAM_BOT_TOKEN = config('TELEGRAM_BOT_TOKEN', default='')
 TELEGRAM_BOT_USERNAME = config('TELEGRAM_BOT_USERNAME', default='')
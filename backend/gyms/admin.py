@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Gym, TrialRequest
+from .models import Gym, DailyLedger, TrialRequest
 
 
 @admin.register(Gym)
@@ -51,3 +51,11 @@ class TrialRequestAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         }),
     )
+
+
+@admin.register(DailyLedger)
+class DailyLedgerAdmin(admin.ModelAdmin):
+    """Admin interface for DailyLedger model."""
+    list_display = ['gym', 'date', 'income', 'expenses', 'payments_count', 'expenses_count', 'clients_count']
+    list_filter = ['gym', 'date']
+    date_hierarchy = 'date'
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class GymsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gyms'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,121 @@
+"""
+Versioned cache for per-gym statistics.
+
+Every cached statistics payload is keyed by a per-gym data version. Writes to
+payments, expenses and clients replace that version (see ``gyms.signals``), so
+stale entries are simply never looked up again and expire on their own.
+
+A version is the time of the write that set it. Setting a new one, rather than
+incrementing the old one, can't lose a bump on backends without an atomic
+``incr`` (such as the file-based one). Every worker has to see the bump, so
+payloads are only cached when the cache is shared between processes
+(``CACHE_SHARED``); otherwise statistics are computed on every request. The
+hit/miss counters are approximate on backends without an atomic ``incr``.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from core.routers import reporting_reads
+
+
+ALL_GYMS = 'all'
+VERSION_KEY = 'stats:version:{scope}'
+ENTRY_KEY = 'stats:{name}:{scope}:{version}'
+HITS_KEY = 'stats:hits'
+MISSES_KEY = 'stats:misses'
+
+
+def _fresh_version():
+    """
+    A new data version: the current time in nanoseconds.
+
+    Clock based, so a version key that was evicted never restarts at a number
+    whose entries may still be cached.
+    """
+    return time.time_ns()
+
+
+def _increment(key, initial):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, initial, timeout=None)
+        return initial
+
+
+def statistics_scope(user):
+    """Cache scope for the statistics a user can see, or None if uncacheable."""
+    if user.is_superuser:
+        from core.sharding import sharded_gym
+        return sharded_gym() or ALL_GYMS
+    elif user.is_gym_admin and user.gym_id:
+        return user.gym_id
+    return None
+
+
+def get_data_version(scope):
+    """Current data version for a gym id (or ``ALL_GYMS``)."""
+    key = VERSION_KEY.format(scope=scope)
+    version = cache.get(key)
+    if version is None:
+        version = _fresh_version()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_data_version(gym_id):
+    """Invalidate cached statistics for a gym and for the all-gyms scope."""
+    version = _fresh_version()
+    cache.set_many({VERSION_KEY.format(scope=scope): version for scope in (gym_id, ALL_GYMS)}, timeout=None)
+
+
+def cached_statistics(name, scope, compute, *key_parts):
+    """
+    Return ``compute()`` through the cache for the given scope.
+
+    ``key_parts`` distinguishes payloads that also depend on something other
+    than the data, such as the current month. ``compute()`` reads from the
+    replica when one is available, unless the data changed less than
+    ``DB_REPLICA_MAX_LAG`` ago.
+    """
+    if scope is None or not settings.CACHE_SHARED:
+        with reporting_reads():
+            return compute()
+
+    version = get_data_version(scope)
+    key = ENTRY_KEY.format(name=name, scope=scope, version=version)
+    if key_parts:
+        key = ':'.join([key, *map(str, key_parts)])
+
+    value = cache.get(key)
+    if value is not None:
+        _increment(HITS_KEY, 1)
+        return value
+
+    _increment(MISSES_KEY, 1)
+    # The version is the time of the last write, which a lagging replica may
+    # not have yet; the payload would be cached under the new version.
+    with reporting_reads(written_at=version / 1e9) as alias:
+        value = compute()
+    timeout = settings.STATS_CACHE_TIMEOUT
+    if alias != DEFAULT_DB_ALIAS:
+        # The replica may lag behind the version this entry is stored under.
+        timeout = min(timeout, settings.DB_REPLICA_MAX_LAG)
+    cache.set(key, value, timeout)
+    return value
+
+
+def statistics_cache_counters():
+    """Hit/miss counters shared by all workers using the same cache."""
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = counters.get(HITS_KEY, 0)
+    misses = counters.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
@@ -0,0 +1,204 @@
+"""
+Helpers for maintaining the per-gym daily ledger rollup.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .cache import bump_data_version
+from .models import DailyLedger
+
+
+# Source model label -> (date field, amount ledger column, count ledger column)
+LEDGER_SOURCES = {
+    'payments.Payment': ('payment_date', 'income', 'payments_count'),
+    'expenses.Expense': ('expense_date', 'expenses', 'expenses_count'),
+    'clients.Client': ('registration_date', None, 'clients_count'),
+}
+
+
+def ledger_date(value):
+    """Normalize a date/datetime value to the local calendar day it belongs to."""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    return value
+
+
+def ledger_entry(instance):
+    """
+    Return the ``(gym_id, date, deltas)`` contribution of a source instance.
+
+    ``deltas`` maps ledger columns to the amounts this instance adds.
+    """
+    date_field, amount_column, count_column = LEDGER_SOURCES[instance._meta.label]
+    deltas = {count_column: 1}
+    if amount_column:
+        deltas[amount_column] = Decimal(str(instance.amount or 0))
+    return instance.gym_id, ledger_date(getattr(instance, date_field)), deltas
+
+
+def apply_ledger_delta(gym_id, date, deltas, using=None, create=True):
+    """
+    Add ``deltas`` to the ledger row for ``(gym_id, date)``.
+
+    The row is updated in place with ``F()`` expressions so concurrent writers
+    don't lose increments. When no row exists and ``create`` is set, it is
+    inserted; decrements pass ``create=False`` so cascaded deletes never
+    resurrect rows for a gym that is being removed.
+    """
+    deltas = {column: value for column, value in deltas.items() if value}
+    if not deltas or gym_id is None or date is None:
+        return
+
+    rows = DailyLedger.objects.using(using).filter(gym_id=gym_id, date=date)
+    updates = {column: F(column) + value for column, value in deltas.items()}
+    if rows.update(**updates) or not create:
+        return
+
+    try:
+        with transaction.atomic(using=using):
+            DailyLedger.objects.using(using).create(gym_id=gym_id, date=date, **deltas)
+    except IntegrityError:
+        # Another writer inserted the row first; fold our delta into it.
+        rows.update(**updates)
+
+
+def add_to_ledger(instances, using=None):
+    """
+    Add the contributions of freshly inserted source instances to the ledger.
+
+    For rows created with ``bulk_create``, which sends no signals. Deltas are
+    summed per gym and day first, so each ledger row is updated once per
+    call, and each gym's statistics version is bumped once on commit.
+    """
+    totals = {}
+    for instance in instances:
+        gym_id, date, deltas = ledger_entry(instance)
+        entry = totals.setdefault((gym_id, date), {})
+        for column, value in deltas.items():
+            entry[column] = entry.get(column, 0) + value
+
+    for (gym_id, date), deltas in totals.items():
+        apply_ledger_delta(gym_id, date, deltas, using=using)
+    for gym_id in {gym_id for gym_id, _ in totals}:
+        transaction.on_commit(lambda gym_id=gym_id: bump_data_version(gym_id), using=using)
+
+
+def rebuild_ledger(gym_ids, using=None):
+    """
+    Recompute the ledger rows for the given gyms from the source tables.
+
+    Returns the number of ledger rows written.
+    """
+    from clients.models import Client
+    from payments.models import Payment
+    from expenses.models import Expense
+
+    rows = {}
+
+    def collect(queryset, date_field, amount_column, count_column):
+        annotations = {'records': Count('id')}
+        if amount_column:
+            annotations['total'] = Sum('amount')
+        values = queryset.values('gym_id', date_field).annotate(**annotations)
+        for row in values.order_by():
+            entry = rows.setdefault(
+                (row['gym_id'], ledger_date(row[date_field])),
+                {},
+            )
+            entry[count_column] = entry.get(count_column, 0) + row['records']
+            if amount_column:
+                entry[amount_column] = entry.get(amount_column, 0) + (row['total'] or 0)
+
+    with transaction.atomic(using=using):
+        collect(
+            Payment.objects.using(using).filter(gym_id__in=gym_ids),
+            'payment_date', 'income', 'payments_count',
+        )
+        collect(
+            Expense.objects.using(using).filter(gym_id__in=gym_ids),
+            'expense_date', 'expenses', 'expenses_count',
+        )
+        collect(
+            Client.objects.using(using).filter(gym_id__in=gym_ids).annotate(
+                registration_day=TruncDate('registration_date')
+            ),
+            'registration_day', None, 'clients_count',
+        )
+        DailyLedger.objects.using(using).filter(gym_id__in=gym_ids).delete()
+        DailyLedger.objects.using(using).bulk_create(
+            [
+                DailyLedger(gym_id=gym_id, date=date, **columns)
+                for (gym_id, date), columns in rows.items()
+            ],
+            batch_size=500,
+        )
+    for gym_id in gym_ids:
+        transaction.on_commit(lambda gym_id=gym_id: bump_data_version(gym_id), using=using)
+    return len(rows)
+
+
+SERIES_INTERVALS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def bucket_start(date, interval):
+    """Return the first day of the ``interval`` bucket containing ``date``."""
+    if interval == 'week':
+        return date - timedelta(days=date.weekday())
+    if interval == 'month':
+        return date.replace(day=1)
+    return date
+
+
+def next_bucket(date, interval):
+    """Return the first day of the bucket following the one starting at ``date``."""
+    if interval == 'week':
+        return date + timedelta(days=7)
+    if interval == 'month':
+        return (date.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return date + timedelta(days=1)
+
+
+def ledger_series(gym_id, interval, start, end, using=None):
+    """
+    Income, expenses and profit for ``gym_id`` bucketed by ``interval``.
+
+    Totals come from a single ``GROUP BY`` over the daily ledger; buckets
+    without any activity are filled with zeros so charts get a continuous
+    axis from ``start`` to ``end`` (inclusive).
+    """
+    trunc = SERIES_INTERVALS[interval]
+    rows = (
+        DailyLedger.objects.using(using)
+        .filter(gym_id=gym_id, date__gte=start, date__lte=end)
+        .annotate(period=trunc('date'))
+        .values('period')
+        .annotate(income=Sum('income'), expenses=Sum('expenses'))
+        .order_by('period')
+    )
+    totals = {ledger_date(row['period']): row for row in rows}
+
+    series = []
+    period = bucket_start(start, interval)
+    while period <= end:
+        row = totals.get(period, {})
+        income = row.get('income') or 0
+        expenses = row.get('expenses') or 0
+        series.append({
+            'period': period,
+            'income': float(income),
+            'expenses': float(expenses),
+            'profit': float(income - expenses),
+        })
+        period = next_bucket(period, interval)
+    return series
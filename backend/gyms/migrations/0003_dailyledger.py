@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_ledger(apps, schema_editor):
+    """Populate the ledger from existing payments, expenses and clients."""
+    DailyLedger = apps.get_model('gyms', 'DailyLedger')
+    Payment = apps.get_model('payments', 'Payment')
+    Expense = apps.get_model('expenses', 'Expense')
+    Client = apps.get_model('clients', 'Client')
+    using = schema_editor.connection.alias
+    
+    rows = {}
+    sources = [
+        (Payment.objects.using(using), 'payment_date', 'income', 'payments_count'),
+        (Expense.objects.using(using), 'expense_date', 'expenses', 'expenses_count'),
+        (
+            Client.objects.using(using).annotate(registration_day=TruncDate('registration_date')),
+            'registration_day', None, 'clients_count',
+        ),
+    ]
+    for queryset, date_field, amount_column, count_column in sources:
+        annotations = {'records': Count('id')}
+        if amount_column:
+            annotations['total'] = Sum('amount')
+        for row in queryset.values('gym_id', date_field).annotate(**annotations).order_by():
+            entry = rows.setdefault((row['gym_id'], row[date_field]), {})
+            entry[count_column] = row['records']
+            if amount_column:
+                entry[amount_column] = row['total'] or 0
+    
+    DailyLedger.objects.using(using).bulk_create(
+        [DailyLedger(gym_id=gym_id, date=date, **columns) for (gym_id, date), columns in rows.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0002_trialrequest'),
+        ('payments', '0001_initial'),
+        ('expenses', '0001_initial'),
+        ('clients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('income', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Income')),
+                ('expenses', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Expenses')),
+                ('payments_count', models.IntegerField(default=0, verbose_name='Payments Count')),
+                ('expenses_count', models.IntegerField(default=0, verbose_name='Expenses Count')),
+                ('clients_count', models.IntegerField(default=0, verbose_name='Clients Count')),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='gyms.gym')),
+            ],
+            options={
+                'verbose_name': 'Daily Ledger',
+                'verbose_name_plural': 'Daily Ledger',
+                'ordering': ['-date'],
+                'unique_together': {('gym', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0003_dailyledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gym',
+            index=models.Index(fields=['trial_end_date'], name='gym_trial_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gym',
+            index=models.Index(fields=['subscription_end_date'], name='gym_subscription_end_idx'),
+        ),
+    ]
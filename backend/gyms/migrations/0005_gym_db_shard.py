@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0004_gym_subscription_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gym',
+            name='db_shard',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64, verbose_name='Database Shard'),
+        ),
+    ]
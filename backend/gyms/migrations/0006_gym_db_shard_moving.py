@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0005_gym_db_shard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gym',
+            name='db_shard_moving',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Moving Between Shards'),
+        ),
+    ]
@@ -1,9 +1,92 @@
 """
 Gym models for multi-tenant system.
 """
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (
+    Case, CharField, DecimalField, IntegerField, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.conf import settings
+from core.sharding import TenantQuerySet
+
+
+class GymQuerySet(models.QuerySet):
+    """QuerySet helpers for gyms."""
+    
+    @staticmethod
+    def _subscription_conditions(now):
+        """Conditions matching ``Gym.subscription_status`` 'trial' and 'active'."""
+        trial = Q(is_trial=True, trial_end_date__gt=now)
+        active = Q(subscription_plan__isnull=False, subscription_end_date__gt=now)
+        return trial, active
+    
+    def with_subscription_status(self, now=None):
+        """
+        Annotate ``current_subscription_status`` computed in the database.
+        
+        Mirrors the ``Gym.subscription_status`` property exactly.
+        """
+        trial, active = self._subscription_conditions(now or timezone.now())
+        return self.annotate(
+            current_subscription_status=Case(
+                When(trial, then=Value('trial')),
+                When(active, then=Value('active')),
+                default=Value('expired'),
+                output_field=CharField(),
+            )
+        )
+    
+    def expired(self, now=None):
+        """Gyms whose ``subscription_status`` is 'expired'."""
+        trial, active = self._subscription_conditions(now or timezone.now())
+        return self.exclude(trial).exclude(active)
+    
+    def block(self):
+        """
+        Deactivate the selected gyms with one UPDATE; returns the row count.
+        
+        ``update()`` sends no ``post_save``, so once the change is committed
+        the gyms' cached QR lookups are dropped here, and with sharding their
+        copies on the shards are updated.
+        """
+        from core.qrcodes import forget_gyms
+        from core.sharding import update_gym_mirrors
+        
+        gym_shards = dict(self.values_list('pk', 'db_shard'))
+        values = {'is_active': False, 'updated_at': timezone.now()}
+        blocked_count = self.model._base_manager.filter(pk__in=list(gym_shards)).update(**values)
+        transaction.on_commit(lambda: forget_gyms(gym_shards), using=self.db)
+        update_gym_mirrors(gym_shards, **values)
+        return blocked_count
+    
+    def subscription_active(self, now=None):
+        """Gyms on a running trial or an active subscription."""
+        trial, active = self._subscription_conditions(now or timezone.now())
+        return self.filter(trial | active)
+    
+    def with_statistics(self):
+        """
+        Annotate ledger totals onto each gym using correlated subqueries.
+        
+        ``Gym.get_statistics()`` reads these annotations instead of issuing
+        its own query, so a page of gyms costs a single SELECT.
+        """
+        ledger = DailyLedger.objects.filter(gym=OuterRef('pk')).order_by().values('gym')
+        
+        def total(column, output_field):
+            return Coalesce(
+                Subquery(ledger.annotate(total=Sum(column)).values('total'), output_field=output_field),
+                Value(0),
+                output_field=output_field,
+            )
+        
+        money = DecimalField(max_digits=14, decimal_places=2)
+        return self.annotate(
+            ledger_income=total('income', money),
+            ledger_expenses=total('expenses', money),
+            ledger_clients_count=total('clients_count', IntegerField()),
+        )
 
 
 class Gym(models.Model):
@@ -31,10 +114,22 @@ class Gym(models.Model):
     trial_start_date = models.DateTimeField(null=True, blank=True)
     trial_end_date = models.DateTimeField(null=True, blank=True)
     
+    # Database alias holding this gym's tenant data when sharding is enabled
+    # (see core.sharding); empty means the default database.
+    db_shard = models.CharField(max_length=64, blank=True, default='', editable=False, verbose_name='Database Shard')
+    # Set while move_gym_shard copies the tenant data; writes are refused.
+    db_shard_moving = models.BooleanField(default=False, editable=False, verbose_name='Moving Between Shards')
+    
+    objects = GymQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Gym'
         verbose_name_plural = 'Gyms'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['trial_end_date'], name='gym_trial_end_idx'),
+            models.Index(fields=['subscription_end_date'], name='gym_subscription_end_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -94,29 +189,81 @@ class Gym(models.Model):
         self.save()
     
     def get_statistics(self):
-        """Get gym statistics."""
-        from clients.models import Client
-        from payments.models import Payment
-        from expenses.models import Expense
-        from django.db.models import Sum
-        
-        clients_count = Client.objects.filter(gym=self).count()
-        total_income = Payment.objects.filter(gym=self).aggregate(
-            total=Sum('amount')
-        )['total'] or 0
-        total_expenses = Expense.objects.filter(gym=self).aggregate(
-            total=Sum('amount')
-        )['total'] or 0
+        """Get gym statistics from the pre-summed daily ledger."""
+        if hasattr(self, 'ledger_income'):
+            # Already annotated by GymQuerySet.with_statistics()
+            totals = {
+                'income': self.ledger_income,
+                'expenses': self.ledger_expenses,
+                'clients_count': self.ledger_clients_count,
+            }
+        else:
+            from core.sharding import shard_for_gym
+            totals = DailyLedger.objects.using(shard_for_gym(self.pk)).filter(gym=self).totals()
+        total_income = totals['income']
+        total_expenses = totals['expenses']
         profit = total_income - total_expenses
         
         return {
-            'clients_count': clients_count,
+            'clients_count': totals['clients_count'],
             'total_income': float(total_income),
             'total_expenses': float(total_expenses),
             'profit': float(profit),
         }
 
 
+class DailyLedgerQuerySet(TenantQuerySet):
+    """QuerySet helpers for reading ledger rollups."""
+    
+    def for_user(self, user):
+        """Limit ledger rows to the gyms visible to the given user."""
+        if user.is_superuser:
+            from core.sharding import sharded_gym
+            gym_id = sharded_gym()
+            return self if gym_id is None else self.filter(gym_id=gym_id)
+        elif user.is_gym_admin and user.gym:
+            return self.filter(gym=user.gym)
+        return self.none()
+    
+    def totals(self):
+        """Sum the selected ledger rows into a single totals dict."""
+        totals = self.aggregate(
+            income=Sum('income'),
+            expenses=Sum('expenses'),
+            payments_count=Sum('payments_count'),
+            expenses_count=Sum('expenses_count'),
+            clients_count=Sum('clients_count'),
+        )
+        return {key: value or 0 for key, value in totals.items()}
+
+
+class DailyLedger(models.Model):
+    """
+    Per-gym, per-day rollup of income, expenses and client counts.
+    
+    Rows are maintained incrementally by the signal handlers in
+    ``gyms.signals`` and can be rebuilt with ``manage.py rebuild_ledger``.
+    """
+    gym = models.ForeignKey('Gym', on_delete=models.CASCADE, related_name='ledger_entries')
+    date = models.DateField(verbose_name='Date')
+    income = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Income')
+    expenses = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Expenses')
+    payments_count = models.IntegerField(default=0, verbose_name='Payments Count')
+    expenses_count = models.IntegerField(default=0, verbose_name='Expenses Count')
+    clients_count = models.IntegerField(default=0, verbose_name='Clients Count')
+    
+    objects = DailyLedgerQuerySet.as_manager()
+    
+    class Meta:
+        verbose_name = 'Daily Ledger'
+        verbose_name_plural = 'Daily Ledger'
+        ordering = ['-date']
+        unique_together = ['gym', 'date']
+    
+    def __str__(self):
+        return f"{self.gym_id} - {self.date}"
+
+
 class TrialRequest(models.Model):
     """Trial request model for minimal registration."""
     STATUS_CHOICES = [
@@ -0,0 +1,130 @@
+"""
+Bulk provisioning of gyms with their admins.
+
+Provisioning a gym one by one takes a gym insert, a second save to start
+the trial, a QR code insert and a user insert with a password hash. Here a
+whole list of gyms is created with one bulk insert per table in a single
+short write transaction. Trial dates and QR tokens are set before the
+insert. The password hashes, which take most of the time, are computed
+beforehand on a thread pool; the standard hashers release the GIL.
+"""
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from core.db import retry_on_locked
+from core.models import QRCode, User
+from core.sharding import place_gyms
+from .models import Gym
+from .serializers import GymProvisionSerializer
+
+
+MAX_BATCH_SIZE = 200
+USERNAME_TAKEN_MESSAGE = 'Username already exists.'
+
+
+def hash_passwords(passwords, workers=None):
+    """``make_password()`` of each password, spread over ``workers`` threads."""
+    workers = min(workers or settings.PASSWORD_HASH_WORKERS, len(passwords))
+    if workers <= 1:
+        return [make_password(password) for password in passwords]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(make_password, passwords))
+
+
+def provision_gyms(entries, workers=None):
+    """
+    Create a gym, trial, QR code and admin user for each entry.
+
+    ``entries`` are dicts with the gym's ``name``, ``address``, ``phone`` and
+    ``email`` and the admin's ``username`` and ``password``. Valid entries
+    are created together; invalid ones are skipped. Returns one outcome per
+    entry, in order: ``{'status': 'created', 'gym': <Gym>, ...}`` or
+    ``{'status': 'error', 'errors': {...}}``.
+    """
+    entry_serializers = [GymProvisionSerializer(data=entry) for entry in entries]
+    outcomes = [
+        None if serializer.is_valid() else {'status': 'error', 'errors': serializer.errors}
+        for serializer in entry_serializers
+    ]
+
+    candidates = []
+    usernames = set()
+    for index, serializer in enumerate(entry_serializers):
+        if outcomes[index] is not None:
+            continue
+        data = dict(serializer.validated_data)
+        data['username'] = User.normalize_username(data['username'])
+        if data['username'] in usernames:
+            outcomes[index] = {'status': 'error', 'errors': {'username': [USERNAME_TAKEN_MESSAGE]}}
+            continue
+        usernames.add(data['username'])
+        candidates.append((index, data))
+
+    if candidates:
+        # Hash before taking the write lock.
+        hashes = hash_passwords([data.pop('password') for _, data in candidates], workers)
+        for (index, data), password_hash in zip(candidates, hashes):
+            data['password_hash'] = password_hash
+        created = retry_on_locked(_create_gyms)(candidates)
+        for index, data in candidates:
+            if index in created:
+                gym = created[index]
+                outcomes[index] = {
+                    'status': 'created',
+                    'gym': gym,
+                    'admin_username': data['username'],
+                    'qr_token': gym.qr_code.token,
+                }
+            else:
+                outcomes[index] = {'status': 'error', 'errors': {'username': [USERNAME_TAKEN_MESSAGE]}}
+    return outcomes
+
+
+def _create_gyms(candidates):
+    """Insert the candidates whose username is still free; returns ``{index: gym}``."""
+    # Checked under the write lock, so no other writer can take these
+    # usernames before the users are inserted.
+    taken = set(
+        User.objects.filter(username__in=[data['username'] for _, data in candidates])
+        .values_list('username', flat=True)
+    )
+    candidates = [(index, data) for index, data in candidates if data['username'] not in taken]
+    if not candidates:
+        return {}
+
+    now = timezone.now()
+    trial_end = now + timedelta(days=settings.TRIAL_PERIOD_DAYS)
+    gyms = Gym.objects.bulk_create([
+        Gym(
+            name=data['name'],
+            address=data.get('address', ''),
+            phone=data.get('phone', ''),
+            email=data.get('email', ''),
+            is_trial=True,
+            trial_start_date=now,
+            trial_end_date=trial_end,
+        )
+        for _, data in candidates
+    ])
+    place_gyms(gyms)
+
+    QRCode.objects.bulk_create([
+        QRCode(gym=gym, token=secrets.token_urlsafe(32))
+        for gym in gyms
+    ])
+    User.objects.bulk_create([
+        User(
+            username=data['username'],
+            password=data['password_hash'],
+            email=User.objects.normalize_email(data.get('email', '')),
+            gym=gym,
+            is_gym_admin=True,
+        )
+        for gym, (_, data) in zip(gyms, candidates)
+    ])
+    return {index: gym for gym, (index, _) in zip(gyms, candidates)}
@@ -2,18 +2,21 @@
 Public views for landing page registration.
 """
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from core.models import User
 from .models import Gym, TrialRequest
 from .serializers import GymSerializer
 from core.models import QRCode
+from core.db import retry_on_locked
+from core.throttling import REGISTRATION_THROTTLES
 from core.utils import send_telegram_message
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes(REGISTRATION_THROTTLES)
 def public_register_gym(request):
     """Public endpoint for gym registration from landing page."""
     name = request.data.get('name')
@@ -68,6 +71,7 @@ def public_register_gym(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes(REGISTRATION_THROTTLES)
 def public_register_trial_request(request):
     """Public endpoint for minimal trial request registration (name and phone only)."""
     name = request.data.get('name')
@@ -79,8 +83,8 @@ def public_register_trial_request(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Create trial request
-    trial_request = TrialRequest.objects.create(
+    # Create trial request (the notification below stays outside the transaction)
+    trial_request = retry_on_locked(TrialRequest.objects.create)(
         name=name,
         phone=phone,
         status='pending'
@@ -1,6 +1,7 @@
 """
 Serializers for gym models.
 """
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from rest_framework import serializers
 from .models import Gym, TrialRequest
 from subscriptions.serializers import SubscriptionPlanSerializer
@@ -26,6 +27,13 @@ class GymSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
+    def get_fields(self):
+        """Drop statistics when the view didn't ask for them."""
+        fields = super().get_fields()
+        if not self.context.get('include_statistics', True):
+            fields.pop('statistics')
+        return fields
+    
     def get_statistics(self, obj):
         """Get gym statistics."""
         return obj.get_statistics()
@@ -44,6 +52,16 @@ class GymCreateSerializer(serializers.ModelSerializer):
         return gym
 
 
+class GymProvisionSerializer(serializers.ModelSerializer):
+    """One gym of a bulk provisioning request, with its admin's credentials."""
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    password = serializers.CharField(write_only=True, trim_whitespace=False)
+    
+    class Meta:
+        model = Gym
+        fields = ['name', 'address', 'phone', 'email', 'username', 'password']
+
+
 class GymStatisticsSerializer(serializers.Serializer):
     """Serializer for gym statistics."""
     clients_count = serializers.IntegerField()
@@ -0,0 +1,97 @@
+"""
+Signal handlers keeping gym rollups in sync with tenant data.
+"""
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from clients.models import Client
+from payments.models import Payment
+from expenses.models import Expense
+from .cache import bump_data_version
+from .ledger import LEDGER_SOURCES, apply_ledger_delta, ledger_entry
+
+
+def _ledger_fields(sender):
+    """Model fields whose values feed the ledger for ``sender``."""
+    date_field, amount_column, _ = LEDGER_SOURCES[sender._meta.label]
+    fields = ['gym_id', date_field]
+    if amount_column:
+        fields.append('amount')
+    return fields
+
+
+@receiver(pre_save, sender=Payment)
+@receiver(pre_save, sender=Expense)
+@receiver(pre_save, sender=Client)
+def remember_ledger_entry(sender, instance, raw=False, using=None, **kwargs):
+    """Remember the ledger contribution of the row before it is overwritten."""
+    if raw:
+        return
+    instance._ledger_previous = None
+    if instance._state.adding or instance.pk is None:
+        return
+    previous = sender._base_manager.using(using).filter(pk=instance.pk).values(
+        *_ledger_fields(sender)
+    ).first()
+    if previous:
+        instance._ledger_previous = ledger_entry(sender(**previous))
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_save, sender=Expense)
+@receiver(post_save, sender=Client)
+def update_ledger_on_save(sender, instance, raw=False, using=None, **kwargs):
+    """Move the instance's contribution from its old ledger row to its new one."""
+    if raw:
+        return
+    previous = getattr(instance, '_ledger_previous', None)
+    current = ledger_entry(instance)
+    if previous == current:
+        return
+
+    if previous and previous[:2] == current[:2]:
+        # Same gym and day: apply only the difference.
+        gym_id, date, deltas = current
+        diff = {
+            column: value - previous[2].get(column, 0)
+            for column, value in deltas.items()
+        }
+        apply_ledger_delta(gym_id, date, diff, using=using)
+        return
+
+    if previous:
+        gym_id, date, deltas = previous
+        apply_ledger_delta(
+            gym_id, date, {column: -value for column, value in deltas.items()},
+            using=using, create=False,
+        )
+    apply_ledger_delta(*current, using=using)
+
+
+@receiver(post_delete, sender=Payment)
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Client)
+def update_ledger_on_delete(sender, instance, using=None, **kwargs):
+    """Remove the deleted instance's contribution from the ledger."""
+    gym_id, date, deltas = ledger_entry(instance)
+    apply_ledger_delta(
+        gym_id, date, {column: -value for column, value in deltas.items()},
+        using=using, create=False,
+    )
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_save, sender=Expense)
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Payment)
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Client)
+def invalidate_statistics_cache(sender, instance, using=None, **kwargs):
+    """Bump the gym's statistics version once the write is committed."""
+    gym_ids = {instance.gym_id}
+    previous = getattr(instance, '_ledger_previous', None)
+    if previous:
+        gym_ids.add(previous[0])
+    for gym_id in gym_ids:
+        transaction.on_commit(lambda gym_id=gym_id: bump_data_version(gym_id), using=using)
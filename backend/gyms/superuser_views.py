@@ -3,17 +3,28 @@ API views for superuser gym management.
 """
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from core.models import User
+from django.contrib.auth.hashers import make_password
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from .models import Gym, TrialRequest
+from .provisioning import MAX_BATCH_SIZE, provision_gyms
 from .serializers import GymSerializer, GymCreateSerializer, GymStatisticsSerializer, TrialRequestSerializer
 from subscriptions.models import SubscriptionPlan
 from core.models import QRCode
+from core.db import retry_on_locked, write_retry_counters
 from core.permissions import IsSuperuser
+from core.routers import reporting_reads
+from core.serializers import ApiTokenSerializer
+from core.tenant_archive import TenantArchiveError, import_tenant, iter_tenant_archive
+from core.tokens import issue_token
+from .cache import cached_statistics, statistics_cache_counters
+from .views import GymStatisticsMixin
 
 
-class SuperuserGymViewSet(viewsets.ModelViewSet):
+class SuperuserGymViewSet(GymStatisticsMixin, viewsets.ModelViewSet):
     """ViewSet for superuser gym management."""
     permission_classes = [IsSuperuser]
     
@@ -21,7 +32,7 @@ class SuperuserGymViewSet(viewsets.ModelViewSet):
         """Get all gyms (superuser only)."""
         if not self.request.user.is_superuser:
             return Gym.objects.none()
-        return Gym.objects.all()
+        return self.optimize_queryset(Gym.objects.all())
     
     def get_serializer_class(self):
         """Return appropriate serializer."""
@@ -81,7 +92,7 @@ class SuperuserGymViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            gym.assign_subscription(plan)
+            retry_on_locked(gym.assign_subscription)(plan)
             serializer = self.get_serializer(gym)
             return Response(serializer.data)
         except Exception as e:
@@ -135,7 +146,7 @@ class SuperuserGymViewSet(viewsets.ModelViewSet):
         """Get gym statistics."""
         try:
             gym = self.get_object()
-            stats = gym.get_statistics()
+            stats = cached_statistics('gym', gym.id, gym.get_statistics)
             serializer = GymStatisticsSerializer(stats)
             return Response(serializer.data)
         except Exception as e:
@@ -144,33 +155,140 @@ class SuperuserGymViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=True, methods=['get'])
+    def series(self, request, pk=None):
+        """Get income/expenses/profit bucketed by day, week or month."""
+        try:
+            return self.get_series_response(self.get_object())
+        except Exception as e:
+            return Response(
+                {'error': f'Error retrieving series: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    @action(detail=False, methods=['get'])
+    def statistics_cache(self, request):
+        """Get hit/miss counters of the statistics cache."""
+        return Response(statistics_cache_counters())
+    
+    @action(detail=False, methods=['get'])
+    def write_contention(self, request):
+        """Get retry/failure counters of writes that hit a locked database."""
+        return Response(write_retry_counters())
+    
     @action(detail=False, methods=['get'])
     def expired(self, request):
         """Get all expired gyms."""
         try:
-            expired_gyms = []
-            for gym in Gym.objects.all():
-                if gym.subscription_status == 'expired':
-                    expired_gyms.append(gym)
-            
-            serializer = self.get_serializer(expired_gyms, many=True)
-            return Response(serializer.data)
+            with reporting_reads():
+                expired_gyms = self.get_queryset().expired()
+                data = self.get_serializer(expired_gyms, many=True).data
+            return Response(data)
         except Exception as e:
             return Response(
                 {'error': f'Error retrieving expired gyms: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['post'])
+    def provision(self, request):
+        """Create many gyms with their trial, QR code and admin user at once."""
+        try:
+            entries = request.data.get('gyms') if isinstance(request.data, dict) else request.data
+            if not isinstance(entries, list) or not entries:
+                return Response(
+                    {'error': 'gyms must be a non-empty list.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if len(entries) > MAX_BATCH_SIZE:
+                return Response(
+                    {'error': f'At most {MAX_BATCH_SIZE} gyms can be provisioned at once.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            results = []
+            for index, outcome in enumerate(provision_gyms(entries)):
+                result = {'index': index, **outcome}
+                if outcome['status'] == 'created':
+                    result['gym'] = GymSerializer(outcome['gym'], context={'include_statistics': False}).data
+                results.append(result)
+            created_count = sum(1 for result in results if result['status'] == 'created')
+            return Response({
+                'created': created_count,
+                'failed': len(results) - created_count,
+                'results': results,
+            }, status=status.HTTP_201_CREATED if created_count else status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response(
+                {'error': f'Error provisioning gyms: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    @action(detail=True, methods=['post'])
+    def token(self, request, pk=None):
+        """Issue a signed API token acting as an admin of the gym."""
+        try:
+            gym = self.get_object()
+            serializer = ApiTokenSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            
+            token, issued = issue_token(gym.pk, **serializer.validated_data)
+            return Response({
+                'token': token,
+                'gym': gym.pk,
+                'actions': sorted(issued.actions),
+                'name': issued.name,
+                'expires_at': issued.expires,
+            }, status=status.HTTP_201_CREATED)
+        except Exception as e:
+            return Response(
+                {'error': f'Error issuing token: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """Download the gym and all of its data as a tenant archive."""
+        gym = self.get_object()
+        filename = f"gym-{gym.pk}-{timezone.localdate():%Y%m%d}.jsonl.gz"
+        response = StreamingHttpResponse(iter_tenant_archive(gym), content_type='application/gzip')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_archive(self, request):
+        """Create a new gym from an uploaded tenant archive ``file``."""
+        try:
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response(
+                    {'error': 'file is required.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            tenant_import = import_tenant(upload)
+            return Response({
+                'gym': GymSerializer(tenant_import.gym).data,
+                'counts': tenant_import.counts,
+                'warnings': tenant_import.warnings,
+            }, status=status.HTTP_201_CREATED)
+        except TenantArchiveError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': f'Error importing gym: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
     @action(detail=False, methods=['post'])
     def block_expired(self, request):
         """Block all expired gyms."""
         try:
-            blocked_count = 0
-            for gym in Gym.objects.all():
-                if gym.subscription_status == 'expired':
-                    gym.is_active = False
-                    gym.save()
-                    blocked_count += 1
+            blocked_count = retry_on_locked(Gym.objects.expired().block)()
             
             return Response({
                 'message': f'Blocked {blocked_count} expired gyms.',
@@ -224,32 +342,40 @@ class TrialRequestViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Create gym
-            gym = Gym.objects.create(
-                name=trial_request.name,
-                phone=trial_request.phone,
-                email=email
-            )
-            
-            # Start trial
-            gym.start_trial()
+            # Hash the password before taking the write lock
+            password_hash = make_password(password)
             
-            # Create QR code
-            QRCode.objects.get_or_create(gym=gym)
-            
-            # Create admin user
-            admin_user = User.objects.create_user(
-                username=username,
-                password=password,
-                email=email,
-                gym=gym,
-                is_gym_admin=True
-            )
+            @retry_on_locked
+            def create_gym():
+                # Create gym
+                gym = Gym.objects.create(
+                    name=trial_request.name,
+                    phone=trial_request.phone,
+                    email=email
+                )
+                
+                # Start trial
+                gym.start_trial()
+                
+                # Create QR code
+                QRCode.objects.get_or_create(gym=gym)
+                
+                # Create admin user
+                User.objects.create(
+                    username=User.normalize_username(username),
+                    password=password_hash,
+                    email=User.objects.normalize_email(email),
+                    gym=gym,
+                    is_gym_admin=True
+                )
+                
+                # Update trial request
+                trial_request.status = 'approved'
+                trial_request.gym = gym
+                trial_request.save()
+                return gym
             
-            # Update trial request
-            trial_request.status = 'approved'
-            trial_request.gym = gym
-            trial_request.save()
+            gym = create_gym()
             
             return Response({
                 'message': 'Trial request approved. Gym and admin user created successfully.',
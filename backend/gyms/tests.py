@@ -0,0 +1,409 @@
+"""
+Tests for the gyms app.
+"""
+import itertools
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, router
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from clients.models import Client
+from core.models import QRCode, User
+from core.qrcodes import lookup
+from core.routers import REPLICA_DB_ALIAS, reset_read_after_write
+from core.sharding import activate_gym, deactivate_gym, shard_for_gym, sharding_enabled
+from core.testing import create_gym, gym_admin_client
+from expenses.models import Expense
+from payments.models import Payment
+from subscriptions.models import SubscriptionPlan
+from .cache import VERSION_KEY, bump_data_version, cached_statistics, statistics_cache_counters
+from .ledger import add_to_ledger, rebuild_ledger
+from .models import DailyLedger, Gym
+from .provisioning import USERNAME_TAKEN_MESSAGE, provision_gyms
+
+
+NOW = timezone.now().replace(microsecond=0)
+END_DATES = [None, NOW - timedelta(days=1), NOW, NOW + timedelta(days=1)]
+
+
+class SubscriptionStatusQueryTests(TestCase):
+    """The database-side status must agree with ``Gym.subscription_status``."""
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        plan = SubscriptionPlan.objects.create(name='Monthly', plan_type='monthly', price=100)
+        cls.gyms = []
+        combinations = itertools.product([True, False], END_DATES, [None, plan], END_DATES)
+        for number, (is_trial, trial_end, subscription_plan, subscription_end) in enumerate(combinations):
+            cls.gyms.append(create_gym(
+                name=f'Gym {number}',
+                is_trial=is_trial,
+                trial_end_date=trial_end,
+                subscription_plan=subscription_plan,
+                subscription_end_date=subscription_end,
+            ))
+
+    def setUp(self):
+        patcher = mock.patch('django.utils.timezone.now', return_value=NOW)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def statuses(self):
+        return {gym.pk: gym.subscription_status for gym in Gym.objects.select_related('subscription_plan')}
+
+    def test_annotation_matches_property(self):
+        expected = self.statuses()
+        annotated = dict(
+            Gym.objects.with_subscription_status().values_list('pk', 'current_subscription_status')
+        )
+        self.assertEqual(annotated, expected)
+
+    def test_expired_matches_property(self):
+        expected = {pk for pk, status in self.statuses().items() if status == 'expired'}
+        self.assertEqual(set(Gym.objects.expired().values_list('pk', flat=True)), expected)
+        self.assertTrue(expected)
+
+    def test_subscription_active_matches_property(self):
+        expected = {pk for pk, status in self.statuses().items() if status in ('trial', 'active')}
+        self.assertEqual(set(Gym.objects.subscription_active().values_list('pk', flat=True)), expected)
+        self.assertTrue(expected)
+
+    def test_expired_list_is_one_query(self):
+        with self.assertNumQueries(1):
+            list(Gym.objects.expired())
+
+    def test_block_expired_blocks_exactly_the_expired_gyms(self):
+        expired = {pk for pk, status in self.statuses().items() if status == 'expired'}
+        admin = User.objects.create_superuser('root', password='password')
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.post('/api/superuser/gyms/block_expired/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['blocked_count'], len(expired))
+        self.assertEqual(set(Gym.objects.filter(is_active=False).values_list('pk', flat=True)), expired)
+
+    def test_block_expired_drops_cached_qr_lookups(self):
+        gym = Gym.objects.expired().first()
+        token = QRCode.objects.create(gym=gym).token
+        self.assertTrue(lookup(token).is_active)
+        admin = User.objects.create_superuser('root', password='password')
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post('/api/superuser/gyms/block_expired/')
+
+        self.assertFalse(lookup(token).is_active)
+
+    def test_check_subscriptions_blocks_exactly_the_expired_gyms(self):
+        expired = {pk for pk, status in self.statuses().items() if status == 'expired'}
+
+        call_command('check_subscriptions', stdout=StringIO())
+
+        self.assertEqual(set(Gym.objects.filter(is_active=False).values_list('pk', flat=True)), expired)
+
+    def test_blocking_touches_updated_at(self):
+        later = NOW + timedelta(minutes=5)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            call_command('check_subscriptions', stdout=StringIO())
+        self.assertTrue(Gym.objects.filter(is_active=False).exists())
+        self.assertFalse(Gym.objects.filter(is_active=False).exclude(updated_at=later).exists())
+
+
+class StatisticsCacheTests(TestCase):
+    """Cached statistics are dropped by writes and need a shared cache."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.gym = create_gym(name='Cached Gym')
+        self.client = gym_admin_client(self.gym)
+
+    def clients_count(self):
+        return self.client.get('/api/gym/statistics/').data['clients_count']
+
+    @override_settings(CACHE_SHARED=True)
+    def test_write_invalidates_cached_statistics(self):
+        self.assertEqual(self.clients_count(), 0)
+        self.assertEqual(self.clients_count(), 0)
+        self.assertEqual(statistics_cache_counters()['hits'], 1)
+
+        with self.captureOnCommitCallbacks(using=shard_for_gym(self.gym.pk) or DEFAULT_DB_ALIAS, execute=True):
+            Client.objects.create(gym=self.gym, first_name='Ali', last_name='Valiyev', phone='+998901234567')
+
+        self.assertEqual(self.clients_count(), 1)
+
+    @override_settings(CACHE_SHARED=False)
+    def test_per_process_cache_is_not_used(self):
+        self.clients_count()
+        self.clients_count()
+        self.assertEqual(statistics_cache_counters()['misses'], 0)
+
+
+@override_settings(CACHE_SHARED=True, DB_REPLICA_MAX_LAG=60)
+class StatisticsReplicaTests(TransactionTestCase):
+    """Statistics cached right after a write are not read from a lagging replica."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('core.routers.replica_is_fresh', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.gym = Gym.objects.create(name='Replica Gym')
+
+    def statistics_alias(self, name):
+        reset_read_after_write()
+        return cached_statistics(name, self.gym.pk, lambda: router.db_for_read(Gym))
+
+    def test_statistics_after_a_recent_write_read_the_primary(self):
+        bump_data_version(self.gym.pk)
+        self.assertEqual(self.statistics_alias('recent'), DEFAULT_DB_ALIAS)
+
+    def test_statistics_of_older_data_read_the_replica(self):
+        cache.set(VERSION_KEY.format(scope=self.gym.pk), time.time_ns() - 61 * 10 ** 9, timeout=None)
+        self.assertEqual(self.statistics_alias('older'), REPLICA_DB_ALIAS)
+
+
+class LedgerMaintenanceTests(TestCase):
+    """The daily ledger always matches fresh aggregates of the source tables."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.gym = create_gym(name='Ledger Gym')
+        self.other = create_gym(name='Other Ledger Gym')
+        while shard_for_gym(self.other.pk) != shard_for_gym(self.gym.pk):
+            self.other = create_gym(name='Other Ledger Gym')
+        self.addCleanup(deactivate_gym, activate_gym(self.gym.pk))
+        self.client_row = Client.objects.create(
+            gym=self.gym, first_name='Ali', last_name='Valiyev', phone='+998901234567',
+        )
+        self.payment = Payment.objects.create(
+            gym=self.gym, client=self.client_row, amount=Decimal('100.50'), payment_date=date(2026, 1, 31),
+        )
+        self.expense = Expense.objects.create(
+            gym=self.gym, category='Rent', amount=Decimal('40.00'), expense_date=date(2026, 1, 31),
+        )
+
+    def aggregated(self):
+        """``{(gym_id, date): columns}`` summed from the source tables."""
+        rows = {}
+        sources = (
+            (Payment.objects.values(day=F('payment_date')), 'income', 'payments_count'),
+            (Expense.objects.values(day=F('expense_date')), 'expenses', 'expenses_count'),
+            (Client.objects.values(day=TruncDate('registration_date')), None, 'clients_count'),
+        )
+        for queryset, amount_column, count_column in sources:
+            annotations = {'records': Count('id')}
+            if amount_column:
+                annotations['total'] = Sum('amount')
+            for row in queryset.values('gym_id', 'day').annotate(**annotations).order_by():
+                entry = rows.setdefault((row['gym_id'], row['day']), {})
+                entry[count_column] = row['records']
+                if amount_column:
+                    entry[amount_column] = row['total']
+        return rows
+
+    def assertLedgerMatches(self):
+        columns = ('income', 'expenses', 'payments_count', 'expenses_count', 'clients_count')
+        ledger = {
+            (row['gym_id'], row['date']): {column: row[column] for column in columns if row[column]}
+            for row in DailyLedger.objects.values('gym_id', 'date', *columns)
+        }
+        self.assertEqual({key: row for key, row in ledger.items() if row}, self.aggregated())
+
+    def test_create(self):
+        self.assertLedgerMatches()
+        self.assertEqual(DailyLedger.objects.filter(gym=self.gym).totals()['income'], Decimal('100.50'))
+
+    def test_update_moving_the_date(self):
+        self.payment.payment_date = date(2026, 2, 1)
+        self.payment.save()
+        self.expense.expense_date = date(2026, 2, 1)
+        self.expense.save()
+        self.assertLedgerMatches()
+
+    def test_update_moving_the_gym(self):
+        other_client = Client.objects.create(
+            gym=self.other, first_name='Vali', last_name='Aliyev', phone='+998901234500',
+        )
+        self.payment.gym, self.payment.client = self.other, other_client
+        self.payment.save()
+        self.expense.gym = self.other
+        self.expense.save()
+        self.assertLedgerMatches()
+        self.assertEqual(DailyLedger.objects.filter(gym=self.gym).totals()['income'], 0)
+
+    def test_update_changing_the_amount(self):
+        self.payment.amount = Decimal('70.25')
+        self.payment.save()
+        self.expense.amount = Decimal('55.00')
+        self.expense.save()
+        self.assertLedgerMatches()
+
+    def test_delete(self):
+        self.payment.delete()
+        self.expense.delete()
+        self.assertLedgerMatches()
+
+    def test_client_cascade_delete(self):
+        Payment.objects.create(gym=self.gym, client=self.client_row, amount=20, payment_date=date(2026, 2, 1))
+        self.client_row.delete()
+        self.assertFalse(Payment.objects.exists())
+        self.assertLedgerMatches()
+
+    def test_bulk_add_to_ledger(self):
+        payments = Payment.objects.bulk_create([
+            Payment(gym=self.gym, client=self.client_row, amount=amount, payment_date=day)
+            for amount, day in ((10, date(2026, 1, 31)), (15, date(2026, 2, 1)), (5, date(2026, 2, 1)))
+        ])
+        add_to_ledger(payments)
+        self.assertLedgerMatches()
+
+    def test_rebuild_ledger(self):
+        DailyLedger.objects.filter(gym=self.gym).update(income=0, clients_count=5)
+        DailyLedger.objects.create(gym=self.gym, date=date(2025, 12, 31), expenses=10, expenses_count=1)
+        rebuild_ledger([self.gym.pk])
+        self.assertLedgerMatches()
+
+
+class LedgerSeriesTests(TestCase):
+    """The series endpoint zero-fills empty buckets and buckets across month boundaries."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.gym = create_gym(name='Series Gym')
+        client = Client.objects.create(gym=self.gym, first_name='Ali', last_name='Valiyev', phone='+998901234567')
+        for amount, day in ((100, date(2026, 1, 30)), (50, date(2026, 2, 2))):
+            Payment.objects.create(gym=self.gym, client=client, amount=amount, payment_date=day)
+        Expense.objects.create(gym=self.gym, category='Rent', amount=30, expense_date=date(2026, 1, 31))
+        self.client = gym_admin_client(self.gym)
+
+    def series(self, interval, start, end):
+        response = self.client.get('/api/gym/series/', {'interval': interval, 'start': start, 'end': end})
+        self.assertEqual(response.status_code, 200)
+        return [
+            (row['period'], row['income'], row['expenses'], row['profit'])
+            for row in response.json()['series']
+        ]
+
+    def test_empty_days_are_zero_filled(self):
+        self.assertEqual(self.series('day', '2026-01-29', '2026-02-03'), [
+            ('2026-01-29', 0, 0, 0),
+            ('2026-01-30', 100, 0, 100),
+            ('2026-01-31', 0, 30, -30),
+            ('2026-02-01', 0, 0, 0),
+            ('2026-02-02', 50, 0, 50),
+            ('2026-02-03', 0, 0, 0),
+        ])
+
+    def test_weeks_span_the_month_boundary(self):
+        # The week of Monday 2026-01-26 ends on Sunday 2026-02-01.
+        self.assertEqual(self.series('week', '2026-01-28', '2026-02-08'), [
+            ('2026-01-26', 100, 30, 70),
+            ('2026-02-02', 50, 0, 50),
+        ])
+
+    def test_months_split_at_the_boundary(self):
+        self.assertEqual(self.series('month', '2026-01-15', '2026-03-10'), [
+            ('2026-01-01', 100, 30, 70),
+            ('2026-02-01', 50, 0, 50),
+            ('2026-03-01', 0, 0, 0),
+        ])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProvisioningTests(TransactionTestCase):
+    """Provisioning creates gyms, trials, QR codes and admins in one transaction."""
+    databases = '__all__'
+
+    def entries(self):
+        return [
+            {'name': f'Provisioned Gym {number}', 'username': f'admin{number}', 'password': 'secret'}
+            for number in range(2)
+        ]
+
+    def test_creates_gyms_with_their_admins(self):
+        User.objects.create_user('taken', password='password')
+        entries = self.entries() + [{'name': 'Taken Gym', 'username': 'taken', 'password': 'secret'}]
+        with CaptureQueriesContext(connection) as captured:
+            outcomes = provision_gyms(entries, workers=1)
+
+        self.assertEqual([outcome['status'] for outcome in outcomes], ['created', 'created', 'error'])
+        self.assertEqual(outcomes[2]['errors'], {'username': [USERNAME_TAKEN_MESSAGE]})
+        statements = [query['sql'] for query in captured.captured_queries]
+        self.assertEqual(statements.count('BEGIN IMMEDIATE'), 1)
+        for table in ('gyms_gym', 'core_qrcode', 'core_user'):
+            self.assertEqual(len([sql for sql in statements if sql.startswith(f'INSERT INTO "{table}"')]), 1, table)
+
+        for outcome in outcomes[:2]:
+            gym = Gym.objects.select_related('qr_code').get(pk=outcome['gym'].pk)
+            self.assertTrue(gym.is_trial)
+            self.assertEqual(gym.trial_end_date - gym.trial_start_date, timedelta(days=settings.TRIAL_PERIOD_DAYS))
+            self.assertEqual(gym.qr_code.token, outcome['qr_token'])
+            admin = User.objects.get(username=outcome['admin_username'])
+            self.assertEqual((admin.gym_id, admin.is_gym_admin), (gym.pk, True))
+            self.assertTrue(admin.check_password('secret'))
+            if gym.db_shard:
+                self.assertTrue(Gym._base_manager.using(gym.db_shard).filter(pk=gym.pk).exists())
+
+    def test_failed_step_rolls_everything_back(self):
+        with mock.patch.object(User.objects, 'bulk_create', side_effect=RuntimeError('insert failed')):
+            with self.assertRaises(RuntimeError):
+                provision_gyms(self.entries(), workers=1)
+        self.assertFalse(QRCode.objects.exists())
+        self.assertFalse(User.objects.exists())
+        for alias in connections:
+            self.assertFalse(Gym._base_manager.using(alias).exists(), alias)
+
+
+@skipIf(sharding_enabled(), 'With DB_SHARDS each gym reads its statistics from its shard.')
+class GymListStatisticsQueryTests(TestCase):
+    """``?statistics=true`` annotates the gym list in a query count that doesn't grow with it."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('root', password='password'))
+        self.income = {}
+
+    def add_gyms(self, count):
+        for _ in range(count):
+            gym = create_gym(name='Listed Gym')
+            client = Client.objects.create(gym=gym, first_name='Ali', last_name='Valiyev', phone='+998901234567')
+            self.income[gym.pk] = 100 + gym.pk
+            Payment.objects.create(gym=gym, client=client, amount=self.income[gym.pk])
+            Expense.objects.create(gym=gym, category='Rent', amount=40)
+
+    def get_list(self):
+        response = self.client.get('/api/superuser/gyms/?statistics=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {
+                row['id']: (row['statistics']['total_income'], row['statistics']['clients_count'])
+                for row in response.data['results']
+            },
+            {gym_id: (income, 1) for gym_id, income in self.income.items()},
+        )
+
+    def test_query_count_is_constant(self):
+        self.add_gyms(2)
+        with CaptureQueriesContext(connection) as captured:
+            self.get_list()
+        self.add_gyms(5)
+        with self.assertNumQueries(len(captured)):
+            self.get_list()
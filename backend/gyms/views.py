@@ -5,23 +5,111 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from core.models import User
+from core.routers import reporting_reads
+from core.sharding import shard_for_gym, sharding_enabled
+from .cache import cached_statistics
+from .ledger import SERIES_INTERVALS, ledger_series
 from .models import Gym
 from .serializers import GymSerializer, GymStatisticsSerializer
 from subscriptions.models import SubscriptionPlan
 
 
-class GymViewSet(viewsets.ModelViewSet):
+class GymStatisticsMixin:
+    """
+    Serve gym statistics from queryset annotations.
+    
+    List actions only include statistics when requested with
+    ``?statistics=true``; single-object actions always include them.
+    """
+    statistics_param = 'statistics'
+    statistics_opt_in_actions = ('list', 'expired')
+    series_max_days = 3660
+    
+    def include_statistics(self):
+        """Whether gym rows in this response carry statistics."""
+        if self.action not in self.statistics_opt_in_actions:
+            return True
+        value = self.request.query_params.get(self.statistics_param, '')
+        return value.lower() in ('1', 'true', 'yes')
+    
+    def optimize_queryset(self, queryset):
+        """Join the plan and annotate ledger totals in the same query."""
+        queryset = queryset.select_related('subscription_plan')
+        if self.include_statistics() and not sharding_enabled():
+            # With sharding the ledger lives on each gym's shard, so
+            # Gym.get_statistics() reads it per gym instead.
+            queryset = queryset.with_statistics()
+        return queryset
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include_statistics'] = self.include_statistics()
+        return context
+    
+    def parse_series_date(self, name, default):
+        """Read an ISO date query parameter, returning ``default`` when absent."""
+        value = self.request.query_params.get(name)
+        if not value:
+            return default
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValueError(f'{name} must be a date in YYYY-MM-DD format.')
+        return parsed
+    
+    def get_series_response(self, gym):
+        """Build the income/expenses/profit time series response for a gym."""
+        interval = self.request.query_params.get('interval', 'month')
+        if interval not in SERIES_INTERVALS:
+            return Response(
+                {'error': f"interval must be one of: {', '.join(SERIES_INTERVALS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            end = self.parse_series_date('end', timezone.localdate())
+            start = self.parse_series_date('start', end.replace(year=end.year - 1, day=1))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if start > end:
+            return Response(
+                {'error': 'start must not be after end.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if interval == 'day' and (end - start).days >= self.series_max_days:
+            return Response(
+                {'error': f'Daily series are limited to {self.series_max_days} days.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        with reporting_reads():
+            series = ledger_series(gym.id, interval, start, end, using=shard_for_gym(gym.id))
+        return Response({
+            'interval': interval,
+            'start': start,
+            'end': end,
+            'series': series,
+        })
+
+
+class GymViewSet(GymStatisticsMixin, viewsets.ModelViewSet):
     """ViewSet for gym management (gym admin)."""
     serializer_class = GymSerializer
     permission_classes = [IsAuthenticated]
+    token_scope = 'gym'
     
     def get_queryset(self):
         """Get gyms accessible to current user."""
         if self.request.user.is_superuser:
-            return Gym.objects.all()
-        elif self.request.user.is_gym_admin and self.request.user.gym:
-            return Gym.objects.filter(id=self.request.user.gym.id)
+            return self.optimize_queryset(Gym.objects.all())
+        elif self.request.user.is_gym_admin and self.request.user.gym_id:
+            return self.optimize_queryset(Gym.objects.filter(id=self.request.user.gym_id))
         return Gym.objects.none()
     
     def get_object(self):
@@ -57,7 +145,7 @@ class GymViewSet(viewsets.ModelViewSet):
                     {'error': 'No gym associated with this user.'},
                     status=status.HTTP_404_NOT_FOUND
                 )
-            stats = gym.get_statistics()
+            stats = cached_statistics('gym', gym.id, gym.get_statistics)
             serializer = GymStatisticsSerializer(stats)
             return Response(serializer.data)
         except Exception as e:
@@ -66,6 +154,23 @@ class GymViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['get'])
+    def series(self, request):
+        """Get income/expenses/profit bucketed by day, week or month."""
+        try:
+            gym = request.user.gym
+            if not gym:
+                return Response(
+                    {'error': 'No gym associated with this user.'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            return self.get_series_response(gym)
+        except Exception as e:
+            return Response(
+                {'error': f'Error retrieving series: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
     @action(detail=False, methods=['get'])
     def subscription_status(self, request):
         """Get subscription status."""
@@ -0,0 +1,87 @@
+"""
+Recording many payments of one gym at once.
+
+A batch is validated as a whole (fields per item, then every client id in a
+single query) and inserted with one ``bulk_create`` in one short write
+transaction. Either every payment is created or none is. The daily ledger
+and statistics version are updated once for the whole batch.
+"""
+from django.db import router
+from django.utils import timezone
+
+from clients.models import Client
+from core.db import retry_on_locked
+from gyms.ledger import add_to_ledger
+from .models import Payment
+from .serializers import PaymentBatchItemSerializer
+
+
+MAX_BATCH_SIZE = 500
+CLIENT_NOT_FOUND_MESSAGE = 'Client not found in this gym.'
+
+
+def create_payment_batch(gym, items):
+    """
+    Create ``items`` (payment dicts) as payments of ``gym``.
+
+    Returns ``(payments, errors)``. ``errors`` is None when the batch was
+    created; otherwise it holds one error dict per item, empty for valid
+    items, and no payment was created.
+    """
+    item_serializers = [PaymentBatchItemSerializer(data=item) for item in items]
+    valid = [serializer.is_valid() for serializer in item_serializers]
+    using = router.db_for_write(Payment, instance=Payment(gym=gym))
+    if not all(valid):
+        # Check the clients of the other items too, for a complete report.
+        valid_items = [
+            serializer.validated_data
+            for serializer, is_valid in zip(item_serializers, valid) if is_valid
+        ]
+        clients = gym_clients(gym, valid_items, using)
+        errors = [
+            client_error(serializer.validated_data, clients) if is_valid else serializer.errors
+            for serializer, is_valid in zip(item_serializers, valid)
+        ]
+        return [], errors
+
+    return retry_on_locked(_write_batch, using=using)(
+        gym, [serializer.validated_data for serializer in item_serializers], using
+    )
+
+
+def gym_clients(gym, items, using):
+    """The gym's clients referenced by ``items``, by id, in one query."""
+    return (
+        Client.objects.using(using)
+        .filter(gym=gym, pk__in={item['client'] for item in items})
+        .only('id', 'gym_id', 'first_name', 'last_name', 'phone')
+        .in_bulk()
+    )
+
+
+def client_error(item, clients):
+    return {} if item['client'] in clients else {'client': [CLIENT_NOT_FOUND_MESSAGE]}
+
+
+def _write_batch(gym, items, using):
+    # Clients are looked up under the write lock, so none of them can be
+    # deleted before the payments referencing them are committed.
+    clients = gym_clients(gym, items, using)
+    errors = [client_error(item, clients) for item in items]
+    if any(errors):
+        return [], errors
+
+    today = timezone.localdate()
+    payments = [
+        Payment(
+            gym=gym,
+            client=clients[item['client']],
+            amount=item['amount'],
+            payment_date=item.get('payment_date') or today,
+            notes=item.get('notes', ''),
+        )
+        for item in items
+    ]
+    Payment.objects.using(using).bulk_create(payments)
+    add_to_ledger(payments, using=using)
+    return payments, None
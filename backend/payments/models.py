@@ -1,8 +1,9 @@
 """
 Payment models.
 """
-from django.db import models
+from django.db import models, router, transaction
 from django.utils import timezone
+from core.sharding import TenantQuerySet
 
 
 class Payment(models.Model):
@@ -15,10 +16,21 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TenantQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Payment'
         verbose_name_plural = 'Payments'
         ordering = ['-payment_date', '-created_at']
+        indexes = [
+            models.Index(fields=['gym', '-payment_date', '-created_at', '-id'], name='payment_gym_date_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        """Save inside a transaction shared with the gym ledger update."""
+        using = kwargs.get('using') or router.db_for_write(self.__class__, instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.client.full_name} - {self.amount} ({self.payment_date})"
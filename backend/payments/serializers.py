@@ -2,6 +2,7 @@
 Serializers for payment models.
 """
 from rest_framework import serializers
+from core.serializers import ValuesListSerializer
 from .models import Payment
 
 
@@ -18,3 +19,27 @@ class PaymentSerializer(serializers.ModelSerializer):
             'amount', 'payment_date', 'notes', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+class PaymentBatchItemSerializer(serializers.ModelSerializer):
+    """One payment of a batch; clients are checked for the whole batch at once."""
+    client = serializers.IntegerField(min_value=1)
+    
+    class Meta:
+        model = Payment
+        fields = ['client', 'amount', 'payment_date', 'notes']
+
+
+class PaymentListSerializer(ValuesListSerializer):
+    """Lean list representation of payments."""
+    serializer_class = PaymentSerializer
+    lookups = {
+        'gym': 'gym_id',
+        'gym_name': 'gym__name',
+        'client': 'client_id',
+        'client_phone': 'client__phone',
+    }
+    extra_lookups = ['client__first_name', 'client__last_name']
+    
+    def get_client_name(self, row):
+        return f"{row['client__first_name']} {row['client__last_name']}"
@@ -0,0 +1,106 @@
+"""
+Tests for the payments app.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from clients.models import Client
+from core.sharding import activate_gym, deactivate_gym
+from core.testing import (
+    ListQueryCountAssertions, QueryPlanAssertions, capture_queries, create_gym, gym_admin_client,
+)
+from gyms.models import DailyLedger
+from .batch import CLIENT_NOT_FOUND_MESSAGE
+from .models import Payment
+
+
+class PaymentListQueryTests(QueryPlanAssertions, ListQueryCountAssertions, TestCase):
+    """
+    The gym admin's payment list and filters read through the gym indexes, in a
+    number of queries that doesn't grow with the page size.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.gym = create_gym(name='Plan Gym')
+        other = create_gym(name='Other Gym')
+        for gym in (cls.gym, other):
+            client = Client.objects.create(gym=gym, first_name='Ali', last_name='Valiyev', phone='+998901234567')
+            for day in range(1, 11):
+                Payment.objects.create(gym=gym, client=client, amount=100, payment_date=date(2026, 1, day))
+
+    def setUp(self):
+        self.client = gym_admin_client(self.gym)
+
+    def test_list(self):
+        self.assertIndexed('/api/payments/', 'payments_payment', 'payment_gym_date_idx')
+
+    def test_list_query_count(self):
+        self.assertListQueries('/api/payments/', 2, 1)
+
+    def test_filter_by_date(self):
+        self.assertIndexed('/api/payments/?payment_date=2026-01-03', 'payments_payment', 'payment_gym_date_idx')
+
+
+class PaymentBatchTests(TestCase):
+    """A payment batch is written whole or not at all, with one ledger update per day."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.gym = create_gym(name='Batch Gym')
+        other = create_gym(name='Other Batch Gym')
+        self.member = Client.objects.create(gym=self.gym, first_name='Ali', last_name='Valiyev', phone='+998901234567')
+        self.stranger = Client.objects.create(gym=other, first_name='Vali', last_name='Aliyev', phone='+998901234500')
+        self.addCleanup(deactivate_gym, activate_gym(self.gym.pk))
+        self.client = gym_admin_client(self.gym)
+
+    def post(self, items):
+        return self.client.post('/api/payments/batch/', items, format='json')
+
+    def assertNothingWritten(self):
+        self.assertFalse(Payment.objects.exists())
+        totals = DailyLedger.objects.filter(gym=self.gym).totals()
+        self.assertEqual((totals['income'], totals['payments_count']), (0, 0))
+
+    def test_invalid_item_writes_nothing(self):
+        response = self.post([
+            {'client': self.member.pk, 'amount': '100.00', 'payment_date': '2026-01-10'},
+            {'client': self.member.pk, 'amount': 'a lot', 'payment_date': '2026-01-10'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0], {})
+        self.assertIn('amount', response.data['errors'][1])
+        self.assertNothingWritten()
+
+    def test_valid_batch_updates_the_ledger_once_per_day(self):
+        items = [
+            {'client': self.member.pk, 'amount': amount, 'payment_date': day}
+            for amount, day in (('100.00', '2026-01-10'), ('50.50', '2026-01-10'), ('20.00', '2026-01-11'))
+        ]
+        with capture_queries() as captured:
+            response = self.post(items)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        ledger_updates = [
+            query['sql'] for context in captured.values() for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "gyms_dailyledger"')
+        ]
+        self.assertEqual(len(ledger_updates), 2)
+        self.assertEqual(
+            list(
+                DailyLedger.objects.filter(gym=self.gym, payments_count__gt=0)
+                .order_by('date').values_list('date', 'income', 'payments_count')
+            ),
+            [(date(2026, 1, 10), Decimal('150.50'), 2), (date(2026, 1, 11), Decimal('20.00'), 1)],
+        )
+
+    def test_clients_of_another_gym_are_rejected(self):
+        response = self.post([
+            {'client': self.member.pk, 'amount': '100.00'},
+            {'client': self.stranger.pk, 'amount': '100.00'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], [{}, {'client': [CLIENT_NOT_FOUND_MESSAGE]}])
+        self.assertNothingWritten()
@@ -1,60 +1,126 @@
 """
 API views for payment management.
 """
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.db import router
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Sum
+from clients.search import ClientSearchFilter
+from core.db import retry_on_locked
+from core.mixins import CSVExportMixin, ShardedTenantMixin, ValuesListMixin
+from core.pagination import OptionalKeysetPagination
+from .batch import MAX_BATCH_SIZE, create_payment_batch
 from .models import Payment
-from .serializers import PaymentSerializer
+from .serializers import PaymentListSerializer, PaymentSerializer
+from gyms.cache import cached_statistics, statistics_scope
+from gyms.models import DailyLedger, Gym
 
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(ShardedTenantMixin, CSVExportMixin, ValuesListMixin, viewsets.ModelViewSet):
     """ViewSet for payment management."""
     serializer_class = PaymentSerializer
+    list_serializer_class = PaymentListSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ClientSearchFilter, filters.OrderingFilter]
     filterset_fields = ['gym', 'client', 'payment_date']
     search_fields = ['client__first_name', 'client__last_name', 'client__phone']
+    search_client_field = 'client'
     ordering_fields = ['payment_date', 'amount', 'created_at']
-    ordering = ['-payment_date', '-created_at']
+    ordering = ['-payment_date', '-created_at', '-id']
+    pagination_class = OptionalKeysetPagination
+    export_filename = 'payments'
+    token_scope = 'payments'
+    gym_body_actions = ('batch',)
     
     def get_queryset(self):
         """Get payments for current user's gym."""
         if self.request.user.is_superuser:
-            return Payment.objects.all()
-        elif self.request.user.is_gym_admin and self.request.user.gym:
-            return Payment.objects.filter(gym=self.request.user.gym)
+            return Payment.objects.select_related('gym', 'client')
+        elif self.request.user.is_gym_admin and self.request.user.gym_id:
+            return Payment.objects.filter(gym_id=self.request.user.gym_id).select_related('gym', 'client')
         return Payment.objects.none()
     
     def perform_create(self, serializer):
-        """Set gym when creating payment."""
+        """Set gym when creating payment, retrying while the gym's database is locked."""
         if not self.request.user.is_superuser:
-            serializer.save(gym=self.request.user.gym)
+            gym = self.request.user.gym
+            save = retry_on_locked(serializer.save, using=router.db_for_write(Payment, instance=Payment(gym=gym)))
+            save(gym=gym)
         else:
-            serializer.save()
+            gym = serializer.validated_data.get('gym')
+            retry_on_locked(serializer.save, using=router.db_for_write(Payment, instance=Payment(gym=gym)))()
+    
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Record a list of payments of one gym in a single transaction."""
+        try:
+            # Gym admins may post the bare list of payments.
+            data = request.data if isinstance(request.data, dict) else {'payments': request.data}
+            if request.user.is_superuser:
+                gym_id = str(data.get('gym', ''))
+                gym = Gym.objects.filter(pk=gym_id).first() if gym_id.isdigit() else None
+                if gym is None:
+                    return Response(
+                        {'error': 'gym is required.'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+            elif request.user.is_gym_admin and request.user.gym:
+                gym = request.user.gym
+            else:
+                return Response(
+                    {'error': 'Only gym admins can record payments.'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            
+            items = data.get('payments')
+            if not isinstance(items, list) or not items:
+                return Response(
+                    {'error': 'payments must be a non-empty list.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if len(items) > MAX_BATCH_SIZE:
+                return Response(
+                    {'error': f'At most {MAX_BATCH_SIZE} payments can be recorded at once.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            payments, errors = create_payment_batch(gym, items)
+            if errors:
+                return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(
+                {
+                    'created': len(payments),
+                    'results': PaymentSerializer(payments, many=True).data,
+                },
+                status=status.HTTP_201_CREATED
+            )
+        except Exception as e:
+            return Response(
+                {'error': f'Error recording payments: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        """Get payment statistics."""
-        queryset = self.get_queryset()
-        
-        total_income = queryset.aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Monthly statistics
+        """Get payment statistics from the daily ledger."""
         from django.utils import timezone
-        from django.db.models import Sum
-        from datetime import timedelta
         
         current_month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        monthly_income = queryset.filter(
-            payment_date__gte=current_month_start
-        ).aggregate(total=Sum('amount'))['total'] or 0
         
-        return Response({
-            'total_income': float(total_income),
-            'monthly_income': float(monthly_income),
-            'total_payments': queryset.count(),
-        })
+        def compute():
+            ledger = DailyLedger.objects.for_user(request.user)
+            totals = ledger.totals()
+            
+            # Monthly statistics
+            monthly = ledger.filter(date__gte=current_month_start.date()).totals()
+            
+            return {
+                'total_income': float(totals['income']),
+                'monthly_income': float(monthly['income']),
+                'total_payments': totals['payments_count'],
+            }
+        
+        scope = statistics_scope(request.user)
+        return Response(cached_statistics('payments', scope, compute, current_month_start.date()))
@@ -0,0 +1,136 @@
+"""
+Client for the Fit Control API.
+
+The bot logs in with API_USERNAME/API_PASSWORD (a superuser account) to issue
+short-lived API tokens, one per gym, limited to the actions the bot needs, and
+to verify QR codes: the API doesn't throttle superusers, while every scan
+comes from the bot's IP address. Client writes are authenticated with the
+tokens.
+"""
+import time
+
+import aiohttp
+
+from config import API_BASE_URL, API_USERNAME, API_PASSWORD
+
+TOKEN_ACTIONS = ['clients.create']
+TOKEN_TTL = 3600
+# Issue a new token this many seconds before the old one expires.
+TOKEN_RENEW_MARGIN = 60
+
+
+class APIError(Exception):
+    """Unexpected response from the API."""
+
+
+class FitControlAPI:
+    """Calls to the Django API, authenticated with per-gym tokens."""
+
+    def __init__(self, base_url=API_BASE_URL, username=API_USERNAME, password=API_PASSWORD):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.login_session = None
+        self.session = None
+        self.logged_in = False
+        self.tokens = {}
+
+    @property
+    def configured(self):
+        return bool(self.username and self.password)
+
+    def get_login_session(self):
+        """Session holding the login cookies, used to issue tokens and verify QR codes."""
+        if self.login_session is None or self.login_session.closed:
+            # unsafe=True keeps cookies of IP-address hosts such as 127.0.0.1.
+            self.login_session = aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True))
+            self.logged_in = False
+        return self.login_session
+
+    def get_session(self):
+        """Cookie-less session for token calls, so they never run as the login user."""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(cookie_jar=aiohttp.DummyCookieJar())
+        return self.session
+
+    async def close(self):
+        for session in (self.login_session, self.session):
+            if session is not None:
+                await session.close()
+
+    async def login(self):
+        session = self.get_login_session()
+        async with session.post(
+            f"{self.base_url}/api/auth/login/",
+            json={'username': self.username, 'password': self.password},
+        ) as response:
+            if response.status != 200:
+                raise APIError(f"API login failed with status {response.status}")
+        self.logged_in = True
+
+    def csrf_headers(self):
+        cookies = self.get_login_session().cookie_jar.filter_cookies(self.base_url)
+        csrf_cookie = cookies.get('csrftoken')
+        return {
+            'X-CSRFToken': csrf_cookie.value if csrf_cookie else '',
+            'Referer': f"{self.base_url}/",
+        }
+
+    async def issue_token(self, gym_id):
+        if not self.logged_in:
+            await self.login()
+        session = self.get_login_session()
+        async with session.post(
+            f"{self.base_url}/api/superuser/gyms/{gym_id}/token/",
+            json={'actions': TOKEN_ACTIONS, 'ttl': TOKEN_TTL, 'name': 'telegram-bot'},
+            headers=self.csrf_headers(),
+        ) as response:
+            if response.status == 403:
+                # The session expired; log in again next time.
+                self.logged_in = False
+            if response.status != 201:
+                raise APIError(f"Token request failed with status {response.status}")
+            data = await response.json()
+        return data['token']
+
+    async def verify_qr(self, token):
+        """Verify a QR code token; returns ``(status, response data)``.
+
+        Without API credentials the request is anonymous and shares the IP
+        throttle with everyone else.
+        """
+        if self.configured:
+            if not self.logged_in:
+                await self.login()
+            session = self.get_login_session()
+        else:
+            session = self.get_session()
+        async with session.get(f"{self.base_url}/api/auth/verify-qr/{token}/") as response:
+            if response.status == 429 and self.configured:
+                # The session expired and the request ran anonymously.
+                self.logged_in = False
+            data = await response.json() if response.content_type == 'application/json' else {}
+            return response.status, data
+
+    async def gym_token(self, gym_id):
+        token, expires_at = self.tokens.get(gym_id, (None, 0))
+        if time.time() >= expires_at - TOKEN_RENEW_MARGIN:
+            token = await self.issue_token(gym_id)
+            self.tokens[gym_id] = (token, time.time() + TOKEN_TTL)
+        return token
+
+    async def create_client(self, gym_id, client_data):
+        """Create a client in the gym; returns ``(status, response data)``."""
+        token = await self.gym_token(gym_id)
+        session = self.get_session()
+        async with session.post(
+            f"{self.base_url}/api/clients/",
+            json={**client_data, 'gym': gym_id},
+            headers={'Authorization': f"Bearer {token}"},
+        ) as response:
+            if response.status in (401, 403):
+                # Rejected (e.g. after API_TOKEN_SECRET was rotated); get a
+                # new token next time.
+                self.tokens.pop(gym_id, None)
+            data = await response.json() if response.content_type == 'application/json' else {}
+            return response.status, data
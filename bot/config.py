@@ -7,7 +7,8 @@ from decouple import config
 BOT_TOKEN = config('TELEGRAM_BOT_TOKEN', default='')
 BOT_USERNAME = config('TELEGRAM_BOT_USERNAME', default='')
 
-# Django API
+# Django API (API_USERNAME/API_PASSWORD: superuser account the bot
+# issues per-gym API tokens with)
 API_BASE_URL = config('API_BASE_URL', default='http://localhost:8000')
 API_USERNAME = config('API_USERNAME', default='')
 API_PASSWORD = config('API_PASSWORD', default='')
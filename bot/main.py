@@ -11,8 +11,8 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.storage.memory import MemoryStorage
-import aiohttp
-from config import BOT_TOKEN, API_BASE_URL
+from api import APIError, FitControlAPI
+from config import BOT_TOKEN
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,6 +22,7 @@ logger = logging.getLogger(__name__)
 storage = MemoryStorage()
 bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher(storage=storage)
+api = FitControlAPI()
 
 
 # FSM States for client registration
@@ -53,38 +54,35 @@ async def cmd_start(message: Message, state: FSMContext):
 
 async def handle_qr_registration(message: Message, token: str, state: FSMContext):
     """Handle QR code-based registration."""
-    async with aiohttp.ClientSession() as session:
-        try:
-            # Verify token and get gym info
-            async with session.get(
-                f"{API_BASE_URL}/api/auth/verify-qr/{token}/"
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get('valid'):
-                        gym_name = data.get('gym_name', 'Gym')
-                        gym_id = data.get('gym_id')
-                        
-                        # Store gym_id and token in state
-                        await state.update_data(gym_id=gym_id, gym_name=gym_name, token=token)
-                        await state.set_state(ClientRegistration.waiting_for_info)
-                        
-                        await message.answer(
-                            f"✅ QR kod topildi!\n"
-                            f"🏋️ Gym: {gym_name}\n\n"
-                            f"Ro'yxatdan o'tish uchun quyidagi ma'lumotlarni yuboring:\n"
-                            f"📝 Ism, Familiya, Telefon raqami\n\n"
-                            f"💡 Misol: Alisher Karimov +998901234567\n\n"
-                            f"Yoki /cancel buyrug'i bilan bekor qilish mumkin."
-                        )
-                    else:
-                        await message.answer("❌ QR kod noto'g'ri yoki muddati o'tgan.")
-                else:
-                    error_data = await response.json() if response.content_type == 'application/json' else {}
-                    await message.answer(f"❌ QR kod noto'g'ri yoki muddati o'tgan.\n{error_data.get('error', '')}")
-        except Exception as e:
-            logger.error(f"Error verifying QR token: {e}")
-            await message.answer("❌ Xatolik yuz berdi. Iltimos, keyinroq urinib ko'ring.")
+    try:
+        # Verify token and get gym info
+        status, data = await api.verify_qr(token)
+        if status == 200:
+            if data.get('valid'):
+                gym_name = data.get('gym_name', 'Gym')
+                gym_id = data.get('gym_id')
+                
+                # Store gym_id and token in state
+                await state.update_data(gym_id=gym_id, gym_name=gym_name, token=token)
+                await state.set_state(ClientRegistration.waiting_for_info)
+                
+                await message.answer(
+                    f"✅ QR kod topildi!\n"
+                    f"🏋️ Gym: {gym_name}\n\n"
+                    f"Ro'yxatdan o'tish uchun quyidagi ma'lumotlarni yuboring:\n"
+                    f"📝 Ism, Familiya, Telefon raqami\n\n"
+                    f"💡 Misol: Alisher Karimov +998901234567\n\n"
+                    f"Yoki /cancel buyrug'i bilan bekor qilish mumkin."
+                )
+            else:
+                await message.answer("❌ QR kod noto'g'ri yoki muddati o'tgan.")
+        elif status == 429:
+            await message.answer("⏳ So'rovlar juda ko'p. Iltimos, keyinroq urinib ko'ring.")
+        else:
+            await message.answer(f"❌ QR kod noto'g'ri yoki muddati o'tgan.\n{data.get('error', '')}")
+    except Exception as e:
+        logger.error(f"Error verifying QR token: {e}")
+        await message.answer("❌ Xatolik yuz berdi. Iltimos, keyinroq urinib ko'ring.")
 
 
 @dp.message(ClientRegistration.waiting_for_info)
@@ -108,9 +106,9 @@ async def process_client_info(message: Message, state: FSMContext):
         first_name = parts[0]
         last_name = ' '.join(parts[1:-1]) if len(parts) > 2 else ''
         
-        # Validate phone number
-        phone_pattern = r'^\+?998\d{9}$'
-        if not re.match(phone_pattern, phone.replace(' ', '').replace('-', '')):
+        # Validate phone number; the backend normalizes it to E.164
+        phone_pattern = r'^(998)?\d{9}$'
+        if not re.match(phone_pattern, re.sub(r'\D', '', phone)):
             await message.answer(
                 "❌ Telefon raqami noto'g'ri formatda.\n"
                 "Iltimos, quyidagi formatda kiriting: +998901234567"
@@ -150,8 +148,8 @@ async def confirm_client_registration(message: Message, state: FSMContext):
         if text in ['ha', 'yes', 'togri', 'to\'g\'ri', 'tasdiqlash', 'tasdiqlayman']:
             data = await state.get_data()
             
-            async with aiohttp.ClientSession() as session:
-                # Create client via API
+            if api.configured:
+                # Create client via API, with a token scoped to the gym
                 client_data = {
                     'first_name': data.get('first_name'),
                     'last_name': data.get('last_name'),
@@ -159,18 +157,23 @@ async def confirm_client_registration(message: Message, state: FSMContext):
                     'telegram_id': data.get('telegram_id'),
                     'telegram_username': data.get('telegram_username', '')
                 }
-                
-                # Note: This requires authentication or a public endpoint
-                # For now, we'll just show a success message
-                # In production, you'd need to implement proper API authentication
-                
-                await message.answer(
-                    f"✅ Ro'yxatdan o'tish muvaffaqiyatli yakunlandi!\n\n"
-                    f"🏋️ {data.get('gym_name', 'Gym')} ga xush kelibsiz!\n\n"
-                    f"Barcha ma'lumotlar saqlandi. Gym admini siz bilan bog'lanadi."
-                )
-                
-                await state.clear()
+                status, response_data = await api.create_client(data.get('gym_id'), client_data)
+                if status == 400 and 'phone' in response_data:
+                    await message.answer("ℹ️ Bu telefon raqami bilan allaqachon ro'yxatdan o'tilgan.")
+                    await state.clear()
+                    return
+                if status != 201:
+                    raise APIError(f"Client creation failed with status {status}: {response_data}")
+            else:
+                logger.warning("API_USERNAME/API_PASSWORD are not set; the client was not saved.")
+            
+            await message.answer(
+                f"✅ Ro'yxatdan o'tish muvaffaqiyatli yakunlandi!\n\n"
+                f"🏋️ {data.get('gym_name', 'Gym')} ga xush kelibsiz!\n\n"
+                f"Barcha ma'lumotlar saqlandi. Gym admini siz bilan bog'lanadi."
+            )
+            
+            await state.clear()
         elif text in ['yoq', 'no', 'bekor', 'cancel']:
             await message.answer("❌ Ro'yxatdan o'tish bekor qilindi.")
             await state.clear()
@@ -250,7 +253,10 @@ async def send_promotion(client_telegram_id: int, promotion_text: str):
 async def main():
     """Main function to run the bot."""
     logger.info("Starting bot...")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await api.close()
 
 
 if __name__ == "__main__":